@@ -0,0 +1,57 @@
+"""
+Compare two result files written by `benchmarks/suite.py`, e.g. of two gst releases:
+
+    python benchmarks/compare.py before.json after.json --threshold 1.2
+
+The exit status is 1 if the median of any benchmark got slower by more than
+`--threshold` times.
+"""
+import argparse
+import json
+import sys
+from typing import Any
+from typing import Dict
+from typing import Tuple
+
+
+def load(path: str) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+    """ Return the results of `path`, keyed by benchmark, name and params """
+    with open(path) as fd:
+        report = json.load(fd)
+    results = {}
+    for benchmark, data in report["benchmarks"].items():
+        for item in data.get("results", []):
+            params = json.dumps(item["params"], sort_keys=True)
+            results[(benchmark, item["name"], params)] = item
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=1.1)
+    args = parser.parse_args()
+    before = load(args.before)
+    after = load(args.after)
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key]["median"] / before[key]["median"]
+        regressed = ratio > args.threshold
+        regressions += regressed
+        benchmark, name, params = key
+        print(
+            f"{benchmark:>20} {name:<28} {params:<45} "
+            f"{before[key]['median'] * 1e3:9.3f}ms -> "
+            f"{after[key]['median'] * 1e3:9.3f}ms "
+            f"x{ratio:5.2f}{'  REGRESSION' if regressed else ''}"
+        )
+    for key in sorted(before.keys() ^ after.keys()):
+        print(f"Only in one of the files: {key}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
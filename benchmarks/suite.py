@@ -0,0 +1,299 @@
+"""
+Benchmark the overhead of `gst`: constructing `Grass`, entering and exiting sessions,
+`system_restore`, `temp_region`, `temp_mapset` and their decorators, and reading
+compressed maps with `CellFile`.
+
+The benchmarks run against `$GST_GRASS_EXECUTABLE` and a clone of the `epsg4326`
+Location that is bundled with the tests. The results are printed and, optionally,
+written as JSON, which `benchmarks/compare.py` can compare:
+
+    GST_GRASS_EXECUTABLE=/usr/bin/grass python benchmarks/suite.py -o before.json
+    python benchmarks/suite.py -o after.json -k session -k temp_region
+    python benchmarks/compare.py before.json after.json
+
+A benchmark that fails (e.g. because GRASS is not available) is reported as such and
+the rest of them still run.
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import gst
+from gst.system_restore import system_restore
+
+EPSG4326 = pathlib.Path(__file__).parent.parent / "tests/gisdbase/epsg4326"
+
+# name -> benchmark function; see `benchmark()`
+BENCHMARKS: Dict[str, Callable[..., List[Dict[str, Any]]]] = {}
+
+
+def benchmark(func: Callable[..., List[Dict[str, Any]]]):
+    """ Register `func` as a benchmark; it returns a list of results """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    """ Call `func` `repeat` times and return the duration of each call in seconds """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def result(name: str, timings: List[float], **params: Any) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "params": params,
+        "repeat": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "timings": timings,
+    }
+
+
+def phases(timings: List[gst.Timing]) -> Dict[str, float]:
+    """ Return the median duration of each phase recorded by `gst.instrument` """
+    durations: Dict[str, List[float]] = {}
+    for timing in timings:
+        durations.setdefault(timing.phase, []).append(timing.duration)
+    return {phase: statistics.median(values) for phase, values in durations.items()}
+
+
+@benchmark
+def grass_construction(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    results = [
+        result("Grass()", measure(lambda: gst.Grass(use_cache=True), repeat)),
+        result(
+            "Grass(use_cache=False)",
+            measure(lambda: gst.Grass(use_cache=False), repeat),
+        ),
+    ]
+    gst.Grass.get()
+    results.append(result("Grass.get()", measure(gst.Grass.get, repeat)))
+    return results
+
+
+def _enter_and_exit(session: gst.Session) -> None:
+    with session:
+        pass
+
+
+@benchmark
+def session(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    grass = gst.Grass.get()
+    results = []
+    for persistent in (False, True):
+        session = gst.Session(location, grass=grass, persistent=persistent)
+        with gst.collect_timings() as timings:
+            durations = measure(lambda: _enter_and_exit(session), repeat)
+        session.close()
+        results.append(
+            dict(
+                result("Session enter/exit", durations, persistent=persistent),
+                phases=phases(timings),
+            )
+        )
+    return results
+
+
+def _restore(incremental: bool) -> None:
+    with system_restore(incremental=incremental):
+        os.environ["GISRC"] = "/tmp/gisrc"
+        os.environ["GIS_LOCK"] = "1"
+
+
+@benchmark
+def system_restore_cost(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    original = os.environ.copy()
+    results = []
+    try:
+        for size in (0, 100, 1000):
+            for i in range(size):
+                os.environ[f"GST_BENCHMARK_{i}"] = "x" * 64
+            for incremental in (True, False):
+                durations = measure(lambda: _restore(incremental), repeat)
+                results.append(
+                    result(
+                        "system_restore",
+                        durations,
+                        extra_variables=size,
+                        incremental=incremental,
+                    )
+                )
+            os.environ.clear()
+            os.environ.update(original)
+    finally:
+        os.environ.clear()
+        os.environ.update(original)
+    return results
+
+
+def _temp_region(raster: Optional[str] = None) -> None:
+    with gst.temp_region(raster=raster):
+        pass
+
+
+@gst.with_temp_region()
+def _decorated_with_temp_region() -> None:
+    pass
+
+
+def _temp_mapset(deferred: bool) -> None:
+    with gst.temp_mapset(deferred=deferred):
+        pass
+
+
+@gst.with_temp_mapset(mapset_name="gst_benchmark")
+def _decorated_with_temp_mapset() -> None:
+    pass
+
+
+@benchmark
+def temp_region(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    with gst.Session(location):
+        return [
+            result("temp_region()", measure(_temp_region, repeat)),
+            result(
+                "temp_region(raster)", measure(lambda: _temp_region("sq5_127"), repeat),
+            ),
+            result("with_temp_region", measure(_decorated_with_temp_region, repeat)),
+        ]
+
+
+@benchmark
+def temp_mapset(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    with gst.Session(location):
+        results = [
+            result("temp_mapset()", measure(lambda: _temp_mapset(False), repeat)),
+            result(
+                "temp_mapset(deferred=True)",
+                measure(lambda: _temp_mapset(True), repeat),
+            ),
+            result("with_temp_mapset", measure(_decorated_with_temp_mapset, repeat)),
+        ]
+        gst.wait_for_deletions()
+    return results
+
+
+def _write_compressed_map(location: pathlib.Path, name: str, size: int) -> None:
+    """ Write a zlib compressed DCELL map of `size` x `size` cells, like GRASS does """
+    import numpy  # type: ignore
+
+    mapset = location / "PERMANENT"
+    header = (mapset / "cellhd/sq5_127").read_text()
+    header = header.replace("compressed: 5", "compressed: 2")
+    header = header.replace("north:      5N", f"north:      {size}N")
+    header = header.replace("east:       5E", f"east:       {size}E")
+    header = header.replace("cols:       5", f"cols:       {size}")
+    header = header.replace("rows:       5", f"rows:       {size}")
+    rng = numpy.random.default_rng(0)
+    rows = [
+        b"1" + zlib.compress(numpy.round(rng.random(size), 2).astype(">f8").tobytes())
+        for _ in range(size)
+    ]
+    offsets = [1 + 8 * (size + 1)]
+    for row in rows:
+        offsets.append(offsets[-1] + len(row))
+    (mapset / "fcell").mkdir(exist_ok=True)
+    with open(mapset / "fcell" / name, "wb") as fd:
+        fd.write(b"\x08" + b"".join(offset.to_bytes(8, "big") for offset in offsets))
+        fd.writelines(rows)
+    (mapset / "cell" / name).write_bytes(b"")
+    (mapset / "cellhd" / name).write_text(header)
+    (mapset / "cell_misc" / name).mkdir()
+    (mapset / "cell_misc" / name / "f_format").write_text("type: double\n")
+
+
+@benchmark
+def cellfile_read(location: pathlib.Path, repeat: int) -> List[Dict[str, Any]]:
+    size = 2000
+    _write_compressed_map(location, "gst_benchmark", size)
+    cells = gst.CellFile(location, "gst_benchmark")
+    return [
+        result(
+            "CellFile.read()",
+            measure(lambda: cells.read(max_workers=workers), repeat),
+            cells=size * size,
+            max_workers=workers,
+        )
+        for workers in (1, None)
+    ]
+
+
+def environment() -> Dict[str, Any]:
+    info: Dict[str, Any] = {
+        "gst": gst.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    try:
+        grass = gst.Grass.get()
+        info["grass"] = {
+            "executable": grass.executable.as_posix(),
+            "version": grass.config("version"),
+        }
+    except Exception as exc:
+        info["grass"] = {"error": str(exc)}
+    return info
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=20)
+    parser.add_argument(
+        "-k",
+        "--only",
+        action="append",
+        help="Only run the benchmarks whose name contains this (can be repeated)",
+    )
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+    report: Dict[str, Any] = {"environment": environment(), "benchmarks": {}}
+    for name, func in BENCHMARKS.items():
+        if args.only and not any(pattern in name for pattern in args.only):
+            continue
+        with tempfile.TemporaryDirectory() as gisdbase:
+            location = gst.clone_location(
+                EPSG4326, pathlib.Path(gisdbase) / EPSG4326.name
+            )
+            try:
+                results = func(location, args.repeat)
+            except Exception as exc:
+                print(f"{name}: failed: {exc!r}", file=sys.stderr)
+                report["benchmarks"][name] = {"error": repr(exc)}
+                continue
+        report["benchmarks"][name] = {"results": results}
+        for item in results:
+            params = ", ".join(f"{k}={v}" for k, v in item["params"].items())
+            print(
+                f"{name:>20} {item['name'] + (f' ({params})' if params else ''):<45} "
+                f"median={item['median'] * 1e3:9.3f}ms min={item['min'] * 1e3:9.3f}ms"
+            )
+    if args.output:
+        with open(args.output, "w") as fd:
+            json.dump(report, fd, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,46 @@ __version__ = "0.3.0"
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
+from .aio import *
+from .array import *
+from .batch import *
+from .cache import *
+from .cellfile import *
+from .cleanup import *
+from .clone import *
+from .env_session import *
 from .grass_bin import *
+from .index import *
+from .instrument import *
+from .location import *
+from .mapset_pool import *
+from .memoize import *
+from .metadata import *
+from .pool import *
+from .region import *
 from .session import *
+from .tiling import *
 from .utils import *
 
-__all__: list = session.__all__ + grass_bin.__all__ + utils.__all__
+__all__: list = (
+    aio.__all__
+    + array.__all__
+    + batch.__all__
+    + cache.__all__
+    + cellfile.__all__
+    + cleanup.__all__
+    + clone.__all__
+    + env_session.__all__
+    + index.__all__
+    + instrument.__all__
+    + location.__all__
+    + mapset_pool.__all__
+    + memoize.__all__
+    + metadata.__all__
+    + pool.__all__
+    + region.__all__
+    + session.__all__
+    + grass_bin.__all__
+    + tiling.__all__
+    + utils.__all__
+)
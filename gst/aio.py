@@ -0,0 +1,197 @@
+"""
+An asyncio API for running GRASS modules.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import pathlib
+import subprocess
+from typing import Any
+from typing import AsyncIterator
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .env_session import EnvSession
+from .env_session import make_command
+from .grass_bin import Grass
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["AsyncSession"]
+
+
+class _Unlimited(object):
+    """ A no-op stand-in for `asyncio.Semaphore`. """
+
+    async def __aenter__(self) -> None:
+        pass
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+class AsyncSession(object):
+    """
+    An asynchronous context manager for running GRASS modules from asyncio code.
+
+    The modules are started with `asyncio.create_subprocess_exec()`, so awaiting them
+    doesn't block the event loop. The session is backed by an `EnvSession`, i.e. the
+    GRASS environment is private to the session and `os.environ` is never modified,
+    so many sessions can be used concurrently by the same event loop::
+
+        async with gst.AsyncSession(location, max_concurrency=4) as session:
+            await session.run("r.slope.aspect", elevation="dem", slope="slope")
+
+    Parameters
+    ----------
+
+    location:
+        The path to the GRASS Location
+    mapset:
+        The path to the GRASS Mapset
+    grass:
+        The GRASS executable.
+    max_concurrency:
+        The maximum number of modules that may be running at the same time. If it is
+        `None`, then there is no limit.
+
+    """
+
+    session: EnvSession
+    max_concurrency: Optional[int]
+
+    def __init__(
+        self,
+        location: Union[str, pathlib.Path],
+        mapset: Union[str, pathlib.Path] = "PERMANENT",
+        grass: Optional[Union[str, pathlib.Path, Grass]] = None,
+        max_concurrency: Optional[int] = None,
+    ) -> None:
+        self.session = EnvSession(location=location, mapset=mapset, grass=grass)
+        self.max_concurrency = max_concurrency
+        self._limit: Any = _Unlimited()
+
+    def __repr__(self) -> str:
+        return f"<GRASS AsyncSession: {self.session.mapset.as_posix()}>"
+
+    @property
+    def is_active(self) -> bool:
+        return self.session.is_active
+
+    async def __aenter__(self) -> AsyncSession:
+        # The semaphore needs to be created while the event loop is running.
+        if self.max_concurrency is not None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        self.session.__enter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        # Tearing down the session runs a (blocking) cleanup subprocess.
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.session.__exit__, None, None, None)
+
+    async def _start(
+        self, module: str, stdin: Any = None, **kwargs: Any
+    ) -> asyncio.subprocess.Process:
+        args = make_command(module, **kwargs)
+        logger.debug(f"Running: {args}")
+        return await asyncio.create_subprocess_exec(
+            *args,
+            stdin=stdin,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=self.session.env,
+        )
+
+    async def run(
+        self, module: str, *, stdin: Optional[str] = None, check: bool = True, **kwargs
+    ) -> subprocess.CompletedProcess:
+        """
+        Run a GRASS module and return a `subprocess.CompletedProcess` with its decoded
+        standard output and error.
+
+        Parameters
+        ----------
+
+        module:
+            The name of the module, e.g. `r.slope.aspect`.
+        stdin:
+            Text that will be written to the standard input of the module.
+        check:
+            If `True`, then `subprocess.CalledProcessError` is raised when the module
+            exits with a non-zero status.
+        kwargs:
+            The flags and the options of the module, see `gst.make_command()`.
+
+        """
+        async with self._limit:
+            process = await self._start(
+                module,
+                stdin=asyncio.subprocess.PIPE if stdin is not None else None,
+                **kwargs,
+            )
+            stdout, stderr = await process.communicate(
+                stdin.encode() if stdin is not None else None
+            )
+        # The process has exited, so `returncode` has been set
+        assert process.returncode is not None
+        result = subprocess.CompletedProcess(
+            make_command(module, **kwargs),
+            process.returncode,
+            stdout.decode(),
+            stderr.decode(),
+        )
+        if check:
+            result.check_returncode()
+        return result
+
+    async def read(self, module: str, **kwargs: Any) -> str:
+        """ Run a GRASS module and return its standard output. """
+        result = await self.run(module, **kwargs)
+        return result.stdout
+
+    async def stream(
+        self, module: str, *, check: bool = True, **kwargs: Any
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Run a GRASS module and yield its output line by line, as soon as it is
+        produced.
+
+        The items are `(stream, line)` tuples, where `stream` is either `"stdout"` or
+        `"stderr"`. The lines are yielded in the order they are read.
+        """
+        async with self._limit:
+            process = await self._start(module, **kwargs)
+            assert process.stdout is not None and process.stderr is not None
+            queue: asyncio.Queue = asyncio.Queue()
+
+            async def pump(name: str, reader: asyncio.StreamReader) -> None:
+                async for line in reader:
+                    await queue.put((name, line.decode().rstrip("\n")))
+                await queue.put((name, None))
+
+            pumps = [
+                asyncio.ensure_future(pump("stdout", process.stdout)),
+                asyncio.ensure_future(pump("stderr", process.stderr)),
+            ]
+            try:
+                running = len(pumps)
+                while running:
+                    name, line = await queue.get()
+                    if line is None:
+                        running -= 1
+                    else:
+                        yield name, line
+                returncode = await process.wait()
+            finally:
+                for task in pumps:
+                    task.cancel()
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        if check and returncode:
+            raise subprocess.CalledProcessError(
+                returncode, make_command(module, **kwargs)
+            )
@@ -0,0 +1,266 @@
+"""
+Read and write raster maps as NumPy arrays, in-process.
+
+The data are moved between the maps and the arrays with the GRASS raster library (via
+pygrass), so there is no need for `r.out.*`/`r.in.*` subprocesses and intermediate
+files. The cells that are read or written are the ones of the computational region,
+as returned by `gst.current_region()`, so `temp_region()`, `override_region()` and
+`Session.regions` are all respected::
+
+    with gst.temp_region(raster="elevation"):
+        elevation = gst.read_array("elevation")
+        gst.write_array("slope_x", numpy.gradient(elevation, axis=1), overwrite=True)
+
+`iter_rows()` reads a map in blocks of rows, which allows processing maps that don't
+fit in memory, e.g. by passing a generator of blocks to `write_array()`.
+
+NumPy is an optional dependency of `gst`, which is only needed by this module and by
+`gst.cellfile`. It is installed by the `numpy` extra, i.e. `pip install gst[numpy]`.
+"""
+from __future__ import annotations
+
+import ctypes
+import importlib
+import logging
+import os
+import typing
+from types import ModuleType
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import decorator  # type: ignore
+
+from .region import _gisenv
+from .region import _mapset_path
+from .region import current_region
+from .region import Region
+from .session import current_session
+from .utils import require_grass
+
+if typing.TYPE_CHECKING:
+    import numpy  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["read_array", "iter_rows", "write_array"]
+
+# The NumPy dtypes of the GRASS raster types
+DTYPES = {"CELL": "int32", "FCELL": "float32", "DCELL": "float64"}
+
+# The value that GRASS uses for null CELL values (i.e. the minimum int32)
+CELL_NULL = -2147483648
+
+
+def _numpy() -> ModuleType:
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        raise ImportError("gst.array requires numpy") from None
+
+
+def _import(name: str) -> ModuleType:
+    """ Import `grass.<name>`, preferably from the cache of the current `Session` """
+    session = current_session()
+    if session is not None:
+        return session._import(f"grass.{name}")
+    return importlib.import_module(f"grass.{name}")
+
+
+@decorator.contextmanager
+def _window(region: Region):
+    """
+    Context manager that makes the raster library use `region` for reading and
+    writing maps, and restores the previous window on exit. The maps that are written
+    must be closed before exiting.
+    """
+    libgis = _import("lib.gis")
+    libraster = _import("lib.raster")
+    previous = libgis.Cell_head()
+    libraster.Rast_get_window(ctypes.byref(previous))
+    window = libgis.Cell_head()
+    libgis.G_get_window(ctypes.byref(window))
+    window.proj = region.proj
+    window.zone = region.zone
+    window.north = region.north
+    window.south = region.south
+    window.east = region.east
+    window.west = region.west
+    window.rows = region.rows
+    window.cols = region.cols
+    libgis.G_adjust_Cell_head(ctypes.byref(window), 1, 1)
+    libraster.Rast_set_window(ctypes.byref(window))
+    try:
+        yield
+    finally:
+        libraster.Rast_set_window(ctypes.byref(previous))
+
+
+def _mtype(dtype: Any) -> str:
+    """ Return the GRASS type that can hold the values of a NumPy `dtype` """
+    np = _numpy()
+    dtype = np.dtype(dtype)
+    if dtype.kind in "biu":
+        return "CELL"
+    if dtype == np.float32:
+        return "FCELL"
+    if dtype.kind == "f":
+        return "DCELL"
+    raise ValueError(f"Can't write arrays of type {dtype} to a raster map")
+
+
+def _replace_nulls(array: numpy.ndarray, mtype: str, null: Any) -> numpy.ndarray:
+    """ Replace the GRASS nulls of `array` with `null` """
+    np = _numpy()
+    mask = np.isnan(array) if mtype != "CELL" else array == CELL_NULL
+    if mask.any():
+        if mtype == "CELL" and isinstance(null, float):
+            array = array.astype("float64")
+        array[mask] = null
+    return array
+
+
+@require_grass
+def iter_rows(
+    name: str, *, chunk: int = 256, region: Optional[Region] = None, null: Any = None,
+) -> Iterator[Tuple[int, numpy.ndarray]]:
+    """
+    Read the raster map `name` in blocks of `chunk` rows and yield `(row, block)`
+    tuples, where `row` is the index of the first row of the block.
+
+    Parameters
+    ----------
+
+    name:
+        The name of the map, optionally qualified with a mapset (`name@mapset`).
+    chunk:
+        The number of rows of each block; the last block may be smaller.
+    region:
+        The region to read. Defaults to the current region.
+    null:
+        The value of the null cells. By default, GRASS' own representation is kept,
+        i.e. `NaN` for floating point maps and `gst.array.CELL_NULL` for integer ones.
+
+    """
+    np = _numpy()
+    if chunk < 1:
+        raise ValueError(f"chunk must be a positive integer, not: {chunk}")
+    region = region or current_region()
+    map_name, _, mapset = name.partition("@")
+    with _window(region):
+        raster = _import("pygrass.raster").RasterRow(map_name, mapset)
+        raster.open("r")
+        try:
+            dtype = DTYPES[raster.mtype]
+            buffer = None
+            for first in range(0, region.rows, chunk):
+                rows = min(chunk, region.rows - first)
+                block = np.empty((rows, region.cols), dtype=dtype)
+                for i in range(rows):
+                    buffer = raster.get_row(first + i, buffer)
+                    block[i] = buffer
+                if null is not None:
+                    block = _replace_nulls(block, raster.mtype, null)
+                yield first, block
+        finally:
+            raster.close()
+
+
+@require_grass
+def read_array(
+    name: str, *, region: Optional[Region] = None, null: Any = None
+) -> numpy.ndarray:
+    """
+    Read the raster map `name` and return it as a 2D array of the region's shape.
+
+    The dtype of the array is `int32`, `float32` or `float64`, depending on the type
+    of the map. See `iter_rows()` for the parameters.
+    """
+    np = _numpy()
+    blocks = [block for _, block in iter_rows(name, region=region, null=null)]
+    return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+
+@require_grass
+def write_array(
+    name: str,
+    data: Union[numpy.ndarray, Iterable[numpy.ndarray]],
+    *,
+    mtype: Optional[str] = None,
+    region: Optional[Region] = None,
+    null: Any = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    Write `data` to the raster map `name`, in the current mapset.
+
+    Parameters
+    ----------
+
+    name:
+        The name of the map.
+    data:
+        Either a 2D array of the region's shape, or an iterable of 2D arrays (blocks of
+        rows) whose rows add up to the region's rows, e.g. a generator that processes
+        the blocks returned by `iter_rows()`.
+    mtype:
+        `"CELL"`, `"FCELL"` or `"DCELL"`. Defaults to the type that matches the dtype
+        of the (first) array.
+    region:
+        The region of the map. Defaults to the current region.
+    null:
+        The value that marks the null cells. `NaN` and `gst.array.CELL_NULL` always
+        do.
+    overwrite:
+        Whether an existing map may be overwritten.
+
+    """
+    np = _numpy()
+    if mtype is not None and mtype not in DTYPES:
+        raise ValueError(f"mtype must be one of {tuple(DTYPES)}, not: {mtype}")
+    region = region or current_region()
+    if not overwrite and (_mapset_path(_gisenv(os.environ)) / "cellhd" / name).exists():
+        raise ValueError(f"Raster map <{name}> exists; pass `overwrite=True`")
+    blocks: Iterable[numpy.ndarray] = [data] if isinstance(data, np.ndarray) else data
+    libraster = _import("lib.raster")
+    Buffer = _import("pygrass.raster.buffer").Buffer
+    fd: Optional[int] = None
+    written = 0
+    with _window(region):
+        try:
+            for block in blocks:
+                block = np.asarray(block)
+                if block.ndim != 2 or block.shape[1] != region.cols:
+                    raise ValueError(
+                        f"Expected blocks with {region.cols} columns, "
+                        f"not: {block.shape}"
+                    )
+                if written + block.shape[0] > region.rows:
+                    raise ValueError(f"The region has {region.rows} rows, got more")
+                if fd is None:
+                    mtype = mtype or _mtype(block.dtype)
+                    dtype = DTYPES[mtype]
+                    data_type = getattr(libraster, f"{mtype}_TYPE")
+                    fd = libraster.Rast_open_new(name, data_type)
+                    buffer = Buffer((region.cols,), mtype=mtype)
+                if null is not None:
+                    mask = block == null
+                    if mask.any():
+                        block = block.astype(dtype)
+                        block[mask] = CELL_NULL if mtype == "CELL" else np.nan
+                for row in block:
+                    buffer[:] = row
+                    libraster.Rast_put_row(fd, buffer.p, data_type)
+                written += block.shape[0]
+            if written != region.rows:
+                raise ValueError(f"The region has {region.rows} rows, got {written}")
+        except BaseException:
+            if fd is not None:
+                # Discard the incomplete map instead of closing (i.e. creating) it
+                libraster.Rast_unopen(fd)
+            raise
+        libraster.Rast_close(fd)
+    logger.debug(f"Wrote raster map: {name} ({written} rows)")
@@ -0,0 +1,363 @@
+"""
+Run many GRASS modules through a single, long-lived shell.
+
+`grass.script.run_command()` spawns each module from the Python process, which means
+forking the interpreter and waiting for each module before the next one can be
+started. `Batch` starts a `bash` process with the GRASS environment once and streams
+the command lines to it. The results are read back using a sentinel that is printed
+after each command. Commands can either be run one by one (`run_command()`), or
+queued with `submit()` and sent in one go with `flush()`, so that Python doesn't wait
+for each one of them::
+
+    with session.batch() as batch:
+        for i in range(100):
+            batch.submit("r.mapcalc", expression=f"tmp_{i} = {i}", overwrite=True)
+        results = batch.flush()
+
+Note that each GRASS module is still a separate executable, so every command still
+starts a process (forked by the shell). What the batch saves is spawning it from the
+Python process, the `grass.script` overhead and the round-trips between the commands.
+Since the commands run in the same shell, `export` and `cd` persist between them.
+
+The batches of `Session.batch()` and `EnvSession.batch()` follow the environment of the
+session: when a command is submitted, the variables that have changed since the
+previous one (e.g. the `$GRASS_REGION` set by `override_region()`) are exported right
+before it. Switching the mapset only rewrites `$GISRC`, which the modules read when
+they start, so it is seen as well.
+"""
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import time
+import uuid
+from typing import Any
+from typing import Dict
+from typing import IO
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from .env_session import make_command
+from .instrument import timed
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["Batch", "BatchResult"]
+
+# The returncode of the commands that were not run because a previous one failed
+SKIPPED = -1
+
+
+@dataclasses.dataclass(frozen=True)
+class BatchResult:
+    """
+    The outcome of a command that has been run by a `Batch`.
+
+    Attributes
+    ----------
+    args:
+        The command line.
+    returncode:
+        The exit status of the command, or `-1` if it was skipped because a previous
+        command of the same `flush()` failed.
+    stdout, stderr:
+        The output of the command.
+    """
+
+    args: str
+    returncode: int
+    stdout: str
+    stderr: str
+
+    def check_returncode(self) -> None:
+        """ Raise `subprocess.CalledProcessError` if the exit status is non-zero. """
+        if self.returncode:
+            raise subprocess.CalledProcessError(
+                self.returncode, self.args, self.stdout, self.stderr
+            )
+
+
+class Batch(object):
+    """
+    A `bash` process that runs GRASS modules with the environment `env`.
+
+    It is usually created with `Session.batch()` or `EnvSession.batch()`. The shell is
+    started lazily and it is terminated by `close()` or when the context manager
+    exits, after the queued commands have been flushed.
+
+    Parameters
+    ----------
+
+    env:
+        The environment of the shell. Defaults to `os.environ`.
+    check:
+        Whether to raise `subprocess.CalledProcessError` when a command fails. When
+        flushing queued commands, the commands after the failed one are skipped.
+    shell:
+        The shell. It must be compatible with `bash`.
+    follow:
+        If `True`, then the changes made to `env` after the batch has been created
+        are applied to the commands that are submitted afterwards. Otherwise, the
+        shell keeps using a copy of `env`.
+    timeout:
+        The number of seconds to wait for each command to finish. If it expires, then
+        the shell and the commands that it runs are killed and
+        `subprocess.TimeoutExpired` is raised. `None` means no limit.
+
+    """
+
+    def __init__(
+        self,
+        env: Optional[Mapping[str, str]] = None,
+        check: bool = True,
+        shell: str = "bash",
+        follow: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        source = os.environ if env is None else env
+        self.env = dict(source)
+        # The environment of the shell, as of the last submitted command
+        self._synced = dict(source)
+        self.check = check
+        self.shell = shell
+        self.timeout = timeout
+        self._source = source if follow else None
+        # (statements that update the environment, command)
+        self._queue: List[Tuple[str, str]] = []
+        self._process: Optional[subprocess.Popen] = None
+        self._pipes: Optional[Tuple[IO[bytes], IO[bytes], IO[bytes]]] = None
+        self._token = f"__gst_batch_{uuid.uuid4().hex}"
+
+    def __repr__(self) -> str:
+        return f"<Batch: {len(self._queue)} queued>"
+
+    def __enter__(self) -> Batch:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
+
+    def _start(self) -> Tuple[IO[bytes], IO[bytes], IO[bytes]]:
+        """ Start the shell, if necessary, and return its stdin, stdout and stderr """
+        if self._pipes is None:
+            self._process = subprocess.Popen(
+                [self.shell, "--noprofile", "--norc"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=self.env,
+                # So that a timeout can kill the commands too
+                start_new_session=True,
+            )
+            stdin = self._process.stdin
+            stdout = self._process.stdout
+            stderr = self._process.stderr
+            assert stdin is not None and stdout is not None and stderr is not None
+            self._pipes = (stdin, stdout, stderr)
+            os.set_blocking(stdin.fileno(), False)
+            logger.debug(f"Started batch shell: {self._process.pid}")
+        return self._pipes
+
+    def close(self) -> None:
+        """ Terminate the shell. Queued commands are discarded. """
+        self._queue.clear()
+        # A new shell starts with `env`
+        self._synced = dict(self.env)
+        if self._process is not None and self._pipes is not None:
+            process, self._process = self._process, None
+            (stdin, stdout, stderr), self._pipes = self._pipes, None
+            stdin.close()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            stdout.close()
+            stderr.close()
+
+    def _kill(self) -> None:
+        """ Kill the shell and the commands that it is running """
+        if self._process is not None:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.close()
+
+    def _environment(self) -> str:
+        """
+        Return the statements that apply the changes of the followed environment to
+        the shell.
+        """
+        if self._source is None:
+            return ""
+        statements = []
+        for key in set(self._synced) - set(self._source):
+            del self._synced[key]
+            # e.g. exported bash functions can't be assigned
+            if key.isidentifier():
+                statements.append(f"unset {key}; ")
+        for key, value in self._source.items():
+            if self._synced.get(key) != value and key.isidentifier():
+                statements.append(f"export {key}={shlex.quote(value)}; ")
+                self._synced[key] = value
+        return "".join(statements)
+
+    def _script(self, environment: str, command: str) -> str:
+        """ Wrap `command` so that it reports its exit status after its output """
+        # `eval` confines syntax errors to the command itself
+        run = f"{{ eval {shlex.quote(command)}; }} </dev/null"
+        abort = ""
+        if self.check:
+            abort = 'if [ "$__gst_rc" != 0 ]; then __gst_abort=1; fi; '
+        return (
+            f"{environment}"
+            f'if [ -z "$__gst_abort" ]; then {run}; __gst_rc=$?; '
+            f"else __gst_rc={SKIPPED}; fi; {abort}"
+            f"printf '\\n%s:%s\\n' {self._token} \"$__gst_rc\"; "
+            f"printf '\\n%s\\n' {self._token} >&2\n"
+        )
+
+    def _execute(self, commands: List[Tuple[str, str]]) -> List[BatchResult]:
+        stdin, stdout_pipe, stderr_pipe = self._start()
+        script = "unset __gst_abort\n" + "".join(
+            self._script(environment, command) for environment, command in commands
+        )
+        pending = script.encode()
+        token = self._token.encode()
+        stdout = bytearray()
+        stderr = bytearray()
+        outputs: List[bytes] = []
+        errors: List[bytes] = []
+        returncodes: List[int] = []
+        selector = selectors.DefaultSelector()
+        selector.register(stdin, selectors.EVENT_WRITE)
+        selector.register(stdout_pipe, selectors.EVENT_READ)
+        selector.register(stderr_pipe, selectors.EVENT_READ)
+        timeout = self.timeout
+        # When the command that is being waited for started
+        started = time.monotonic()
+        try:
+            while len(outputs) < len(commands) or len(errors) < len(commands):
+                remaining = None
+                if timeout is not None:
+                    remaining = started + timeout - time.monotonic()
+                    if remaining <= 0:
+                        self._kill()
+                        raise subprocess.TimeoutExpired(
+                            commands[len(outputs)][1], timeout
+                        )
+                for key, _ in selector.select(remaining):
+                    if key.fileobj is stdin:
+                        try:
+                            written = os.write(key.fd, pending[:65536])
+                        except BlockingIOError:
+                            continue
+                        pending = pending[written:]
+                        if not pending:
+                            selector.unregister(stdin)
+                        continue
+                    data = os.read(key.fd, 65536)
+                    if not data:
+                        self.close()
+                        raise RuntimeError("The batch shell exited unexpectedly")
+                    if key.fileobj is stdout_pipe:
+                        stdout += data
+                        while True:
+                            start = stdout.find(b"\n" + token + b":")
+                            end = stdout.find(b"\n", start + len(token) + 2)
+                            if start == -1 or end == -1:
+                                break
+                            outputs.append(bytes(stdout[:start]))
+                            returncode = stdout[start + len(token) + 2 : end]
+                            returncodes.append(int(returncode))
+                            del stdout[: end + 1]
+                            started = time.monotonic()
+                    else:
+                        stderr += data
+                        while True:
+                            start = stderr.find(b"\n" + token + b"\n")
+                            if start == -1:
+                                break
+                            errors.append(bytes(stderr[:start]))
+                            del stderr[: start + len(token) + 2]
+        finally:
+            selector.close()
+        return [
+            BatchResult(
+                args=command,
+                returncode=returncode,
+                stdout=out.decode(errors="replace"),
+                stderr=err.decode(errors="replace"),
+            )
+            for (_, command), returncode, out, err in zip(
+                commands, returncodes, outputs, errors
+            )
+        ]
+
+    def _command(self, module: Union[str, Sequence[str]], **kwargs: Any) -> str:
+        if isinstance(module, str) and not kwargs and " " in module:
+            # a shell command line
+            return module
+        args = [module] if isinstance(module, str) else list(module)
+        if kwargs:
+            args = make_command(args[0], **kwargs) + args[1:]
+        return " ".join(shlex.quote(arg) for arg in args)
+
+    def submit(self, module: Union[str, Sequence[str]], **kwargs: Any) -> None:
+        """
+        Queue a command; it will be run by the next `flush()`.
+
+        `module` is either the name of a GRASS module, whose keyword arguments are
+        converted to a command line by `make_command()`, a list of arguments, or a
+        shell command line.
+        """
+        self._queue.append((self._environment(), self._command(module, **kwargs)))
+
+    def flush(self) -> List[BatchResult]:
+        """
+        Run the queued commands and return their results.
+
+        Raises
+        ------
+        subprocess.CalledProcessError:
+            If `check` is `True` and a command fails.
+        subprocess.TimeoutExpired:
+            If a command doesn't finish within `timeout` seconds. The shell is killed
+            and the rest of the commands are discarded.
+        """
+        commands, self._queue = self._queue, []
+        if not commands:
+            return []
+        with timed("batch.flush", commands=len(commands)):
+            results = self._execute(commands)
+        if self.check:
+            for result in results:
+                result.check_returncode()
+        return results
+
+    def run_command(
+        self, module: Union[str, Sequence[str]], **kwargs: Any
+    ) -> BatchResult:
+        """ Run a command (see `submit()`) right away and return its result. """
+        if self._queue:
+            self.flush()
+        self.submit(module, **kwargs)
+        return self.flush()[0]
+
+    def read_command(self, module: Union[str, Sequence[str]], **kwargs: Any) -> str:
+        """ Run a command right away and return its standard output. """
+        return self.run_command(module, **kwargs).stdout
@@ -0,0 +1,155 @@
+"""
+A persistent, on-disk cache for the output of `grass --config`.
+
+Querying `grass --config <key>` boots the whole GRASS startup script, which takes
+hundreds of milliseconds. The answers only change when the GRASS installation
+changes, so we store them on disk, keyed by the resolved path of the executable and
+invalidated whenever its size or modification time changes.
+
+The cache lives in `$GST_CACHE_DIR` (defaulting to `$XDG_CACHE_HOME/gst` or
+`~/.cache/gst`). Setting `$GST_NO_CACHE` to a non-empty value disables it.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+from typing import Dict
+from typing import Optional
+from typing import Union
+
+import delegator  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["cache_dir", "clear_cache"]
+
+
+def cache_dir() -> pathlib.Path:
+    """
+    Return the directory where `gst` stores its cached data.
+
+    `$GST_CACHE_DIR` takes precedence, then `$XDG_CACHE_HOME/gst` and finally
+    `~/.cache/gst`. The directory is not created by this function.
+    """
+    explicit = os.environ.get("GST_CACHE_DIR")
+    if explicit:
+        return pathlib.Path(explicit)
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    base = pathlib.Path(xdg) if xdg else pathlib.Path.home() / ".cache"
+    return base / "gst"
+
+
+def cache_enabled() -> bool:
+    """ Return `False` if the cache has been disabled via `$GST_NO_CACHE`. """
+    return not os.environ.get("GST_NO_CACHE")
+
+
+def clear_cache() -> None:
+    """
+    Remove everything that `gst` has stored in `cache_dir()`.
+
+    Only the entries that `gst` owns are removed, since `$GST_CACHE_DIR` may point to
+    a directory that is shared with other applications.
+    """
+    path = _config_cache_dir()
+    logger.debug(f"Clearing cache: {path}")
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _config_cache_dir() -> pathlib.Path:
+    return cache_dir() / "config"
+
+
+def _config_cache_file(executable: pathlib.Path) -> pathlib.Path:
+    digest = hashlib.sha1(executable.as_posix().encode("utf-8")).hexdigest()
+    return _config_cache_dir() / f"{digest}.json"
+
+
+def _fingerprint(executable: pathlib.Path) -> Dict[str, int]:
+    stat = executable.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _load_config(executable: pathlib.Path) -> Dict[str, str]:
+    """
+    Return the cached `--config` values of `executable`.
+
+    An empty dictionary is returned if there is no cache entry or if the
+    executable has changed since the entry was written.
+    """
+    try:
+        with _config_cache_file(executable).open() as fd:
+            entry = json.load(fd)
+    except (OSError, ValueError):
+        return {}
+    if entry.get("fingerprint") != _fingerprint(executable):
+        return {}
+    return entry.get("values", {})
+
+
+def _store_config(executable: pathlib.Path, values: Dict[str, str]) -> None:
+    """ Atomically write the `--config` values of `executable` to the cache. """
+    path = _config_cache_file(executable)
+    entry = {
+        "executable": executable.as_posix(),
+        "fingerprint": _fingerprint(executable),
+        "values": values,
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as stream:
+            json.dump(entry, stream)
+        os.replace(tmp, path)
+    except OSError as exc:
+        # The cache is an optimization; failing to write it must not be fatal.
+        logger.debug(f"Could not write config cache {path}: {exc}")
+
+
+def get_config(
+    executable: Union[str, pathlib.Path], key: str, use_cache: Optional[bool] = None
+) -> str:
+    """
+    Return the output of `grass --config <key>` for the given `executable`.
+
+    Parameters
+    ----------
+
+    executable:
+        The path to the GRASS executable.
+    key:
+        The `--config` key, e.g. `path`, `version`, `revision` etc.
+    use_cache:
+        Whether to use the on-disk cache. If it is `None`, then the cache is used
+        unless `$GST_NO_CACHE` has been set.
+
+    Raises
+    ------
+    ValueError:
+        If the command fails or if its output is empty.
+
+    """
+    if use_cache is None:
+        use_cache = cache_enabled()
+    resolved = pathlib.Path(executable).resolve()
+    values = _load_config(resolved) if use_cache else {}
+    if key in values:
+        return values[key]
+    logger.debug(f"Running: {executable} --config {key}")
+    p = delegator.run(f"{executable} --config {key}")
+    value = p.out.strip()
+    if p.return_code != 0 or not value:
+        # Don't cache failures; they would be returned by every later call
+        raise ValueError(
+            f"Failed to run `{executable} --config {key}` "
+            f"(exit code {p.return_code}): {p.err.strip()}"
+        )
+    if use_cache:
+        # re-read in order to avoid overwriting entries written by other processes
+        values = _load_config(resolved)
+        values[key] = value
+        _store_config(resolved, values)
+    return value
@@ -0,0 +1,492 @@
+"""
+Read the cells of raster maps straight from their data files, without GRASS.
+
+For maps that are not compressed, the `cell`/`fcell` element is a flat, row-major
+array of big endian values whose shape and type are described by `cellhd`, so it can
+be memory mapped. `CellFile.memmap()` returns such a view: sampling cells or reading a
+window of a large map only reads the pages that are touched, without starting a
+session, calling the raster library or copying the map::
+
+    cells = gst.CellFile("/path/to/location", "elevation@PERMANENT")
+    window = cells.array()[1000:1100, 2000:2100]
+
+Compressed maps can't be mapped; `CellFile.read()` and `CellFile.iter_blocks()`
+decompress their rows with a pool of threads instead (`array()` picks whichever of the
+two applies), which is much faster than reading a map row by row with the raster
+library, e.g. in order to compute statistics. Note that the cells are the ones
+of the map itself, i.e. its own region and resolution, not the computational region.
+
+NumPy is required. The LZ4 and ZSTD compressed maps use the `lz4` and `zstandard`
+packages, if they are installed.
+"""
+from __future__ import annotations
+
+import bz2
+import concurrent.futures
+import importlib
+import logging
+import os
+import pathlib
+import typing
+import zlib
+from collections import deque
+from types import ModuleType
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .array import _numpy
+from .index import RasterIndex
+from .region import read_header
+from .region import Region
+
+if typing.TYPE_CHECKING:
+    import numpy  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["CellFile", "open_cells"]
+
+# The values of the `compressed` entry of `cellhd`
+NO_COMPRESSION = 0
+RLE = 1
+ZLIB = 2
+LZ4 = 3
+BZIP2 = 4
+ZSTD = 5
+
+# The NumPy dtypes of the values of the data files of floating point maps
+_FP_DTYPES = {"FCELL": ">f4", "DCELL": ">f8"}
+
+# The dtypes of the decoded rows
+_DTYPES = {"CELL": "int32", "FCELL": "float32", "DCELL": "float64"}
+
+
+def _import_optional(*names: str) -> Optional[ModuleType]:
+    for name in names:
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    return None
+
+
+def _rle_expand(data: bytes, size: int) -> bytes:
+    """
+    Expand the run-length encoding of `G_rle_compress()`: a run of a byte is stored as
+    the byte twice followed by the length of the run.
+    """
+    expanded = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i : i + 1]
+        if data[i + 1 : i + 2] == byte and i + 2 < len(data):
+            expanded += byte * data[i + 2]
+            i += 3
+        else:
+            expanded += byte
+            i += 1
+    return bytes(expanded)
+
+
+def _lz4_expand(data: bytes, size: int) -> bytes:
+    """ Decompress an LZ4 block (not frame) that expands to `size` bytes """
+    lz4 = _import_optional("lz4.block")
+    if lz4 is not None:
+        return lz4.decompress(data, uncompressed_size=size)
+    expanded = bytearray()
+    i = 0
+    while i < len(data):
+        token = data[i]
+        i += 1
+        literals = token >> 4
+        if literals == 15:
+            while True:
+                literals += data[i]
+                i += 1
+                if data[i - 1] != 255:
+                    break
+        expanded += data[i : i + literals]
+        i += literals
+        if i >= len(data):
+            # The last sequence only has literals
+            break
+        offset = data[i] | data[i + 1] << 8
+        i += 2
+        length = token & 15
+        if length == 15:
+            while True:
+                length += data[i]
+                i += 1
+                if data[i - 1] != 255:
+                    break
+        length += 4
+        start = len(expanded) - offset
+        if offset >= length:
+            expanded += expanded[start : start + length]
+        else:
+            # The match overlaps the bytes that it produces
+            for j in range(length):
+                expanded.append(expanded[start + j])
+    return bytes(expanded)
+
+
+def _zstd_expand(data: bytes, size: int) -> bytes:
+    zstd = _import_optional("zstandard")
+    if zstd is not None:
+        return zstd.ZstdDecompressor().decompress(data, max_output_size=size)
+    zstd = _import_optional("compression.zstd")
+    if zstd is not None:
+        return zstd.decompress(data)
+    raise ImportError("Reading ZSTD compressed maps requires zstandard")
+
+
+# The decompressors of `G_expand()`, by compression method
+_EXPANDERS: Dict[int, Callable[[bytes, int], bytes]] = {
+    RLE: _rle_expand,
+    ZLIB: lambda data, size: zlib.decompress(data),
+    LZ4: _lz4_expand,
+    BZIP2: lambda data, size: bz2.decompress(data),
+    ZSTD: _zstd_expand,
+}
+
+
+def _expand(data: bytes, size: int, method: int) -> bytes:
+    try:
+        expander = _EXPANDERS[method]
+    except KeyError:
+        raise ValueError(f"Unknown compression method: {method}") from None
+    expanded = expander(data, size)
+    if len(expanded) != size:
+        raise ValueError(f"Expected {size} decompressed bytes, not {len(expanded)}")
+    return expanded
+
+
+def _read_row_pointers(fd: typing.BinaryIO, rows: int) -> List[int]:
+    """
+    Read the offsets of the rows from the start of a compressed data file: a byte with
+    the size of the offsets, followed by `rows + 1` big endian offsets.
+    """
+    fd.seek(0)
+    size = fd.read(1)
+    if not size or not size[0]:
+        raise ValueError(f"Invalid row pointers: {fd.name}")
+    data = fd.read(size[0] * (rows + 1))
+    if len(data) != size[0] * (rows + 1):
+        raise ValueError(f"Truncated row pointers: {fd.name}")
+    return [
+        int.from_bytes(data[i : i + size[0]], "big")
+        for i in range(0, len(data), size[0])
+    ]
+
+
+class CellFile(object):
+    """
+    The data files of the raster map `name` of the Location at `location`.
+
+    The map is looked up with `RasterIndex`, so if `name` is not qualified with a
+    mapset, the mapsets are searched in alphabetical order, with `PERMANENT` last.
+
+    Attributes
+    ----------
+    name, mapset:
+        The name of the map and of the mapset that contains it.
+    region:
+        The region of the map; the arrays have `(region.rows, region.cols)` cells.
+    type:
+        `"CELL"`, `"FCELL"` or `"DCELL"`.
+    compressed:
+        The compression method; 0 means that the map is not compressed.
+    nbytes:
+        The number of bytes of each cell in the data file.
+
+    """
+
+    def __init__(self, location: Union[str, pathlib.Path], name: str) -> None:
+        info = RasterIndex.get(location)[name]
+        self.name = info.name
+        self.mapset = info.mapset
+        self.region: Region = info.region
+        self.type = info.type
+        self.compressed = info.compressed
+        self.range = info.range
+        self.path = pathlib.Path(location).resolve() / info.mapset
+        if self.type == "CELL":
+            header = read_header(self.path / "cellhd" / self.name)
+            self.nbytes = int(header.get("format", 3)) + 1
+            self.data_path = self.path / "cell" / self.name
+        else:
+            self.nbytes = 4 if self.type == "FCELL" else 8
+            self.data_path = self.path / "fcell" / self.name
+        if self.compressed < 0:
+            raise ValueError(f"Unsupported pre-3.0 compression of map: {name}")
+
+    def __repr__(self) -> str:
+        return f"<CellFile: {self.name}@{self.mapset} ({self.type})>"
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.region.rows, self.region.cols
+
+    @property
+    def dtype(self) -> str:
+        """ The dtype of the arrays returned by `read()`. """
+        return _DTYPES[self.type]
+
+    @property
+    def can_memmap(self) -> bool:
+        """
+        Whether the data file can be mapped, i.e. the map is not compressed and its
+        values are stored in a format that NumPy understands.
+
+        The integer values of CELL maps are stored as sign and magnitude, whatever the
+        number of bytes of the cells, so CELL maps can only be mapped when they don't
+        contain negative values.
+        """
+        if self.compressed:
+            return False
+        if self.type != "CELL":
+            return True
+        if self.nbytes not in (1, 2, 4):
+            return False
+        return self.range is not None and self.range[0] >= 0
+
+    def memmap(self) -> numpy.memmap:
+        """
+        Return a read-only memory mapped view of the data file.
+
+        The dtype is the big endian type of the file, e.g. `>f8` for DCELL maps. The
+        null cells are not masked; see `null_mask()`.
+
+        Raises
+        ------
+        ValueError:
+            If the map can't be mapped; see `can_memmap`.
+        """
+        if not self.can_memmap:
+            raise ValueError(f"The data file of {self.name} can't be memory mapped")
+        numpy = _numpy()
+        if self.type == "CELL":
+            dtype = {1: ">u1", 2: ">u2", 4: ">i4"}[self.nbytes]
+        else:
+            dtype = _FP_DTYPES[self.type]
+        return numpy.memmap(self.data_path, dtype=dtype, mode="r", shape=self.shape)
+
+    def _decode(self, data: bytes, nbytes: int) -> numpy.ndarray:
+        """ Convert the bytes of a row to an array of `self.dtype` """
+        numpy = _numpy()
+        if self.type != "CELL":
+            return numpy.frombuffer(data, dtype=_FP_DTYPES[self.type]).astype(
+                self.dtype
+            )
+        cells = numpy.frombuffer(data, dtype="u1").reshape(-1, nbytes)
+        # Sign and magnitude; the sign is the highest bit of the first byte
+        negative = cells[:, 0] >= 0x80
+        cells = cells.copy()
+        cells[:, 0] &= 0x7F
+        values = numpy.zeros(len(cells), dtype="int64")
+        for i in range(nbytes):
+            values = values << 8 | cells[:, i]
+        values[negative] = -values[negative]
+        return values.astype(self.dtype)
+
+    def _expand_row(self, data: bytes) -> Tuple[bytes, int]:
+        """ Decompress a row of a data file; return its bytes and their `nbytes` """
+        cols = self.region.cols
+        if self.type == "CELL":
+            # The first byte is the number of bytes of the cells of the row, and the
+            # row is stored as is unless compression makes it smaller
+            nbytes, data = data[0], data[1:]
+            size = cols * nbytes
+            if len(data) >= size:
+                return data[:size], nbytes
+            if self.compressed == RLE:
+                # (count, value) pairs of `nbytes` values
+                step = nbytes + 1
+                expanded = b"".join(
+                    data[i + 1 : i + step] * data[i]
+                    for i in range(0, len(data) - nbytes, step)
+                )
+                return expanded, nbytes
+            return _expand(data, size, self.compressed), nbytes
+        # The first byte is "1" if the row is compressed and "0" if it isn't
+        size = cols * self.nbytes
+        flag, data = data[:1], data[1:]
+        if flag == b"0":
+            return data[:size], self.nbytes
+        if flag != b"1":
+            raise ValueError(f"Invalid row of {self.name}: {flag!r}")
+        # Floating point maps are never RLE compressed; `compressed: 1` is the legacy
+        # marker of zlib compression, just like the raster library assumes
+        method = ZLIB if self.compressed == RLE else self.compressed
+        return _expand(data, size, method), self.nbytes
+
+    def _read_block(
+        self, fd: int, pointers: List[int], first: int, last: int
+    ) -> numpy.ndarray:
+        """ Read and decode the rows from `first` to `last` of a compressed map """
+        numpy = _numpy()
+        block = numpy.empty((last - first, self.region.cols), dtype=self.dtype)
+        # `pread()` doesn't move the offset of `fd`, so the threads can share it
+        data = os.pread(fd, pointers[last] - pointers[first], pointers[first])
+        for i, row in enumerate(range(first, last)):
+            begin = pointers[row] - pointers[first]
+            end = pointers[row + 1] - pointers[first]
+            block[i] = self._decode(*self._expand_row(data[begin:end]))
+        return block
+
+    def iter_blocks(
+        self,
+        chunk: int = 256,
+        *,
+        start: int = 0,
+        stop: Optional[int] = None,
+        max_workers: Optional[int] = None,
+    ) -> Iterator[Tuple[int, numpy.ndarray]]:
+        """
+        Read the rows from `start` to `stop` (exclusive) in blocks of `chunk` rows and
+        yield `(row, block)` tuples, where `row` is the index of the first row of the
+        block. The null cells are not masked; see `null_mask()`.
+
+        The blocks of compressed maps are decompressed in parallel by a thread pool
+        of `max_workers` threads; `1` reads them in the calling thread. The zlib,
+        bzip2 and ZSTD (and LZ4 when the `lz4` package is installed) decompressors
+        release the GIL, so this scales with the number of cores. Only a few blocks
+        per thread are kept in memory, so this can also scan maps that don't fit in
+        memory, e.g. in order to compute statistics::
+
+            total = sum(block.sum() for _, block in cells.iter_blocks())
+
+        """
+        if chunk < 1:
+            raise ValueError(f"chunk must be a positive integer, not: {chunk}")
+        start, stop, _ = slice(start, stop).indices(self.region.rows)
+        ranges = [
+            (first, min(first + chunk, stop)) for first in range(start, stop, chunk)
+        ]
+        if not self.compressed:
+            array = self.memmap() if self.can_memmap else None
+            with open(self.data_path, "rb") as file:
+                row_size = self.region.cols * self.nbytes
+                for first, last in ranges:
+                    if array is not None:
+                        yield first, array[first:last].astype(self.dtype)
+                        continue
+                    file.seek(first * row_size)
+                    data = file.read((last - first) * row_size)
+                    block = self._decode(data, self.nbytes)
+                    yield first, block.reshape(last - first, -1)
+            return
+        with open(self.data_path, "rb") as file:
+            pointers = _read_row_pointers(file, self.region.rows)
+        fileno = os.open(self.data_path, os.O_RDONLY)
+        try:
+            if max_workers == 1 or len(ranges) < 2:
+                for first, last in ranges:
+                    yield first, self._read_block(fileno, pointers, first, last)
+                return
+            # The default of `ThreadPoolExecutor`
+            workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures: Deque[Tuple[int, concurrent.futures.Future]] = deque()
+                for first, last in ranges:
+                    future = executor.submit(
+                        self._read_block, fileno, pointers, first, last
+                    )
+                    futures.append((first, future))
+                    # Bound the number of blocks that are in memory at the same time
+                    if len(futures) >= 2 * workers:
+                        first, future = futures.popleft()
+                        yield first, future.result()
+                while futures:
+                    first, future = futures.popleft()
+                    yield first, future.result()
+        finally:
+            os.close(fileno)
+
+    def read(
+        self,
+        start: int = 0,
+        stop: Optional[int] = None,
+        *,
+        max_workers: Optional[int] = None,
+    ) -> numpy.ndarray:
+        """
+        Read the rows from `start` to `stop` (exclusive) and return them as an array
+        of `self.dtype`. The null cells are not masked; see `null_mask()`.
+
+        Compressed maps are decompressed in parallel; see `iter_blocks()`.
+        """
+        numpy = _numpy()
+        start, stop, _ = slice(start, stop).indices(self.region.rows)
+        array = numpy.empty((max(stop - start, 0), self.region.cols), dtype=self.dtype)
+        blocks = self.iter_blocks(start=start, stop=stop, max_workers=max_workers)
+        for first, block in blocks:
+            array[first - start : first - start + len(block)] = block
+        return array
+
+    def null_mask(self, start: int = 0, stop: Optional[int] = None) -> numpy.ndarray:
+        """
+        Return a boolean array that is `True` for the null cells of the rows from
+        `start` to `stop`. Maps without a null file don't have null cells.
+        """
+        numpy = _numpy()
+        start, stop, _ = slice(start, stop).indices(self.region.rows)
+        rows = max(stop - start, 0)
+        cols = self.region.cols
+        size = (cols + 7) // 8
+        misc = self.path / "cell_misc" / self.name
+        bitmap = numpy.zeros((rows, size), dtype="u1")
+        if (misc / "nullcmpr").exists():
+            with open(misc / "nullcmpr", "rb") as fd:
+                pointers = _read_row_pointers(fd, self.region.rows)
+                for i, row in enumerate(range(start, stop)):
+                    fd.seek(pointers[row])
+                    data = fd.read(pointers[row + 1] - pointers[row])
+                    if len(data) != size:
+                        data = _expand(data, size, LZ4)
+                    bitmap[i] = numpy.frombuffer(data, dtype="u1")
+        elif (misc / "null").exists():
+            with open(misc / "null", "rb") as fd:
+                fd.seek(start * size)
+                data = fd.read(rows * size)
+                bitmap.flat[: len(data)] = numpy.frombuffer(data, dtype="u1")
+        # The bits are in most significant bit first order and 1 means null
+        return numpy.unpackbits(bitmap, axis=1)[:, :cols].astype(bool)
+
+    def array(self) -> numpy.ndarray:
+        """ Return `memmap()` if the data file can be mapped, otherwise `read()`. """
+        if self.can_memmap:
+            return self.memmap()
+        logger.debug(f"Decompressing raster map: {self.name}@{self.mapset}")
+        return self.read()
+
+
+def open_cells(
+    location: Union[str, pathlib.Path], name: str, *, masked: bool = False
+) -> numpy.ndarray:
+    """
+    Return the cells of the raster map `name` of the Location at `location`, as a
+    memory mapped view if possible and as an in-memory array otherwise.
+
+    Parameters
+    ----------
+
+    location:
+        The path to the Location.
+    name:
+        The name of the map, optionally qualified with a mapset (`name@mapset`).
+    masked:
+        Whether to return a masked array in which the null cells are masked.
+
+    """
+    cells = CellFile(location, name)
+    array = cells.array()
+    if masked:
+        array = _numpy().ma.masked_array(array, mask=cells.null_mask())
+    return array
@@ -0,0 +1,126 @@
+"""
+Deferred, background deletion of directories (e.g. temporary mapsets).
+
+Removing a mapset that contains gigabytes of raster data can take a long time. Instead
+of waiting for it, `defer_delete()` atomically renames the directory to a "tombstone"
+(a hidden sibling whose name starts with `.gst_tombstone_`), which GRASS ignores, and
+deletes it in a background thread. Whatever is still pending when the interpreter exits
+is handed over to a detached process, so exiting is not delayed either. Tombstones left
+behind by processes that crashed can be removed with `sweep_tombstones()`.
+"""
+import atexit
+import logging
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import uuid
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Union
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["defer_delete", "sweep_tombstones", "wait_for_deletions"]
+
+TOMBSTONE_PREFIX = ".gst_tombstone_"
+
+_queue: queue.Queue = queue.Queue()
+# The tombstones that have been scheduled but not deleted yet
+_pending: Set[str] = set()
+_pending_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+
+
+def _delete_tombstones() -> None:
+    while True:
+        path = _queue.get()
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+            logger.debug(f"Deleted tombstone: {path}")
+        finally:
+            with _pending_lock:
+                _pending.discard(path)
+            _queue.task_done()
+
+
+def _schedule(path: str) -> None:
+    global _worker
+    with _pending_lock:
+        _pending.add(path)
+        if _worker is None:
+            _worker = threading.Thread(
+                target=_delete_tombstones, name="gst-cleanup", daemon=True
+            )
+            _worker.start()
+    _queue.put(path)
+
+
+def defer_delete(path: Union[str, pathlib.Path]) -> pathlib.Path:
+    """
+    Rename the directory `path` to a tombstone, schedule its deletion in the background
+    and return the path of the tombstone.
+    """
+    path = pathlib.Path(path)
+    tombstone = path.with_name(f"{TOMBSTONE_PREFIX}{path.name}_{uuid.uuid4().hex}")
+    os.rename(path, tombstone)
+    _schedule(tombstone.as_posix())
+    return tombstone
+
+
+def wait_for_deletions() -> None:
+    """ Block until all the scheduled deletions have finished. """
+    _queue.join()
+
+
+def sweep_tombstones(
+    directory: Union[str, pathlib.Path], wait: bool = True
+) -> List[pathlib.Path]:
+    """
+    Delete the tombstones that exist in `directory` (e.g. a Location) and return them.
+
+    Tombstones that are scheduled for deletion by this process are skipped.
+
+    Parameters
+    ----------
+
+    directory:
+        The directory containing the tombstones.
+    wait:
+        If `False`, then the tombstones are deleted in the background.
+
+    """
+    with _pending_lock:
+        pending = set(_pending)
+    tombstones = [
+        path
+        for path in pathlib.Path(directory).iterdir()
+        if path.name.startswith(TOMBSTONE_PREFIX) and path.as_posix() not in pending
+    ]
+    for tombstone in tombstones:
+        if wait:
+            shutil.rmtree(tombstone, ignore_errors=True)
+        else:
+            _schedule(tombstone.as_posix())
+    return tombstones
+
+
+@atexit.register
+def _hand_over_pending_deletions() -> None:
+    """ Delete whatever is still pending in a detached process. """
+    with _pending_lock:
+        pending = sorted(_pending)
+    if not pending:
+        return
+    script = "import shutil, sys\nfor p in sys.argv[1:]: shutil.rmtree(p, True)"
+    subprocess.Popen(
+        [sys.executable, "-c", script, *pending],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
@@ -0,0 +1,209 @@
+"""
+Cheap cloning of GRASS Locations, for isolated (e.g. test or sandbox) sessions.
+
+Copying a Location with real data takes time proportional to its size. Cloning avoids
+copying the data when the filesystem allows it:
+
+- `reflink`: the files are cloned with the `FICLONE` ioctl (copy-on-write filesystems
+  like Btrfs or XFS). The clone is fully independent of the source.
+- `hardlink`: the raster data files (`cell`, `fcell` and the null files) are
+  hardlinked and everything else is copied. GRASS never modifies raster data files in
+  place (it writes a new file and renames it), so this is safe as long as the source
+  and the clone are only modified through GRASS.
+- `symlink`: the mapsets of the clone are symlinks to the source mapsets and a new,
+  empty "overlay" mapset is created for writing. The source mapsets must be treated as
+  read-only.
+- `copy`: a plain copy.
+
+The default, `auto`, tries `reflink`, then `hardlink` and finally `copy`, per file.
+"""
+import errno
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import uuid
+from typing import Any
+from typing import Iterable
+from typing import Optional
+from typing import Union
+
+from .location import create_mapset
+from .session import Session
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["clone_location", "clone_session"]
+
+MODES = ("auto", "reflink", "hardlink", "symlink", "copy")
+
+# From linux/fs.h
+FICLONE = 0x40049409
+
+# The errors that mean "the filesystem can't do this"
+_UNSUPPORTED = {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EPERM}
+
+# The mapset elements whose files GRASS replaces instead of modifying in place
+_HARDLINK_ELEMENTS = {"cell", "fcell"}
+_HARDLINK_MISC_FILES = {"null", "nullcmpr"}
+
+
+def _reflink(source: str, destination: str) -> None:
+    import fcntl
+
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(destination)
+            raise
+
+
+def _can_hardlink(relative: pathlib.Path) -> bool:
+    parts = relative.parts
+    if parts[0] in _HARDLINK_ELEMENTS:
+        return True
+    return parts[0] == "cell_misc" and parts[-1] in _HARDLINK_MISC_FILES
+
+
+class _Cloner(object):
+    """ Clones files, falling back to cheaper methods when the filesystem refuses """
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.reflink = mode in ("auto", "reflink")
+        self.hardlink = mode in ("auto", "hardlink")
+
+    def clone_file(self, source: str, destination: str, relative: pathlib.Path) -> None:
+        if self.reflink:
+            try:
+                _reflink(source, destination)
+                return
+            except OSError as exc:
+                if exc.errno not in _UNSUPPORTED or self.mode == "reflink":
+                    raise
+                logger.debug(f"reflinks are not supported, falling back: {exc}")
+                self.reflink = False
+        if self.hardlink and _can_hardlink(relative):
+            try:
+                os.link(source, destination)
+                return
+            except OSError as exc:
+                if exc.errno not in _UNSUPPORTED:
+                    raise
+                logger.debug(f"hardlinks are not supported, falling back: {exc}")
+                self.hardlink = False
+        shutil.copy2(source, destination)
+
+    def clone_mapset(self, source: pathlib.Path, destination: pathlib.Path) -> None:
+        for root, dirs, files in os.walk(source):
+            relative_root = pathlib.Path(root).relative_to(source)
+            (destination / relative_root).mkdir(parents=True, exist_ok=True)
+            for name in files:
+                self.clone_file(
+                    os.path.join(root, name),
+                    (destination / relative_root / name).as_posix(),
+                    relative_root / name,
+                )
+
+
+def _overlay_name() -> str:
+    return f"overlay_{uuid.uuid4().hex[:8]}"
+
+
+def clone_location(
+    source: Union[str, pathlib.Path],
+    destination: Union[str, pathlib.Path],
+    *,
+    mapsets: Optional[Iterable[str]] = None,
+    mode: str = "auto",
+    overlay: Optional[str] = None,
+) -> pathlib.Path:
+    """
+    Clone the Location `source` to `destination` and return the path of the clone.
+
+    Parameters
+    ----------
+
+    source:
+        The path to the Location that will be cloned.
+    destination:
+        The path of the clone. It must not exist.
+    mapsets:
+        The names of the mapsets to clone. Defaults to all of them. `PERMANENT` is
+        always cloned.
+    mode:
+        One of `auto`, `reflink`, `hardlink`, `symlink` or `copy`. See `gst.clone`.
+    overlay:
+        The name of an empty mapset that will be created in the clone. It is required
+        by the `symlink` mode, where it defaults to a random name.
+
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, not: {mode}")
+    source = pathlib.Path(source).resolve()
+    destination = pathlib.Path(destination)
+    if mapsets is None:
+        names = {path.name for path in source.iterdir() if (path / "WIND").exists()}
+    else:
+        names = set(mapsets)
+    names.add("PERMANENT")
+    destination.mkdir(parents=True)
+    cloner = _Cloner(mode)
+    for name in sorted(names):
+        if mode == "symlink":
+            (destination / name).symlink_to(source / name, target_is_directory=True)
+        else:
+            cloner.clone_mapset(source / name, destination / name)
+    if mode == "symlink" and overlay is None:
+        overlay = _overlay_name()
+    if overlay is not None:
+        create_mapset(destination, overlay)
+    logger.debug(f"Cloned {source} to {destination} ({mode})")
+    return destination
+
+
+def clone_session(
+    source: Union[str, pathlib.Path],
+    *,
+    gisdbase: Optional[Union[str, pathlib.Path]] = None,
+    mapsets: Optional[Iterable[str]] = None,
+    mode: str = "auto",
+    overlay: Optional[str] = None,
+    **session_kwargs: Any,
+) -> Session:
+    """
+    Clone the Location `source` and return a `Session` for the clone.
+
+    The session uses the overlay mapset, if there is one, or `PERMANENT` otherwise
+    (unless `mapset` is passed explicitly). The rest of the keyword arguments are
+    passed to `Session`.
+
+    Parameters
+    ----------
+
+    source:
+        The path to the Location that will be cloned.
+    gisdbase:
+        The GISDBASE of the clone. Defaults to a new temporary directory, which the
+        caller is responsible for removing.
+    mapsets, mode, overlay:
+        See `clone_location()`.
+
+    """
+    if gisdbase is None:
+        gisdbase = tempfile.mkdtemp(prefix="gst_gisdbase_")
+    source = pathlib.Path(source)
+    if mode == "symlink" and overlay is None:
+        overlay = _overlay_name()
+    location = clone_location(
+        source,
+        pathlib.Path(gisdbase) / source.name,
+        mapsets=mapsets,
+        mode=mode,
+        overlay=overlay,
+    )
+    session_kwargs.setdefault("mapset", overlay or "PERMANENT")
+    return Session(location=location, **session_kwargs)
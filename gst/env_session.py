@@ -0,0 +1,295 @@
+"""
+GRASS sessions that don't touch the global state of the process.
+
+`gst.Session` works by modifying `os.environ` and `sys.path`, which means that there
+can only be a single active session per process. `EnvSession` instead builds a
+private environment dictionary and a private `$GISRC` file and uses them to run GRASS
+modules as subprocesses. Many `EnvSession` instances, even on different mapsets, can
+be used concurrently, e.g. from the threads of a `ThreadPoolExecutor`.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import subprocess
+import tempfile
+import typing
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from .gisrc import write_gisrc
+from .grass_bin import Grass
+from .session import _mapset_sanity_check
+
+if typing.TYPE_CHECKING:
+    from .batch import Batch
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["EnvSession", "make_command", "grass_environment"]
+
+
+def make_command(
+    module: str,
+    flags: str = "",
+    overwrite: bool = False,
+    quiet: bool = False,
+    verbose: bool = False,
+    superquiet: bool = False,
+    **options: Any,
+) -> List[str]:
+    """
+    Return the command line of a GRASS module as a list of arguments.
+
+    This follows the conventions of `grass.script.make_command()`: options whose
+    value is `None` are skipped, sequences are joined with commas and a trailing
+    underscore is stripped from the option names (e.g. `lambda_`).
+    """
+    args = [module]
+    if overwrite:
+        args.append("--o")
+    if quiet:
+        args.append("--q")
+    if verbose:
+        args.append("--v")
+    if superquiet:
+        args.append("--qq")
+    if flags:
+        args.append(f"-{flags}")
+    for key, value in options.items():
+        if value is None:
+            continue
+        if key.endswith("_"):
+            key = key[:-1]
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(item) for item in value)
+        args.append(f"{key}={value}")
+    return args
+
+
+def grass_environment(
+    grass: Grass, gisrc: Union[str, pathlib.Path], base: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    """
+    Return the environment variables needed in order to run GRASS modules.
+
+    This is the subset of `grass.script.setup.init()` that is relevant for running
+    modules as subprocesses, but the result is returned instead of being applied to
+    `os.environ`.
+
+    Parameters
+    ----------
+
+    grass:
+        The GRASS installation.
+    gisrc:
+        The path to the `$GISRC` file.
+    base:
+        The environment that will be extended. Defaults to a copy of `os.environ`.
+
+    """
+    env = dict(os.environ if base is None else base)
+    gisbase = grass.gisbase.as_posix()
+    addon_base = env.get("GRASS_ADDON_BASE") or os.path.expanduser("~/.grass7/addons")
+
+    def prepend(name: str, *entries: str) -> None:
+        existing = env.get(name)
+        env[name] = os.pathsep.join(entries + ((existing,) if existing else ()))
+
+    env["GISBASE"] = gisbase
+    env["GISRC"] = pathlib.Path(gisrc).as_posix()
+    env["GIS_LOCK"] = str(os.getpid())
+    env["GRASS_ADDON_BASE"] = addon_base
+    env.setdefault("GRASS_PYTHON", "python3")
+    prepend(
+        "PATH",
+        os.path.join(gisbase, "bin"),
+        os.path.join(gisbase, "scripts"),
+        os.path.join(addon_base, "bin"),
+        os.path.join(addon_base, "scripts"),
+    )
+    prepend("LD_LIBRARY_PATH", os.path.join(gisbase, "lib"))
+    prepend("PYTHONPATH", grass.python_lib.as_posix())
+    return env
+
+
+class EnvSession(object):
+    """
+    A GRASS session that lives in a private environment instead of `os.environ`.
+
+    While the session is active, `env` holds the environment that GRASS modules need
+    and the `*_command()` methods run modules with it. The process globals are never
+    modified, so the session is thread-safe.
+
+    Attributes
+    ----------
+    location:
+        The path to the GRASS Location
+    mapset:
+        The path to the GRASS Mapset
+    grass:
+        The GRASS installation
+    gisdbase:
+    env:
+        The environment of the session. Only available while the session is active.
+    is_active:
+        A boolean property indicating whether the session is active or not
+
+    Parameters
+    ----------
+
+    location:
+        The path to the GRASS Location
+    mapset:
+        The path to the GRASS Mapset
+    grass:
+        The GRASS executable.
+
+    Raises
+    ------
+    ValueError:
+        If the GRASS executable or the mapset cannot be found.
+
+    """
+
+    location: pathlib.Path
+    mapset: pathlib.Path
+    grass: Grass
+    gisdbase: pathlib.Path
+    _env: Optional[Dict[str, str]]
+
+    def __init__(
+        self,
+        location: Union[str, pathlib.Path],
+        mapset: Union[str, pathlib.Path] = "PERMANENT",
+        grass: Optional[Union[str, pathlib.Path, Grass]] = None,
+    ) -> None:
+        self.location = pathlib.Path(location).resolve()
+        self.mapset = self.location / mapset
+        self.grass = grass if isinstance(grass, Grass) else Grass.get(grass)
+        self.gisdbase = self.location.parent
+        self._env = None
+        _mapset_sanity_check(self.mapset)
+
+    @property
+    def is_active(self) -> bool:
+        return self._env is not None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        if self._env is None:
+            raise ValueError(f"The session is not active: {self}")
+        return self._env
+
+    def __repr__(self) -> str:
+        return f"<GRASS EnvSession: {self.mapset.as_posix()}>"
+
+    def __enter__(self) -> EnvSession:
+        fd, gisrc = tempfile.mkstemp(prefix="gst_gisrc_")
+        os.close(fd)
+        write_gisrc(
+            gisrc,
+            {
+                "GISDBASE": self.gisdbase.as_posix(),
+                "LOCATION_NAME": self.location.name,
+                "MAPSET": self.mapset.name,
+                "GUI": "text",
+            },
+        )
+        self._env = grass_environment(self.grass, gisrc)
+        logger.debug(f"Entering GRASS env session: {self.mapset}")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        env = self.env
+        # The equivalent of `grass.script.setup.finish()`
+        clean_temp = self.grass.gisbase / "etc" / "clean_temp"
+        if clean_temp.exists():
+            subprocess.run([clean_temp.as_posix()], env=env, check=False)
+        os.remove(env["GISRC"])
+        self._env = None
+        logger.debug(f"Exiting GRASS env session: {self.mapset}")
+
+    def batch(self, check: bool = True, timeout: Optional[float] = None) -> Batch:
+        """
+        Return a `gst.Batch` that runs GRASS modules in this session through a single
+        shell.
+
+        The batch follows `env`, so changes made to it (e.g. region overrides) apply to
+        the commands that are submitted afterwards. See `gst.Batch` for `check` and
+        `timeout`.
+        """
+        from .batch import Batch
+
+        return Batch(env=self.env, check=check, follow=True, timeout=timeout)
+
+    def start_command(
+        self,
+        module: str,
+        *,
+        stdin: Any = None,
+        stdout: Any = None,
+        stderr: Any = None,
+        **kwargs: Any,
+    ) -> subprocess.Popen:
+        """
+        Start a GRASS module and return the `subprocess.Popen` object.
+
+        The keyword arguments are converted to a command line with `make_command()`.
+        """
+        args = make_command(module, **kwargs)
+        logger.debug(f"Running: {args}")
+        return subprocess.Popen(
+            args, stdin=stdin, stdout=stdout, stderr=stderr, env=self.env
+        )
+
+    def _communicate(self, module: str, stdin: Optional[str], **kwargs: Any) -> str:
+        process = self.start_command(
+            module,
+            stdin=subprocess.PIPE if stdin is not None else None,
+            stdout=subprocess.PIPE,
+            **kwargs,
+        )
+        stdout, _ = process.communicate(stdin.encode() if stdin is not None else None)
+        if process.returncode:
+            raise subprocess.CalledProcessError(
+                process.returncode, process.args, stdout
+            )
+        return stdout.decode()
+
+    def run_command(self, module: str, **kwargs: Any) -> None:
+        """
+        Run a GRASS module and wait for it to finish.
+
+        Raises
+        ------
+        subprocess.CalledProcessError:
+            If the module exits with a non-zero status.
+        """
+        process = self.start_command(module, **kwargs)
+        if process.wait():
+            raise subprocess.CalledProcessError(process.returncode, process.args)
+
+    def read_command(self, module: str, **kwargs: Any) -> str:
+        """ Run a GRASS module and return its standard output. """
+        return self._communicate(module, None, **kwargs)
+
+    def write_command(self, module: str, stdin: str, **kwargs: Any) -> str:
+        """ Run a GRASS module, feed `stdin` to it and return its standard output. """
+        return self._communicate(module, stdin, **kwargs)
+
+    def parse_command(self, module: str, **kwargs: Any) -> Dict[str, str]:
+        """
+        Run a GRASS module whose output consists of `key=value` lines (e.g. `r.info -g`)
+        and return it as a dictionary.
+        """
+        result: Dict[str, str] = {}
+        for line in self.read_command(module, **kwargs).splitlines():
+            key, sep, value = line.partition("=")
+            if sep:
+                result[key.strip()] = value.strip()
+        return result
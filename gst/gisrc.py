@@ -0,0 +1,60 @@
+"""
+Helpers for reading and writing GRASS `$GISRC` files.
+
+A `$GISRC` file contains one `KEY: value` entry per line, e.g.::
+
+    GISDBASE: /path/to/gisdbase
+    LOCATION_NAME: epsg4326
+    MAPSET: PERMANENT
+    GUI: text
+
+"""
+import os
+import pathlib
+import tempfile
+from typing import Dict
+from typing import Union
+
+__all__ = ["read_gisrc", "write_gisrc", "update_gisrc"]
+
+
+def _read_entries(path: Union[str, pathlib.Path]) -> Dict[str, str]:
+    """
+    Parse a file with one `key: value` entry per line. Besides `$GISRC`, GRASS uses
+    this format for e.g. `WIND` and `cellhd` files.
+    """
+    values: Dict[str, str] = {}
+    with open(path) as fd:
+        for line in fd:
+            key, sep, value = line.partition(":")
+            if sep:
+                values[key.strip()] = value.strip()
+    return values
+
+
+def read_gisrc(path: Union[str, pathlib.Path]) -> Dict[str, str]:
+    """ Return the entries of the `$GISRC` file at `path` as a dictionary. """
+    return _read_entries(path)
+
+
+def write_gisrc(path: Union[str, pathlib.Path], values: Dict[str, str]) -> None:
+    """
+    Write `values` to the `$GISRC` file at `path`.
+
+    The file is replaced atomically, so that GRASS modules running concurrently never
+    see a partially written file.
+    """
+    path = pathlib.Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "w") as stream:
+        for key, value in values.items():
+            stream.write(f"{key}: {value}\n")
+    os.replace(tmp, path)
+
+
+def update_gisrc(path: Union[str, pathlib.Path], **changes: str) -> Dict[str, str]:
+    """ Update the given entries of the `$GISRC` file at `path` and return them all. """
+    values = read_gisrc(path)
+    values.update(changes)
+    write_gisrc(path, values)
+    return values
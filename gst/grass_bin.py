@@ -1,10 +1,16 @@
+from __future__ import annotations
+
 import logging
+import os
 import pathlib
+import threading
+from typing import Any
+from typing import Dict
 from typing import Optional
 from typing import Union
 
-import delegator  # type: ignore
-
+from .cache import get_config
+from .instrument import timed
 from .utils import resolve_grass_executable
 
 logger = logging.getLogger(__name__)
@@ -16,6 +22,9 @@ class Grass(object):
     """
     A wrapper around a GRASS GIS installation.
 
+    `Grass` instances are immutable. Use `Grass.get()` in order to retrieve an
+    instance that is shared by the whole process.
+
     Attributes
     ----------
     executable:
@@ -32,31 +41,115 @@ class Grass(object):
         The absolute path to the grass executable. To make it easier to work with
         development versions of GRASS, specifying the full path If it is not specified,
         then we check if the variable
+    use_cache:
+        Whether the output of `grass --config` should be read from the on-disk cache
+        (see `gst.cache`). If it is `None`, then the cache is used unless
+        `$GST_NO_CACHE` has been set.
 
     Raises
     ------
     ValueError:
         If the GRASS executable cannot be found.
+    AttributeError:
+        If you try to modify the attributes of an instance.
     """
 
     # Instance attributes type declarations
     executable: pathlib.Path
     gisbase: pathlib.Path
     python_lib: pathlib.Path
+    _config: Dict[str, str]
+    _use_cache: Optional[bool]
+    _frozen: bool
+
+    # The process-wide registry used by `Grass.get()`. It maps both the values that
+    # the users pass and the resolved executables to the shared instances.
+    _registry: Dict[Any, Grass] = {}
+    _registry_lock = threading.Lock()
 
-    def __init__(self, executable: Optional[Union[str, pathlib.Path]] = None) -> None:
-        self.executable = resolve_grass_executable(executable)
-        self.gisbase = self._get_gisbase()
-        self.python_lib = self.gisbase / "etc/python"
+    def __init__(
+        self,
+        executable: Optional[Union[str, pathlib.Path]] = None,
+        use_cache: Optional[bool] = None,
+    ) -> None:
+        with timed("grass.resolve"):
+            self._set("executable", resolve_grass_executable(executable))
+        self._set("_use_cache", use_cache)
+        self._set("_config", {})
+        self._set("gisbase", self._get_gisbase())
+        self._set("python_lib", self.gisbase / "etc/python")
+        self._set("_frozen", True)
         logger.debug(f"GRASS: {self.executable}")
 
+    @classmethod
+    def get(cls, executable: Optional[Union[str, pathlib.Path]] = None) -> Grass:
+        """
+        Return the shared `Grass` instance of `executable`.
+
+        The first call for each executable creates the instance, while subsequent calls
+        return it without resolving the executable or querying GRASS again. If
+        `executable` is not specified, then `$GST_GRASS_EXECUTABLE` is used, just like
+        in `resolve_grass_executable()`.
+        """
+        if executable:
+            key: Any = ("executable", str(executable))
+        else:
+            key = ("environ", os.environ.get("GST_GRASS_EXECUTABLE"))
+        try:
+            return cls._registry[key]
+        except KeyError:
+            pass
+        with cls._registry_lock:
+            if key not in cls._registry:
+                resolved = resolve_grass_executable(executable)
+                if resolved not in cls._registry:
+                    cls._registry[resolved] = cls(resolved)
+                cls._registry[key] = cls._registry[resolved]
+            return cls._registry[key]
+
+    @classmethod
+    def clear_registry(cls) -> None:
+        """ Forget all the instances that have been created by `Grass.get()`. """
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def _set(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Grass instances are immutable: {name}")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Grass instances are immutable: {name}")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Grass):
+            return NotImplemented
+        return self.executable == other.executable
+
+    def __hash__(self) -> int:
+        return hash(self.executable)
+
+    def __repr__(self) -> str:
+        return f"<GRASS: {self.executable.as_posix()}>"
+
     def _get_gisbase(self) -> pathlib.Path:
         """ Return the path to the GRASS installation directory. """
-        p = delegator.run(f"{self.executable} --config path")
-        return pathlib.Path(p.out.strip()).resolve()
+        return pathlib.Path(self.config("path")).resolve()
+
+    def config(self, key: str) -> str:
+        """ Return the output of `grass --config <key>`, e.g. `version`. """
+        if key not in self._config:
+            with timed("grass.config", key=key):
+                self._config[key] = get_config(
+                    self.executable, key, use_cache=self._use_cache
+                )
+        return self._config[key]
 
-    def session(self, location, mapset="PERMANENT"):
+    def session(self, location, mapset="PERMANENT", **kwargs):
         """ Return a `gst.session.Session` instance """
         from .session import Session
 
-        return Session(location=location, mapset=mapset, grass=self)
+        return Session(location=location, mapset=mapset, grass=self, **kwargs)
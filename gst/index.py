@@ -0,0 +1,319 @@
+"""
+A metadata index of the raster maps of a Location that doesn't need GRASS.
+
+`RasterIndex` reads the `cellhd`, `cats`, `hist` and `cell_misc` elements of the
+mapsets directly, so listing the maps of a Location and getting their region, type and
+range costs a few file reads per map instead of a `g.list`/`r.info` subprocess. The
+metadata are cached and re-read only when the modification time of the files changes::
+
+    index = gst.RasterIndex.get("/path/to/location")
+    for info in index.rasters("elevation*"):
+        print(info.qualified_name, info.type, info.region.cells, info.range)
+"""
+from __future__ import annotations
+
+import dataclasses
+import fnmatch
+import logging
+import os
+import pathlib
+import struct
+import threading
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .region import read_header
+from .region import Region
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["RasterIndex", "RasterInfo"]
+
+# The `type` entry of `cell_misc/<map>/f_format` mapped to the GRASS type
+_FP_TYPES = {"float": "FCELL", "double": "DCELL"}
+
+# The files whose modification time invalidates the cached metadata of a map
+_FINGERPRINT_FILES = (
+    "cellhd/{name}",
+    "cats/{name}",
+    "hist/{name}",
+    "cell_misc/{name}/f_format",
+    "cell_misc/{name}/range",
+    "cell_misc/{name}/f_range",
+)
+
+_Fingerprint = Tuple[int, ...]
+
+
+@dataclasses.dataclass(frozen=True)
+class RasterInfo:
+    """
+    The metadata of a raster map.
+
+    Attributes
+    ----------
+    name, mapset:
+        The name of the map and of the mapset that contains it.
+    region:
+        The region of the map.
+    type:
+        `"CELL"`, `"FCELL"` or `"DCELL"`.
+    compressed:
+        The `compressed` entry of the header, i.e. the compression method (0 means no
+        compression).
+    range:
+        The minimum and the maximum value, or `None` if the map only contains nulls or
+        its range is unknown.
+    title:
+        The title of the map.
+    categories:
+        The number of categories.
+    creator, created:
+        The user that created the map and when it was created, as recorded in its
+        history.
+    """
+
+    name: str
+    mapset: str
+    region: Region
+    type: str
+    compressed: int
+    range: Optional[Tuple[float, float]]
+    title: str = ""
+    categories: int = 0
+    creator: str = ""
+    created: str = ""
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.name}@{self.mapset}"
+
+
+def _fingerprint(mapset: str, name: str) -> _Fingerprint:
+    mtimes = []
+    for template in _FINGERPRINT_FILES:
+        path = os.path.join(mapset, template.format(name=name))
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(0)
+    return tuple(mtimes)
+
+
+def _read_lines(path: pathlib.Path) -> List[str]:
+    try:
+        return path.read_text(errors="replace").splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def _read_range(misc: pathlib.Path, type_: str) -> Optional[Tuple[float, float]]:
+    if type_ == "CELL":
+        # `min max`; an empty file means that all the cells are null
+        values = " ".join(_read_lines(misc / "range")).split()
+        if len(values) < 2:
+            return None
+        return float(values[0]), float(values[1])
+    try:
+        data = (misc / "f_range").read_bytes()
+    except FileNotFoundError:
+        return None
+    if len(data) < 16:
+        return None
+    # Two XDR (i.e. big endian) doubles
+    return struct.unpack(">dd", data[:16])
+
+
+def _read_info(mapset: pathlib.Path, name: str) -> RasterInfo:
+    header = read_header(mapset / "cellhd" / name)
+    misc = mapset / "cell_misc" / name
+    f_format = misc / "f_format"
+    if f_format.exists():
+        type_ = _FP_TYPES.get(read_header(f_format).get("type", ""), "FCELL")
+    else:
+        type_ = "CELL"
+    cats = _read_lines(mapset / "cats" / name)
+    categories = 0
+    if cats and cats[0].startswith("#"):
+        try:
+            categories = int(cats[0].lstrip("#").split()[0])
+        except (IndexError, ValueError):
+            pass
+    # `hist`: creation time, title, mapset, creator, map type, ...
+    hist = _read_lines(mapset / "hist" / name)
+    return RasterInfo(
+        name=name,
+        mapset=mapset.name,
+        region=Region.from_header(header),
+        type=type_,
+        compressed=int(header.get("compressed", 0)),
+        range=_read_range(misc, type_),
+        title=cats[1].strip() if len(cats) > 1 else "",
+        categories=categories,
+        creator=hist[3].strip() if len(hist) > 3 else "",
+        created=hist[0].strip() if hist else "",
+    )
+
+
+class _MapsetEntry(object):
+    """ The cached metadata of the maps of a mapset """
+
+    def __init__(self) -> None:
+        self.mtime = -1
+        self.names: List[str] = []
+        self.maps: Dict[str, Tuple[_Fingerprint, RasterInfo]] = {}
+
+
+class RasterIndex(object):
+    """
+    An index of the raster maps of the Location at `location`.
+
+    The index is refreshed lazily: every query checks the modification times of the
+    metadata files and re-reads the ones that have changed. Maps whose metadata can't
+    be parsed are skipped. Use `RasterIndex.get()` in order to share an index.
+
+    Parameters
+    ----------
+
+    location:
+        The path to the Location.
+    mapsets:
+        The mapsets to index. Defaults to all of them.
+
+    """
+
+    # The process-wide registry used by `RasterIndex.get()`
+    _registry: Dict[pathlib.Path, RasterIndex] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(
+        self, location: Union[str, pathlib.Path], mapsets: Optional[List[str]] = None,
+    ) -> None:
+        self.location = pathlib.Path(location).resolve()
+        self.mapsets = mapsets
+        self._entries: Dict[str, _MapsetEntry] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, location: Union[str, pathlib.Path]) -> RasterIndex:
+        """ Return the shared index of all the mapsets of `location`. """
+        key = pathlib.Path(location).resolve()
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(key)
+            return cls._registry[key]
+
+    @classmethod
+    def clear_registry(cls) -> None:
+        """ Forget all the indexes that have been created by `RasterIndex.get()`. """
+        with cls._registry_lock:
+            cls._registry.clear()
+
+    def __repr__(self) -> str:
+        return f"<RasterIndex: {self.location}>"
+
+    def __iter__(self) -> Iterator[RasterInfo]:
+        return iter(self.rasters())
+
+    def __len__(self) -> int:
+        return len(self.rasters())
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, name: str) -> RasterInfo:
+        """
+        Return the metadata of the map `name`. If `name` is not qualified with a
+        mapset, then the mapsets are searched in alphabetical order, with `PERMANENT`
+        last.
+        """
+        name, _, mapset = name.partition("@")
+        self.refresh()
+        mapsets = [mapset] if mapset else self._search_order()
+        for mapset in mapsets:
+            entry = self._entries.get(mapset)
+            if entry is not None and name in entry.maps:
+                return entry.maps[name][1]
+        raise KeyError(name)
+
+    def _search_order(self) -> List[str]:
+        return sorted(self._entries, key=lambda mapset: (mapset == "PERMANENT", mapset))
+
+    def _mapset_names(self) -> List[str]:
+        if self.mapsets is not None:
+            return list(self.mapsets)
+        return [
+            entry.name
+            for entry in os.scandir(self.location)
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, "WIND"))
+        ]
+
+    def _refresh_mapset(self, mapset: str, entry: _MapsetEntry) -> None:
+        path = self.location / mapset
+        cellhd = path / "cellhd"
+        try:
+            mtime = cellhd.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = 0
+        if mtime != entry.mtime:
+            # Maps have been added, removed or renamed
+            entry.mtime = mtime
+            entry.names = sorted(os.listdir(cellhd)) if mtime else []
+        maps = {}
+        for name in entry.names:
+            fingerprint = _fingerprint(path.as_posix(), name)
+            cached = entry.maps.get(name)
+            if cached is not None and cached[0] == fingerprint:
+                maps[name] = cached
+                continue
+            if not fingerprint[0]:
+                # The map was removed after the directory was listed
+                continue
+            try:
+                maps[name] = (fingerprint, _read_info(path, name))
+            except (OSError, KeyError, ValueError) as exc:
+                logger.warning(f"Skipping raster map {name}@{mapset}: {exc}")
+        entry.maps = maps
+
+    def refresh(self) -> None:
+        """ Re-read the metadata that have changed since the last refresh. """
+        with self._lock:
+            mapsets = set(self._mapset_names())
+            for mapset in set(self._entries) - mapsets:
+                del self._entries[mapset]
+            for mapset in mapsets:
+                entry = self._entries.setdefault(mapset, _MapsetEntry())
+                self._refresh_mapset(mapset, entry)
+
+    def rasters(
+        self, pattern: str = "*", mapset: Optional[str] = None
+    ) -> List[RasterInfo]:
+        """
+        Return the metadata of the maps whose name matches the glob `pattern`, sorted
+        by mapset and name.
+
+        Parameters
+        ----------
+
+        pattern:
+            A glob pattern, like the one `g.list` accepts.
+        mapset:
+            Only return the maps of `mapset`.
+
+        """
+        self.refresh()
+        return [
+            info
+            for name in sorted(self._entries)
+            if mapset is None or name == mapset
+            for _, info in self._entries[name].maps.values()
+            if fnmatch.fnmatchcase(info.name, pattern)
+        ]
@@ -0,0 +1,193 @@
+"""
+Timing instrumentation of the phases of GRASS sessions.
+
+`gst` measures how long the expensive phases take, e.g. resolving the GRASS executable,
+running `grass --config`, snapshotting the environment, `init()`, `finish()` and the
+work done inside a `Session`. The timings are passed to the registered hooks and/or
+logged as structured records::
+
+    gst.add_timing_hook(lambda timing: statsd.timing(timing.phase, timing.duration))
+    gst.log_timings()  # or set $GST_LOG_TIMINGS
+
+When there are no hooks and logging is disabled, which is the default, instrumenting a
+phase costs a function call and an attribute lookup.
+
+The phases are:
+
+- `grass.resolve`: resolving the path to the GRASS executable.
+- `grass.config`: running `grass --config <key>` (or reading it from the cache).
+- `session.start`: starting a session; it includes `session.snapshot` (saving the
+  environment) and `session.init` (`grass.script.setup.init()`).
+- `session.resume`: re-activating a persistent session.
+- `session.body`: the code that runs inside the session.
+- `session.finish`: `grass.script.setup.finish()`.
+- `session.restore`: restoring the environment.
+- `temp_region.enter`, `temp_region.restore`, `temp_mapset.create` and
+  `temp_mapset.cleanup`.
+"""
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import decorator  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "Timing",
+    "add_timing_hook",
+    "remove_timing_hook",
+    "log_timings",
+    "collect_timings",
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class Timing:
+    """
+    The duration of a phase.
+
+    Attributes
+    ----------
+    phase:
+        The name of the phase, e.g. `session.init`.
+    duration:
+        The duration in seconds.
+    attributes:
+        Details about the phase, e.g. the location of the session.
+    failed:
+        Whether the phase raised an exception.
+    """
+
+    phase: str
+    duration: float
+    attributes: Dict[str, Any] = dataclasses.field(default_factory=dict)
+    failed: bool = False
+
+
+TimingHook = Callable[[Timing], None]
+
+# The hooks are replaced, never mutated, so that `_emit()` doesn't need the lock.
+_hooks: Tuple[TimingHook, ...] = ()
+_hooks_lock = threading.Lock()
+_log_level: Optional[int] = logging.DEBUG if os.environ.get("GST_LOG_TIMINGS") else None
+# Whether timings need to be measured at all.
+_enabled = _log_level is not None
+
+
+def _update_enabled() -> None:
+    global _enabled
+    _enabled = bool(_hooks) or _log_level is not None
+
+
+def add_timing_hook(hook: TimingHook) -> None:
+    """ Call `hook(timing)` whenever a phase finishes. """
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+        _update_enabled()
+
+
+def remove_timing_hook(hook: TimingHook) -> None:
+    """ Stop calling `hook`. """
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h != hook)
+        _update_enabled()
+
+
+def log_timings(enabled: bool = True, level: int = logging.DEBUG) -> None:
+    """
+    Enable or disable logging the timings.
+
+    The records are emitted by the `gst.instrument` logger and, besides the message,
+    they have the `gst_phase`, `gst_duration` and `gst_attributes` attributes, which
+    structured log formatters can use. Logging can also be enabled by setting
+    `$GST_LOG_TIMINGS`.
+    """
+    global _log_level
+    with _hooks_lock:
+        _log_level = level if enabled else None
+        _update_enabled()
+
+
+def _emit(timing: Timing) -> None:
+    level = _log_level
+    if level is not None:
+        logger.log(
+            level,
+            f"{timing.phase} took {timing.duration:.6f}s",
+            extra={
+                "gst_phase": timing.phase,
+                "gst_duration": timing.duration,
+                "gst_attributes": timing.attributes,
+            },
+        )
+    for hook in _hooks:
+        try:
+            hook(timing)
+        except Exception:
+            logger.exception(f"Timing hook failed: {hook}")
+
+
+def record(phase: str, duration: float, **attributes: Any) -> None:
+    """ Emit the timing of a phase that has been measured by the caller. """
+    if _enabled:
+        _emit(Timing(phase, duration, attributes))
+
+
+class _Timer(object):
+    __slots__ = ("phase", "attributes", "start")
+
+    def __init__(self, phase: str, attributes: Dict[str, Any]) -> None:
+        self.phase = phase
+        self.attributes = attributes
+
+    def __enter__(self) -> _Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        duration = time.perf_counter() - self.start
+        _emit(Timing(self.phase, duration, self.attributes, exc_type is not None))
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self) -> _NullTimer:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(phase: str, **attributes: Any):
+    """ Return a context manager that measures the duration of its block as `phase` """
+    if not _enabled:
+        return _NULL_TIMER
+    return _Timer(phase, attributes)
+
+
+@decorator.contextmanager
+def collect_timings():
+    """ Context manager that yields a list to which the timings are appended. """
+    timings: List[Timing] = []
+    add_timing_hook(timings.append)
+    try:
+        yield timings
+    finally:
+        remove_timing_hook(timings.append)
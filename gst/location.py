@@ -0,0 +1,189 @@
+"""
+Create GRASS Locations and mapsets by writing their files directly.
+
+This is what `grass -c` and `g.mapset -c` do, minus starting GRASS, so it only costs a
+few file writes. EPSG:4326 and XY Locations are supported out of the box; any other
+coordinate reference system requires `pyproj`.
+"""
+from __future__ import annotations
+
+import dataclasses
+import logging
+import pathlib
+import shutil
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from .region import Region
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["create_location", "create_mapset"]
+
+# The `proj` entry of `WIND` files
+PROJECTION_XY = 0
+PROJECTION_UTM = 1
+PROJECTION_LL = 3
+PROJECTION_OTHER = 99
+
+_WGS84_PROJ_INFO = {
+    "name": "WGS 84",
+    "datum": "wgs84",
+    "ellps": "wgs84",
+    "proj": "ll",
+    "no_defs": "defined",
+}
+_DEGREE_PROJ_UNITS = {"unit": "degree", "units": "degrees", "meters": "1.0"}
+
+_VAR = {
+    "DB_DRIVER": "sqlite",
+    "DB_DATABASE": "$GISDBASE/$LOCATION_NAME/$MAPSET/sqlite/sqlite.db",
+}
+
+# proj4 parameters that GRASS keeps in `PROJ_UNITS` instead of `PROJ_INFO`
+_UNIT_PARAMETERS = {"type", "units", "to_meter", "vunits"}
+
+
+def _write_key_value(path: pathlib.Path, entries: Dict[str, str]) -> None:
+    path.write_text("".join(f"{key}: {value}\n" for key, value in entries.items()))
+
+
+def _projection_code(proj_info: Dict[str, str]) -> Tuple[int, int]:
+    """ Return the `proj` and `zone` entries of the `WIND` files """
+    proj = proj_info.get("proj")
+    if proj == "ll":
+        return PROJECTION_LL, 0
+    if proj == "utm":
+        return PROJECTION_UTM, int(proj_info.get("zone", 0))
+    return PROJECTION_OTHER, 0
+
+
+def _crs_files(
+    epsg: Optional[int], wkt: Optional[str]
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """ Return the entries of `PROJ_INFO` and `PROJ_UNITS` """
+    if epsg == 4326:
+        return dict(_WGS84_PROJ_INFO), dict(_DEGREE_PROJ_UNITS)
+    try:
+        import pyproj  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "Creating Locations that don't use EPSG:4326 requires pyproj; "
+            "install it with `pip install gst[location]`"
+        ) from None
+    crs = pyproj.CRS.from_epsg(epsg) if epsg is not None else pyproj.CRS.from_wkt(wkt)
+    proj_info = {"name": crs.name}
+    for key, value in crs.to_dict().items():
+        if key in _UNIT_PARAMETERS:
+            continue
+        if key == "proj" and value == "longlat":
+            value = "ll"
+        elif key in ("datum", "ellps"):
+            value = value.lower()
+        elif value is None:
+            value = "defined"
+        proj_info[key] = str(value)
+    if proj_info["proj"] == "ll":
+        return proj_info, dict(_DEGREE_PROJ_UNITS)
+    axis = crs.axis_info[0]
+    unit = "meter" if axis.unit_name == "metre" else axis.unit_name
+    proj_units = {
+        "unit": unit,
+        "units": f"{unit}s",
+        "meters": str(axis.unit_conversion_factor),
+    }
+    return proj_info, proj_units
+
+
+def _default_region(region: Optional[Region], proj: int, zone: int) -> Region:
+    if region is None:
+        region = Region(north=1, south=0, east=1, west=0, rows=1, cols=1)
+    extra = {
+        "top": "1.000000000000000",
+        "bottom": "0.000000000000000",
+        "cols3": str(region.cols),
+        "rows3": str(region.rows),
+        "depths": "1",
+        "e-w resol3": format(region.ewres, ".15g"),
+        "n-s resol3": format(region.nsres, ".15g"),
+        "t-b resol": "1",
+    }
+    extra.update(region.extra)
+    return dataclasses.replace(region, proj=proj, zone=zone, extra=extra)
+
+
+def create_mapset(location: Union[str, pathlib.Path], mapset: str) -> pathlib.Path:
+    """
+    Create a new, empty mapset in `location` and return its path.
+
+    Just like `g.mapset -c`, the region of the mapset is the default region of the
+    Location.
+    """
+    path = pathlib.Path(location) / mapset
+    path.mkdir()
+    shutil.copyfile(path.parent / "PERMANENT" / "DEFAULT_WIND", path / "WIND")
+    return path
+
+
+def create_location(
+    path: Union[str, pathlib.Path],
+    *,
+    epsg: Optional[int] = None,
+    wkt: Optional[str] = None,
+    region: Optional[Region] = None,
+    description: str = "",
+) -> pathlib.Path:
+    """
+    Create a new Location at `path` and return its path.
+
+    If neither `epsg` nor `wkt` is specified, then an XY (i.e. unprojected) Location is
+    created. Any coordinate reference system other than EPSG:4326 requires `pyproj`,
+    which is installed by the `location` extra, i.e. `pip install gst[location]`.
+
+    Parameters
+    ----------
+
+    path:
+        The path of the Location. It must not exist.
+    epsg:
+        The EPSG code of the coordinate reference system.
+    wkt:
+        The WKT definition of the coordinate reference system.
+    region:
+        The default region of the Location. Its `proj` and `zone` are set according
+        to the coordinate reference system. Defaults to a single 1x1 cell.
+    description:
+        The description of the Location (i.e. the contents of `MYNAME`).
+
+    Raises
+    ------
+    ImportError:
+        If `pyproj` is needed but it is not installed.
+    """
+    if epsg is not None and wkt is not None:
+        raise ValueError("Please specify either `epsg` or `wkt`")
+    location = pathlib.Path(path)
+    permanent = location / "PERMANENT"
+    if epsg is None and wkt is None:
+        proj, zone = PROJECTION_XY, 0
+        proj_info = None
+    else:
+        proj_info, proj_units = _crs_files(epsg, wkt)
+        proj, zone = _projection_code(proj_info)
+    region = _default_region(region, proj, zone)
+    permanent.mkdir(parents=True)
+    if proj_info is not None:
+        _write_key_value(permanent / "PROJ_INFO", proj_info)
+        _write_key_value(permanent / "PROJ_UNITS", proj_units)
+    if epsg is not None:
+        _write_key_value(permanent / "PROJ_EPSG", {"epsg": str(epsg)})
+    if wkt is not None:
+        (permanent / "PROJ_WKT").write_text(wkt)
+    region.write(permanent / "DEFAULT_WIND")
+    region.write(permanent / "WIND")
+    (permanent / "MYNAME").write_text(description)
+    _write_key_value(permanent / "VAR", _VAR)
+    logger.debug(f"Created Location: {location}")
+    return location
@@ -0,0 +1,217 @@
+"""
+A pool of pre-created temporary mapsets that get recycled instead of being removed.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import queue
+import shutil
+import threading
+import uuid
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
+
+import decorator  # type: ignore
+
+from .cleanup import defer_delete
+from .session import current_session
+from .session import Session
+from .utils import _pygrass_gis
+from .utils import require_grass
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["TempMapsetPool"]
+
+
+class _Baseline(object):
+    """ The contents of a freshly created mapset, used in order to reset it """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.entries: Set[str] = set()
+        self.files: Dict[str, bytes] = {}
+        self.directories: Dict[str, Set[str]] = {}
+        self.mtimes: Dict[str, int] = {}
+        for entry in os.scandir(path):
+            self.entries.add(entry.name)
+            self.mtimes[entry.name] = entry.stat().st_mtime_ns
+            if entry.is_dir():
+                self.directories[entry.name] = set(os.listdir(entry.path))
+            else:
+                with open(entry.path, "rb") as fd:
+                    self.files[entry.name] = fd.read()
+
+    def restore(self, path: pathlib.Path) -> None:
+        """ Undo any changes made to the mapset at `path` since it was created """
+        for entry in os.scandir(path):
+            if entry.name not in self.entries:
+                # e.g. a `cell`, `cellhd` or `vector` element
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+            elif entry.stat().st_mtime_ns != self.mtimes[entry.name]:
+                if entry.name in self.directories:
+                    for child in os.listdir(entry.path):
+                        if child not in self.directories[entry.name]:
+                            child_path = os.path.join(entry.path, child)
+                            if os.path.isdir(child_path):
+                                shutil.rmtree(child_path)
+                            else:
+                                os.remove(child_path)
+                else:
+                    # e.g. `WIND`
+                    with open(entry.path, "wb") as fd:
+                        fd.write(self.files[entry.name])
+                self.mtimes[entry.name] = os.stat(entry.path).st_mtime_ns
+        for name, content in self.files.items():
+            if not (path / name).exists():
+                (path / name).write_bytes(content)
+                self.mtimes[name] = os.stat(path / name).st_mtime_ns
+
+
+class TempMapsetPool(object):
+    """
+    A pool of temporary mapsets in the Location of the current `Session`.
+
+    Creating and removing a mapset means creating directories, copying `WIND` and
+    removing directory trees, which can be expensive, e.g. on network filesystems.
+    The pool creates `size` mapsets upfront and leases them out. When a lease ends,
+    the mapset is reset, i.e. only the files and element directories that have been
+    added or modified are removed or restored, and it is returned to the pool. The
+    mapsets are only removed when the pool is closed::
+
+        with gst.TempMapsetPool(size=2) as pool:
+            for item in items:
+                with pool.lease() as mapset:
+                    process(item)
+
+    `lease()` switches the mapset of the current session, which is a process-wide
+    change, so leases are serialized: a thread that leases a mapset while another
+    lease is active waits for it to end. In order to use several mapsets at the same
+    time, `acquire()` them and use them in other processes (e.g. via `EnvSession`),
+    which don't depend on the current mapset.
+
+    Parameters
+    ----------
+
+    size:
+        The number of mapsets.
+    prefix:
+        The prefix of the names of the mapsets. Defaults to a random one.
+
+    Raises
+    ------
+    ValueError:
+        If it is not called inside a `gst.Session`.
+    """
+
+    session: Session
+    names: List[str]
+
+    @require_grass
+    def __init__(self, size: int = 1, prefix: Optional[str] = None) -> None:
+        session = current_session()
+        if session is None:
+            raise ValueError("TempMapsetPool needs to be created inside a gst.Session")
+        self.session = session
+        prefix = prefix or f"gst_tmp_{uuid.uuid4().hex[:8]}"
+        self.names = [f"{prefix}_{i}" for i in range(size)]
+        self._available: queue.Queue = queue.Queue()
+        self._baselines: Dict[str, _Baseline] = {}
+        self._lock = threading.Lock()
+        self._lease_lock = threading.RLock()
+        self._closed = False
+        ggis = _pygrass_gis()
+        created: List[str] = []
+        try:
+            for name in self.names:
+                ggis.make_mapset(name)
+                created.append(name)
+                self._baselines[name] = _Baseline(self.session.location / name)
+                self._available.put(name)
+        except BaseException:
+            for name in created:
+                shutil.rmtree(self.session.location / name, ignore_errors=True)
+            raise
+        logger.debug(f"Created {size} temporary mapsets: {prefix}_*")
+
+    def __repr__(self) -> str:
+        return f"<TempMapsetPool: {self.names}>"
+
+    def __enter__(self) -> TempMapsetPool:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """
+        Return the name of an available mapset, blocking until one is returned to the
+        pool if necessary. The caller must `release()` it when done.
+
+        Raises
+        ------
+        queue.Empty:
+            If no mapset becomes available within `timeout` seconds.
+        """
+        if self._closed:
+            raise ValueError("The pool has been closed")
+        return self._available.get(timeout=timeout)
+
+    def release(self, name: str) -> None:
+        """ Reset the mapset `name` and make it available again. """
+        self.reset(name)
+        self._available.put(name)
+
+    def reset(self, name: str) -> None:
+        """ Remove everything that has been created in `name` since it was created """
+        self._baselines[name].restore(self.session.location / name)
+
+    @decorator.contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """
+        Context manager that makes an available mapset the current one and yields its
+        name. On exit, the previous mapset becomes current again and the leased one is
+        reset and returned to the pool.
+
+        Leases are serialized across threads, since the current mapset is shared by
+        the whole process.
+        """
+        if not self._lease_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise queue.Empty
+        try:
+            name = self.acquire(timeout=timeout)
+            try:
+                previous = self.session.switch_mapset(name)
+                try:
+                    yield name
+                finally:
+                    self.session.switch_mapset(previous)
+            finally:
+                self.release(name)
+        finally:
+            self._lease_lock.release()
+
+    def close(self, deferred: bool = False) -> None:
+        """
+        Remove all the mapsets of the pool. Leased mapsets are removed too.
+
+        If `deferred` is `True`, then the mapsets are removed in the background (see
+        `gst.cleanup`).
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for name in self.names:
+            path = self.session.location / name
+            if deferred:
+                defer_delete(path)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+        logger.debug(f"Removed temporary mapsets: {self.names}")
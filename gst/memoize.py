@@ -0,0 +1,305 @@
+"""
+Memoization of functions that create raster maps.
+
+Analysis chains are often re-run with inputs that haven't changed. `memoize_maps()`
+decorates a function that creates raster maps, fingerprints its input maps, the
+computational region, the raster MASK of the current mapset and its other arguments,
+and keeps a copy of the output maps in a cache mapset. When the function is called
+again with the same fingerprint, the output maps are copied back from the cache and the
+function is not called at all::
+
+    @gst.memoize_maps(inputs=["elevation"], outputs=["slope"])
+    def compute_slope(elevation, slope, zscale=1.0):
+        gs.run_command(
+            "r.slope.aspect", elevation=elevation, slope=slope, zscale=zscale
+        )
+
+    compute_slope("dem", "dem_slope")  # runs r.slope.aspect
+    compute_slope("dem", "other_slope")  # copies the cached map to other_slope
+
+The maps are copied on the filesystem, with reflinks when the filesystem supports them
+(see `gst.clone`), so restoring a map doesn't run any GRASS module. The least recently
+used entries are evicted when the maps of the cache exceed a given size.
+
+Only raster maps are supported. The result of the function is cached too, so it must be
+JSON serializable (e.g. `None`). The cache is shared by all the processes that use the
+same Location, but updating its index is not synchronized between them: at worst,
+entries are lost and the function is called again.
+"""
+from __future__ import annotations
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pathlib
+import shutil
+import tempfile
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+import decorator  # type: ignore
+
+from .clone import _Cloner
+from .location import create_mapset
+from .region import _gisenv
+from .region import _mapset_path
+from .region import current_region
+from .region import find_map
+from .utils import require_grass
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["memoize_maps", "clear_memoized_maps"]
+
+CACHE_MAPSET = "gst_cache"
+
+# The index of the cached entries, in the cache mapset
+_INDEX = "gst_memoize.json"
+
+# The elements of the mapsets that contain the files of raster maps
+_RASTER_ELEMENTS = ("cellhd", "cell", "fcell", "cats", "colr", "hist", "cell_misc")
+
+
+def _map_files(mapset: pathlib.Path, name: str) -> List[pathlib.Path]:
+    """ Return the files of the raster map `name`, relative to `mapset` """
+    files: List[pathlib.Path] = []
+    for element in _RASTER_ELEMENTS:
+        path = mapset / element / name
+        if path.is_dir():
+            files.extend(
+                child.relative_to(mapset)
+                for child in sorted(path.rglob("*"))
+                if child.is_file()
+            )
+        elif path.exists():
+            files.append(path.relative_to(mapset))
+    return files
+
+
+def _file_fingerprint(path: pathlib.Path, content: bool) -> str:
+    if content:
+        digest = hashlib.sha1()
+        with open(path, "rb") as fd:
+            for chunk in iter(lambda: fd.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _map_fingerprint(name: str, content: bool) -> Dict[str, Any]:
+    cellhd = find_map(name)
+    mapset = cellhd.parent.parent
+    return {
+        "map": f"{cellhd.name}@{mapset.name}",
+        "files": {
+            relative.as_posix(): _file_fingerprint(mapset / relative, content)
+            for relative in _map_files(mapset, cellhd.name)
+        },
+    }
+
+
+def _mask_fingerprint(mapset: pathlib.Path, content: bool) -> Dict[str, str]:
+    """ Fingerprint the raster MASK of `mapset`; it is empty if there is no MASK """
+    return {
+        relative.as_posix(): _file_fingerprint(mapset / relative, content)
+        for relative in _map_files(mapset, "MASK")
+    }
+
+
+def _map_names(value: Any) -> List[str]:
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _remove_map(mapset: pathlib.Path, name: str) -> None:
+    for element in _RASTER_ELEMENTS:
+        path = mapset / element / name
+        if path.is_dir():
+            shutil.rmtree(path)
+        elif path.exists():
+            path.unlink()
+
+
+def _copy_map(
+    source: pathlib.Path, name: str, destination: pathlib.Path, new_name: str
+) -> int:
+    """ Copy the raster map `name` of `source` to `destination`; return its size """
+    _remove_map(destination, new_name)
+    cloner = _Cloner("auto")
+    size = 0
+    for relative in _map_files(source, name):
+        target = pathlib.Path(relative.parts[0], new_name, *relative.parts[2:])
+        (destination / target).parent.mkdir(parents=True, exist_ok=True)
+        cloner.clone_file(
+            (source / relative).as_posix(), (destination / target).as_posix(), target
+        )
+        size += (source / relative).stat().st_size
+    return size
+
+
+def _load_index(cache: pathlib.Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(cache / _INDEX) as fd:
+            return json.load(fd)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_index(cache: pathlib.Path, index: Dict[str, Dict[str, Any]]) -> None:
+    """ Atomically replace the index of the cache """
+    fd, tmp = tempfile.mkstemp(dir=cache, suffix=".tmp")
+    with os.fdopen(fd, "w") as stream:
+        json.dump(index, stream, indent=1)
+    os.replace(tmp, cache / _INDEX)
+
+
+def _evict(
+    cache: pathlib.Path,
+    index: Dict[str, Dict[str, Any]],
+    max_size: Optional[int],
+    keep: str,
+) -> None:
+    """ Remove the least recently used entries until the cache fits in `max_size` """
+    if max_size is None:
+        return
+    total = sum(entry["size"] for entry in index.values())
+    for key in sorted(index, key=lambda key: index[key]["used"]):
+        if total <= max_size:
+            break
+        if key == keep:
+            continue
+        entry = index.pop(key)
+        for name in entry["maps"]:
+            _remove_map(cache, name)
+        total -= entry["size"]
+        logger.debug(f"Evicted memoized maps: {entry['maps']}")
+
+
+@require_grass
+def _call(
+    func: Any,
+    args: Sequence[Any],
+    kwargs: Dict[str, Any],
+    inputs: Sequence[str],
+    outputs: Sequence[str],
+    cache_mapset: str,
+    max_size: Optional[int],
+    content: bool,
+) -> Any:
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = bound.arguments
+    output_maps = [name for param in outputs for name in _map_names(arguments[param])]
+    gisenv = _gisenv(os.environ)
+    mapset = _mapset_path(gisenv)
+    fingerprint = {
+        "function": f"{func.__module__}.{func.__qualname__}",
+        # The names of the outputs don't matter, since the maps get copied
+        "arguments": {
+            param: repr(value)
+            for param, value in arguments.items()
+            if param not in outputs
+        },
+        "inputs": [
+            _map_fingerprint(name, content)
+            for param in inputs
+            for name in _map_names(arguments[param])
+        ],
+        "region": current_region().to_grass_region(),
+        # Most modules only process the cells that the MASK doesn't hide
+        "mask": _mask_fingerprint(mapset, content),
+    }
+    key = hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+    cache = mapset.parent / cache_mapset
+    if not cache.exists():
+        try:
+            create_mapset(mapset.parent, cache_mapset)
+        except FileExistsError:
+            # Created by another process in the meantime
+            pass
+    index = _load_index(cache)
+    entry = index.get(key)
+    if entry is not None and len(entry["maps"]) == len(output_maps):
+        if all((cache / "cellhd" / name).exists() for name in entry["maps"]):
+            for name, output in zip(entry["maps"], output_maps):
+                _copy_map(cache, name, mapset, output)
+            entry["used"] = time.time()
+            _store_index(cache, index)
+            logger.debug(f"Restored memoized maps of {fingerprint['function']}")
+            return entry["result"]
+    result = func(*args, **kwargs)
+    try:
+        json.dumps(result)
+    except TypeError:
+        logger.warning(f"Not memoizing {fingerprint['function']}: {result!r}")
+        return result
+    names = [f"{key[:16]}_{i}" for i in range(len(output_maps))]
+    size = 0
+    for output, name in zip(output_maps, names):
+        if not (mapset / "cellhd" / output).exists():
+            raise ValueError(f"Output map not found in the current mapset: {output}")
+        size += _copy_map(mapset, output, cache, name)
+    index = _load_index(cache)
+    index[key] = {
+        "function": fingerprint["function"],
+        "maps": names,
+        "size": size,
+        "used": time.time(),
+        "result": result,
+    }
+    _evict(cache, index, max_size, keep=key)
+    _store_index(cache, index)
+    return result
+
+
+@decorator.decorator
+def memoize_maps(
+    func,
+    inputs: Sequence[str] = (),
+    outputs: Sequence[str] = (),
+    cache_mapset: str = CACHE_MAPSET,
+    max_size: Optional[int] = 2 ** 30,
+    content: bool = False,
+    *args,
+    **kwargs,
+):
+    """
+    Decorator that memoizes the raster maps created by the wrapped function.
+
+    The function must be called inside a GRASS session and it must create the output
+    maps in the current mapset. When the maps are restored from the cache, existing
+    maps with the same names are replaced.
+
+    Parameters
+    ----------
+
+    inputs:
+        The names of the parameters of the wrapped function whose values are the names
+        of the input raster maps (or lists of names).
+    outputs:
+        The names of the parameters whose values are the names of the output raster
+        maps (or lists of names).
+    cache_mapset:
+        The mapset that stores the cached maps. It is created if it doesn't exist.
+    max_size:
+        The maximum size, in bytes, of the cached maps. `None` means no limit.
+    content:
+        If `True`, then the input maps are fingerprinted by hashing their files.
+        Otherwise, which is much cheaper, their sizes and modification times are used.
+
+    """
+    return _call(func, args, kwargs, inputs, outputs, cache_mapset, max_size, content)
+
+
+@require_grass
+def clear_memoized_maps(cache_mapset: str = CACHE_MAPSET) -> None:
+    """ Remove the cache mapset of `memoize_maps()` from the current Location. """
+    cache = _mapset_path(_gisenv(os.environ), cache_mapset)
+    logger.debug(f"Clearing memoized maps: {cache}")
+    shutil.rmtree(cache, ignore_errors=True)
@@ -0,0 +1,119 @@
+"""
+An in-memory LRU cache for the metadata that GRASS sessions query repeatedly.
+
+`r.info -g`, `g.list` and friends are subprocesses, so calling them in a loop is slow.
+`Session.raster_info()`, `Session.region()` and `Session.list()` keep their answers in a
+`MetadataCache`, together with a fingerprint of the files they were computed from
+(i.e. their modification times). A lookup only costs a few `stat()` calls; the value is
+recomputed when the fingerprint changes::
+
+    with gst.Session(location) as session:
+        for name in session.list("raster", pattern="dem_*"):
+            if session.raster_info(name)["max"] > 1000:
+                ...
+
+`temp_region()` and `temp_mapset()` invalidate the entries that they affect.
+"""
+from __future__ import annotations
+
+import collections
+import logging
+import os
+import threading
+from typing import Any
+from typing import Callable
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["MetadataCache"]
+
+
+def mtimes(*paths: str) -> Tuple[int, ...]:
+    """ Return the modification times of `paths`; 0 for the ones that don't exist """
+    result = []
+    for path in paths:
+        try:
+            result.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            result.append(0)
+    return tuple(result)
+
+
+class MetadataCache(object):
+    """
+    A thread-safe LRU cache whose entries are validated by a fingerprint.
+
+    The keys are tuples whose first item is the kind of the entry (e.g.
+    `"raster_info"`) and the second one is the mapset that the entry depends on, so
+    that `invalidate()` can drop them selectively.
+
+    Parameters
+    ----------
+
+    maxsize:
+        The maximum number of entries. The least recently used ones are evicted.
+
+    """
+
+    def __init__(self, maxsize: int = 256) -> None:
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be a positive integer, not: {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<MetadataCache: {len(self)}/{self.maxsize} entries>"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, key: Tuple[Hashable, ...], fingerprint: Any, compute: Callable[[], Any]
+    ) -> Any:
+        """
+        Return the value of `key`. If it is not cached or if it was cached with a
+        different `fingerprint`, then `compute()` is called and its result is cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Don't hold the lock while running e.g. a subprocess
+        value = compute()
+        with self._lock:
+            self._entries[key] = (fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(
+        self, kind: Optional[str] = None, mapset: Optional[str] = None
+    ) -> None:
+        """
+        Drop the entries of `kind` and/or of `mapset`; all of them if neither is
+        specified.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if (kind is None or key[0] == kind) and (
+                    mapset is None or key[1] == mapset
+                ):
+                    del self._entries[key]
+        logger.debug(f"Invalidated metadata: kind={kind}, mapset={mapset}")
+
+    def clear(self) -> None:
+        """ Drop all the entries and reset the statistics. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,228 @@
+"""
+A process pool whose workers run inside long-lived GRASS sessions.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import contextlib
+import logging
+import multiprocessing.util
+import os
+import pathlib
+import shutil
+import uuid
+from typing import Callable
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Union
+
+from .grass_bin import Grass
+from .session import Session
+from .utils import temp_mapset
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["SessionPool", "worker_mapset"]
+
+
+# The state of the worker processes. It gets populated by `_init_worker()`.
+_worker_stack: Optional[contextlib.ExitStack] = None
+_worker_mapset: Optional[str] = None
+
+
+def _init_worker(
+    location: pathlib.Path, mapset: str, executable: pathlib.Path, prefix: str
+) -> None:
+    """ Enter a GRASS session on a fresh temporary mapset. Runs once per worker. """
+    global _worker_stack, _worker_mapset
+    name = f"{prefix}_{os.getpid()}"
+    stack = contextlib.ExitStack()
+    stack.enter_context(Session(location=location, mapset=mapset, grass=executable))
+    # The mapset is removed by the parent process, after the results are collected
+    stack.enter_context(temp_mapset(mapset_name=name, cleanup=False))
+    _worker_stack = stack
+    _worker_mapset = name
+    # The workers are terminated via `os._exit()`, so `atexit` handlers don't run.
+    # Multiprocessing finalizers with an `exitpriority` do.
+    multiprocessing.util.Finalize(None, _finish_worker, exitpriority=10)
+    logger.debug(f"Initialized pool worker: {name}")
+
+
+def _finish_worker() -> None:
+    global _worker_stack, _worker_mapset
+    if _worker_stack is not None:
+        _worker_stack.close()
+    _worker_stack = None
+    _worker_mapset = None
+
+
+def worker_mapset() -> str:
+    """
+    Return the name of the temporary mapset of the current `SessionPool` worker.
+
+    Raises
+    ------
+    ValueError:
+        If it is not called from within a `SessionPool` worker.
+    """
+    if _worker_mapset is None:
+        raise ValueError("worker_mapset() must be called inside a SessionPool worker")
+    return _worker_mapset
+
+
+class SessionPool(object):
+    """
+    A `concurrent.futures.ProcessPoolExecutor` whose workers run inside GRASS sessions.
+
+    Each worker process enters a `Session` once, when it starts, and switches to its own
+    temporary mapset, so the submitted functions can run GRASS modules without any
+    per-task setup cost and without the workers stepping on each other. When all the
+    work is done, the maps that the workers created can be copied to a target mapset
+    with `collect()`. The temporary mapsets are removed on `shutdown()`.
+
+    The pool can be used as a context manager::
+
+        with gst.SessionPool(location) as pool:
+            results = list(pool.map(process_tile, tiles))
+            pool.collect("PERMANENT")
+
+    Parameters
+    ----------
+
+    location:
+        The path to the GRASS Location
+    mapset:
+        The mapset the workers start from. The temporary mapsets are created in the
+        same Location.
+    grass:
+        The GRASS executable.
+    max_workers:
+        The number of worker processes. Defaults to the number of CPUs.
+    mp_context:
+        The multiprocessing context that will be used to start the workers.
+
+    """
+
+    location: pathlib.Path
+    mapset: str
+    grass: Grass
+    prefix: str
+
+    def __init__(
+        self,
+        location: Union[str, pathlib.Path],
+        mapset: str = "PERMANENT",
+        grass: Optional[Union[str, pathlib.Path, Grass]] = None,
+        max_workers: Optional[int] = None,
+        mp_context=None,
+    ) -> None:
+        self.location = pathlib.Path(location).resolve()
+        self.mapset = mapset
+        self.grass = grass if isinstance(grass, Grass) else Grass.get(grass)
+        # All the temporary mapsets of the pool's workers share this prefix.
+        self.prefix = f"gst_pool_{uuid.uuid4().hex}"
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp_context,
+            initializer=_init_worker,
+            initargs=(self.location, self.mapset, self.grass.executable, self.prefix),
+        )
+
+    def __repr__(self) -> str:
+        return f"<GRASS SessionPool: {self.location.as_posix()}>"
+
+    def __enter__(self) -> SessionPool:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown(wait=True)
+
+    def submit(self, func: Callable, *args, **kwargs) -> concurrent.futures.Future:
+        """ Schedule `func(*args, **kwargs)` to be executed by a worker. """
+        return self._executor.submit(func, *args, **kwargs)
+
+    def map(
+        self,
+        func: Callable,
+        *iterables: Iterable,
+        timeout: Optional[float] = None,
+        chunksize: int = 1,
+    ) -> Iterator:
+        """ The equivalent of `map(func, *iterables)`, executed by the workers. """
+        return self._executor.map(
+            func, *iterables, timeout=timeout, chunksize=chunksize
+        )
+
+    def worker_mapsets(self) -> List[str]:
+        """ Return the names of the temporary mapsets of the workers. """
+        return sorted(
+            path.name
+            for path in self.location.iterdir()
+            if path.name.startswith(self.prefix) and path.is_dir()
+        )
+
+    def collect(
+        self,
+        target_mapset: str = "PERMANENT",
+        element: str = "raster",
+        pattern: str = "*",
+        overwrite: bool = False,
+    ) -> List[str]:
+        """
+        Copy the maps that the workers created to `target_mapset` and return their
+        names.
+
+        This runs in the calling process, so all the submitted work should have
+        finished before calling it.
+
+        Parameters
+        ----------
+
+        target_mapset:
+            The mapset that the maps will be copied to. It must already exist.
+        element:
+            The type of the maps, as accepted by `g.list`, e.g. `raster` or `vector`.
+        pattern:
+            A `g.list` wildcard pattern used to select the maps.
+        overwrite:
+            Whether to overwrite maps that already exist in `target_mapset`.
+
+        """
+        copied: List[str] = []
+        with Session(location=self.location, mapset=target_mapset, grass=self.grass):
+            import grass.script as gscript  # type: ignore
+
+            for mapset in self.worker_mapsets():
+                names = gscript.list_strings(element, pattern=pattern, mapset=mapset)
+                for fullname in names:
+                    name = fullname.split("@")[0]
+                    gscript.run_command(
+                        "g.copy",
+                        overwrite=overwrite,
+                        quiet=True,
+                        **{element: f"{fullname},{name}"},
+                    )
+                    copied.append(name)
+        logger.debug(f"Collected {len(copied)} maps to {target_mapset}")
+        return copied
+
+    def shutdown(self, wait: bool = True, cleanup: bool = True) -> None:
+        """
+        Shut the workers down and remove their temporary mapsets.
+
+        Parameters
+        ----------
+
+        wait:
+            Whether to wait for the pending work to finish before returning.
+        cleanup:
+            If `False`, then the temporary mapsets of the workers are not removed.
+            Cleanup requires `wait`.
+
+        """
+        self._executor.shutdown(wait=wait)
+        if cleanup and wait:
+            for mapset in self.worker_mapsets():
+                shutil.rmtree(self.location / mapset)
@@ -0,0 +1,461 @@
+"""
+In-memory management of the GRASS computational region.
+
+GRASS modules read the computational region from the `WIND` file of the current
+mapset, unless one of the `$GRASS_REGION` or `$WIND_OVERRIDE` environment variables is
+set. `RegionStack` uses those variables in order to change the region without ever
+writing `WIND`, which makes it cheap to change the region thousands of times, e.g. once
+per tile. The region is only written to disk on request, via `RegionStack.persist()`.
+
+Note that the overrides are only seen by GRASS modules that start after they have
+been set. The GRASS C library caches the region, so code that uses the library
+in-process (e.g. pygrass) will not see them.
+"""
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import MutableMapping
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+import decorator  # type: ignore
+
+from .gisrc import _read_entries
+from .gisrc import read_gisrc
+from .utils import require_grass
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "Region",
+    "RegionStack",
+    "current_region",
+    "override_region",
+    "read_header",
+    "find_map",
+]
+
+# The order in which GRASS writes the entries of `WIND` files
+WIND_KEYS = [
+    "proj",
+    "zone",
+    "north",
+    "south",
+    "east",
+    "west",
+    "cols",
+    "rows",
+    "e-w resol",
+    "n-s resol",
+    "top",
+    "bottom",
+    "cols3",
+    "rows3",
+    "depths",
+    "e-w resol3",
+    "n-s resol3",
+    "t-b resol",
+]
+
+# `cellhd` entries that describe the map and not its region
+_CELLHD_ONLY_KEYS = {"format", "compressed"}
+
+
+def read_header(path: Union[str, pathlib.Path]) -> Dict[str, str]:
+    """
+    Parse a file that uses the `key: value` format of GRASS region files (e.g. `WIND`,
+    `DEFAULT_WIND` or `cellhd/<map>`) and return its entries.
+    """
+    return _read_entries(path)
+
+
+def _parse_coordinate(value: str) -> float:
+    """
+    Parse a GRASS coordinate or resolution, e.g. `12.5`, `1N`, `45:30:15W` or
+    `0:00:30`.
+    """
+    value = value.strip()
+    sign = 1.0
+    if value and value[-1] in "NSEWnsew":
+        if value[-1] in "SWsw":
+            sign = -1.0
+        value = value[:-1]
+    parts = value.split(":")
+    number = 0.0
+    for i, part in enumerate(parts):
+        number += float(part) / 60 ** i
+    return sign * number
+
+
+def _format_number(value: float) -> str:
+    return format(value, ".15g")
+
+
+@dataclasses.dataclass(frozen=True)
+class Region:
+    """
+    A GRASS computational region.
+
+    Only the 2D extent and resolution are modelled explicitly; any other entries (e.g.
+    the 3D ones) are kept verbatim in `extra`.
+    """
+
+    north: float
+    south: float
+    east: float
+    west: float
+    rows: int
+    cols: int
+    proj: int = 0
+    zone: int = 0
+    extra: Dict[str, str] = dataclasses.field(default_factory=dict, compare=False)
+
+    @property
+    def nsres(self) -> float:
+        return (self.north - self.south) / self.rows
+
+    @property
+    def ewres(self) -> float:
+        return (self.east - self.west) / self.cols
+
+    @property
+    def cells(self) -> int:
+        return self.rows * self.cols
+
+    @classmethod
+    def from_header(cls, header: Mapping[str, str]) -> Region:
+        """ Create a `Region` from the entries of a `WIND` or a `cellhd` file. """
+        known = {"proj", "zone", "north", "south", "east", "west", "rows", "cols"}
+        extra = {
+            key: value
+            for key, value in header.items()
+            if key not in known
+            and key not in _CELLHD_ONLY_KEYS
+            and key not in ("e-w resol", "n-s resol")
+        }
+        return cls(
+            north=_parse_coordinate(header["north"]),
+            south=_parse_coordinate(header["south"]),
+            east=_parse_coordinate(header["east"]),
+            west=_parse_coordinate(header["west"]),
+            rows=int(header["rows"]),
+            cols=int(header["cols"]),
+            proj=int(header.get("proj", 0)),
+            zone=int(header.get("zone", 0)),
+            extra=extra,
+        )
+
+    @classmethod
+    def from_file(cls, path: Union[str, pathlib.Path]) -> Region:
+        """ Read a `Region` from a `WIND` or a `cellhd` file. """
+        return cls.from_header(read_header(path))
+
+    @classmethod
+    def from_grass_region(cls, value: str) -> Region:
+        """ Parse the value of `$GRASS_REGION`. """
+        header = {}
+        for token in value.split(";"):
+            key, sep, item = token.partition(":")
+            if sep:
+                header[key.strip()] = item.strip()
+        return cls.from_header(header)
+
+    def to_header(self) -> Dict[str, str]:
+        """ Return the entries of the `WIND` file that describes the region. """
+        header = dict(self.extra)
+        header.update(
+            {
+                "proj": str(self.proj),
+                "zone": str(self.zone),
+                "north": _format_number(self.north),
+                "south": _format_number(self.south),
+                "east": _format_number(self.east),
+                "west": _format_number(self.west),
+                "cols": str(self.cols),
+                "rows": str(self.rows),
+                "e-w resol": _format_number(self.ewres),
+                "n-s resol": _format_number(self.nsres),
+            }
+        )
+        ordered = {key: header.pop(key) for key in WIND_KEYS if key in header}
+        ordered.update(header)
+        return ordered
+
+    def to_grass_region(self) -> str:
+        """ Return the region in the format expected by `$GRASS_REGION`. """
+        return ";".join(f"{key}:{value}" for key, value in self.to_header().items())
+
+    def write(self, path: Union[str, pathlib.Path]) -> None:
+        """ Atomically write the region to `path`, using the `WIND` file format. """
+        path = pathlib.Path(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "w") as stream:
+            for key, value in self.to_header().items():
+                stream.write(f"{key + ':':<12}{value}\n")
+        os.replace(tmp, path)
+
+    def replace(self, **changes: Any) -> Region:
+        """
+        Return a copy of the region with the given changes applied.
+
+        The accepted keywords are `north`, `south`, `east`, `west`, `rows`, `cols`,
+        `nsres`, `ewres` and `res` (which sets both resolutions). Just like `g.region`,
+        when the extent changes but neither the number of rows/columns nor the
+        resolution is specified, the resolution is preserved. The number of
+        rows/columns is rounded to the nearest integer, so the resulting resolution may
+        slightly differ from the requested one.
+        """
+        unknown = set(changes) - {
+            "north",
+            "south",
+            "east",
+            "west",
+            "rows",
+            "cols",
+            "nsres",
+            "ewres",
+            "res",
+        }
+        if unknown:
+            raise ValueError(f"Unknown region parameters: {sorted(unknown)}")
+        north = float(changes.get("north", self.north))
+        south = float(changes.get("south", self.south))
+        east = float(changes.get("east", self.east))
+        west = float(changes.get("west", self.west))
+        if north <= south or east <= west:
+            raise ValueError(f"Invalid region extent: {north, south, east, west}")
+        nsres = changes.get("nsres", changes.get("res", self.nsres))
+        ewres = changes.get("ewres", changes.get("res", self.ewres))
+        rows = changes.get("rows") or max(1, int(round((north - south) / nsres)))
+        cols = changes.get("cols") or max(1, int(round((east - west) / ewres)))
+        return dataclasses.replace(
+            self,
+            north=north,
+            south=south,
+            east=east,
+            west=west,
+            rows=int(rows),
+            cols=int(cols),
+        )
+
+
+def _gisenv(env: Mapping[str, str]) -> Dict[str, str]:
+    if "GISRC" not in env:
+        raise ValueError("$GISRC is not set. Is there an active GRASS session?")
+    return read_gisrc(env["GISRC"])
+
+
+def _mapset_path(
+    gisenv: Mapping[str, str], mapset: Optional[str] = None
+) -> pathlib.Path:
+    return (
+        pathlib.Path(gisenv["GISDBASE"])
+        / gisenv["LOCATION_NAME"]
+        / (mapset or gisenv["MAPSET"])
+    )
+
+
+def _search_path(gisenv: Mapping[str, str]) -> List[str]:
+    """
+    Return the mapsets that GRASS searches for maps: the current mapset, the ones
+    listed in its `SEARCH_PATH` file and `PERMANENT`.
+    """
+    mapsets = [gisenv["MAPSET"]]
+    search_path = _mapset_path(gisenv) / "SEARCH_PATH"
+    if search_path.exists():
+        mapsets.extend(search_path.read_text().split())
+    mapsets.append("PERMANENT")
+    return mapsets
+
+
+def find_map(
+    name: str, element: str = "cellhd", env: Optional[Mapping[str, str]] = None
+) -> pathlib.Path:
+    """
+    Return the path of the `element` file of the map `name`, e.g. its `cellhd`.
+
+    Fully qualified names (`name@mapset`) are looked up in the given mapset. Otherwise
+    the current mapset is searched first, then the mapsets listed in its `SEARCH_PATH`
+    file and finally `PERMANENT`, just like GRASS does.
+
+    Raises
+    ------
+    ValueError:
+        If the map cannot be found.
+    """
+    gisenv = _gisenv(os.environ if env is None else env)
+    name, _, mapset = name.partition("@")
+    mapsets = [mapset] if mapset else _search_path(gisenv)
+    for candidate in mapsets:
+        path = _mapset_path(gisenv, candidate) / element / name
+        if path.exists():
+            return path
+    raise ValueError(f"Can't find <{name}> in mapsets: {mapsets}")
+
+
+def current_region(env: Optional[Mapping[str, str]] = None) -> Region:
+    """
+    Return the computational region that GRASS modules would use.
+
+    `$GRASS_REGION` takes precedence, then the saved region named by `$WIND_OVERRIDE`
+    and finally the `WIND` file of the current mapset.
+    """
+    env = os.environ if env is None else env
+    if env.get("GRASS_REGION"):
+        return Region.from_grass_region(env["GRASS_REGION"])
+    gisenv = _gisenv(env)
+    if env.get("WIND_OVERRIDE"):
+        return Region.from_file(
+            find_map(env["WIND_OVERRIDE"], element="windows", env=env)
+        )
+    return Region.from_file(_mapset_path(gisenv) / "WIND")
+
+
+class RegionStack(object):
+    """
+    A stack of computational regions, kept in memory.
+
+    `push()` makes a region current by setting `$GRASS_REGION`, while `pop()` restores
+    the previous one. The `WIND` file is never touched, unless `persist()` is called.
+
+    Parameters
+    ----------
+
+    env:
+        The environment that will be modified. Defaults to `os.environ`, but it can
+        also be e.g. the environment of an `EnvSession`.
+
+    """
+
+    env: MutableMapping[str, str]
+    _stack: List[Tuple[Region, Optional[str], Optional[str]]]
+
+    def __init__(self, env: Optional[MutableMapping[str, str]] = None) -> None:
+        self.env = os.environ if env is None else env
+        # (region, previous $GRASS_REGION, previous $WIND_OVERRIDE)
+        self._stack = []
+
+    def __len__(self) -> int:
+        return len(self._stack)
+
+    def __repr__(self) -> str:
+        return f"<RegionStack: depth={len(self)}>"
+
+    @property
+    def current(self) -> Region:
+        """ The current region. """
+        if self._stack:
+            return self._stack[-1][0]
+        return current_region(self.env)
+
+    def push(
+        self,
+        region: Optional[Region] = None,
+        *,
+        raster: Optional[str] = None,
+        **changes: Any,
+    ) -> Region:
+        """
+        Make a new region current and return it.
+
+        Parameters
+        ----------
+
+        region:
+            The new region. Defaults to the current one.
+        raster:
+            If specified, then the new region matches the extent and the resolution of
+            this raster map (it is read from its `cellhd` file).
+        changes:
+            Changes applied on top of `region`/`raster`, see `Region.replace()`.
+
+        """
+        if raster is not None:
+            new = Region.from_file(find_map(raster, env=self.env))
+        else:
+            new = region if region is not None else self.current
+        if changes:
+            new = new.replace(**changes)
+        self._stack.append(
+            (new, self.env.get("GRASS_REGION"), self.env.get("WIND_OVERRIDE"))
+        )
+        self.env["GRASS_REGION"] = new.to_grass_region()
+        # `$GRASS_REGION` has precedence, but let's not leave anything ambiguous
+        self.env.pop("WIND_OVERRIDE", None)
+        return new
+
+    def pop(self) -> Region:
+        """ Restore the previous region and return the one that was removed. """
+        if not self._stack:
+            raise ValueError("The region stack is empty")
+        region, grass_region, wind_override = self._stack.pop()
+        for key, value in (
+            ("GRASS_REGION", grass_region),
+            ("WIND_OVERRIDE", wind_override),
+        ):
+            if value is None:
+                self.env.pop(key, None)
+            else:
+                self.env[key] = value
+        return region
+
+    def persist(self) -> None:
+        """ Write the current region to the `WIND` file of the current mapset. """
+        path = _mapset_path(_gisenv(self.env)) / "WIND"
+        self.current.write(path)
+        logger.debug(f"Persisted region: {path}")
+
+    @decorator.contextmanager
+    def override(
+        self,
+        region: Optional[Region] = None,
+        *,
+        raster: Optional[str] = None,
+        **changes,
+    ):
+        """ Context manager that pushes a region on enter and pops it on exit. """
+        pushed = self.push(region, raster=raster, **changes)
+        try:
+            yield pushed
+        finally:
+            self.pop()
+
+
+def _region_stack() -> RegionStack:
+    from .session import current_session
+
+    session = current_session()
+    if session is not None:
+        return session.regions
+    return RegionStack()
+
+
+@require_grass
+@decorator.contextmanager
+def override_region(
+    region: Optional[Region] = None, *, raster: Optional[str] = None, **changes: Any
+) -> Iterator[Region]:
+    """
+    Context manager that changes the computational region in memory and restores it on
+    exit.
+
+    Neither the `WIND` file nor pygrass are used; the region is set via
+    `$GRASS_REGION` on the region stack of the current session. The arguments are the
+    same as the ones of `RegionStack.push()`.
+    """
+    stack = _region_stack()
+    pushed = stack.push(region, raster=raster, **changes)
+    try:
+        yield pushed
+    finally:
+        stack.pop()
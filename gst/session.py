@@ -1,21 +1,85 @@
 from __future__ import annotations
 
+import importlib
 import logging
 import os.path
 import pathlib
 import sys
+import time
+import typing
+import weakref
+from types import ModuleType
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
 from typing import Union
 
 import decorator  # type: ignore
 
+from .gisrc import update_gisrc
 from .grass_bin import Grass
+from .index import _fingerprint
+from .instrument import record
+from .instrument import timed
+from .metadata import MetadataCache
+from .metadata import mtimes
+from .region import _gisenv
+from .region import _mapset_path
+from .region import _search_path
+from .region import current_region
+from .region import find_map
+from .region import Region
+from .region import RegionStack
+from .system_restore import diff_environ
+from .system_restore import replace_grass_modules
 from .system_restore import restore_system_state
 from .system_restore import save_system_state
 from .system_restore import SystemState
 
+if typing.TYPE_CHECKING:
+    from .batch import Batch
+
 logger = logging.getLogger(__name__)
 
-__all__ = ["Session", "start_grass_session", "finish_grass_session"]
+__all__ = [
+    "Session",
+    "clear_module_cache",
+    "current_session",
+    "start_grass_session",
+    "finish_grass_session",
+    "resume_grass_session",
+]
+
+
+MODULE_POLICIES = ("keep", "strict", "cached")
+
+# The element (directory) of each type of map that `Session.list()` supports
+_LIST_ELEMENTS = {
+    "raster": "cellhd",
+    "raster_3d": "grid3",
+    "vector": "vector",
+    "region": "windows",
+    "group": "group",
+}
+
+# The `grass` modules of the sessions that use `modules="cached"`, per GISBASE
+_module_cache: Dict[str, Dict[str, ModuleType]] = {}
+
+
+# The stack of the active sessions; the last one is the current one.
+_active_sessions: List[Session] = []
+
+
+def current_session() -> Optional[Session]:
+    """ Return the innermost active `Session` or `None` if there is none. """
+    return _active_sessions[-1] if _active_sessions else None
+
+
+def clear_module_cache() -> None:
+    """ Forget the `grass` modules cached by sessions that use `modules="cached"`. """
+    _module_cache.clear()
 
 
 class Session(decorator.ContextManager):
@@ -32,6 +96,8 @@ class Session(decorator.ContextManager):
     grass:
         The path to the GRASS executable
     gisdbase:
+    persistent:
+        A boolean indicating whether this is a "warm" session or not.
     is_active:
         A boolean property indicating whether the session is active or not
 
@@ -43,7 +109,25 @@ class Session(decorator.ContextManager):
     mapset:
         The path to the GRASS Mapset
     grass:
-        The GRASS executable.
+        The GRASS executable. If it is not a `Grass` instance, then the shared
+        instance returned by `Grass.get()` is used.
+    persistent:
+        If `True`, then GRASS is only initialized the first time we enter the session.
+        On exit, the original environment is restored but the GRASS session is not
+        finished; subsequent enters just re-apply the GRASS environment variables,
+        which is much cheaper. Call `close()` to finish the GRASS session (this also
+        happens automatically when the `Session` gets garbage collected or when the
+        interpreter exits).
+    modules:
+        What to do with the `grass` modules of `sys.modules`. With `"keep"` (the
+        default) nothing is done, so the `grass` modules imported within a session
+        remain imported after it exits, even if the next session uses a different
+        GRASS installation. With `"strict"`, the `grass` modules are removed on enter
+        and the previously imported ones are restored on exit. `"cached"` works like
+        `"strict"`, but the modules imported within the session are kept in a cache
+        that is shared by all the sessions of the same GRASS installation; on enter,
+        they are swapped back in, which avoids re-importing e.g. `grass.script` and
+        `grass.pygrass`.
 
     Raises
     ------
@@ -56,19 +140,37 @@ class Session(decorator.ContextManager):
     mapset: pathlib.Path
     grass: Grass
     gisdbase: pathlib.Path
+    persistent: bool
+    modules: str
     _is_active: bool
+    _warm: Optional[Tuple[Dict[str, str], List[str]]]
 
     def __init__(
         self,
         location: Union[str, pathlib.Path],
         mapset: Union[str, pathlib.Path] = "PERMANENT",
         grass: Union[str, pathlib.Path, Grass] = None,
+        persistent: bool = False,
+        modules: str = "keep",
     ) -> None:
+        if modules not in MODULE_POLICIES:
+            raise ValueError(
+                f"modules must be one of {MODULE_POLICIES}, not: {modules}"
+            )
         self.location = pathlib.Path(location).resolve()
         self.mapset = self.location / mapset
-        self.grass = grass if isinstance(grass, Grass) else Grass(grass)
+        self.grass = grass if isinstance(grass, Grass) else Grass.get(grass)
         self.gisdbase = self.location.parent
+        self.persistent = persistent
+        self.modules = modules
         self._is_active = False
+        # The GRASS environment of a persistent session, once it has been initialized.
+        self._warm = None
+        self._finalizer: Optional[weakref.finalize] = None
+        # The lazily imported pygrass modules and ctypes libraries
+        self._imported: Dict[str, ModuleType] = {}
+        self._regions: Optional[RegionStack] = None
+        self._metadata = MetadataCache()
         # We run the sanity check at the end of __init__ because we need to first
         # convert mapset to a pathlib.Path instance.
         _mapset_sanity_check(self.mapset)
@@ -82,13 +184,32 @@ class Session(decorator.ContextManager):
 
     def __enter__(self) -> Session:
         logger.debug("Starting to setup GRASS context: {self.location}")
+        if self.modules != "keep":
+            self._outer_modules = replace_grass_modules(self._cached_modules())
         # store original environment in order to restore them when we exit.
-        self._original_state = start_grass_session(
-            self.grass, self.location, self.mapset
-        )
+        try:
+            if self._warm is not None:
+                self._original_state = resume_grass_session(*self._warm)
+            else:
+                self._original_state = start_grass_session(
+                    self.grass, self.location, self.mapset
+                )
+        except BaseException:
+            # `__exit__()` won't run, so give the caller its modules back and keep the
+            # cached ones for the next session
+            if self.modules != "keep":
+                session_modules = replace_grass_modules(self._outer_modules)
+                if self.modules == "cached":
+                    _module_cache[self.grass.gisbase.as_posix()] = session_modules
+            raise
+        if self._warm is None and self.persistent:
+            self._warm = _grass_changes(self._original_state)
+            self._finalizer = weakref.finalize(self, _close_warm, *self._warm)
 
         # mark the session as active
         self._is_active = True
+        _active_sessions.append(self)
+        self._entered_at = time.perf_counter()
 
         logger.debug(f"Finished setting up GRASS context: {self.location}")
         logger.info(f"Entering GRASS session: {self.location}")
@@ -96,11 +217,261 @@ class Session(decorator.ContextManager):
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         logger.debug(f"Starting to tear down GRASS context: {self.location}")
-        finish_grass_session(self._original_state)
+        record(
+            "session.body",
+            time.perf_counter() - self._entered_at,
+            location=self.location,
+            mapset=self.mapset.name,
+        )
+        if self._warm is not None:
+            with timed("session.restore"):
+                restore_system_state(self._original_state)
+        else:
+            finish_grass_session(self._original_state)
+        if self.modules != "keep":
+            session_modules = replace_grass_modules(self._outer_modules)
+            if self.modules == "cached":
+                _module_cache[self.grass.gisbase.as_posix()] = session_modules
+        if self.modules == "strict":
+            # the modules have been purged from sys.modules; don't hold on to them
+            self._imported.clear()
+        _active_sessions.remove(self)
+        # The region overrides live in the environment, which has just been restored
+        self._regions = None
         self._is_active = False
         logger.debug(f"Finished tearing down GRASS context: {self.location}")
         logger.info(f"Exiting GRASS session: {self.location}")
 
+    def _cached_modules(self) -> Dict[str, ModuleType]:
+        if self.modules == "cached":
+            return _module_cache.pop(self.grass.gisbase.as_posix(), {})
+        return {}
+
+    @property
+    def regions(self) -> RegionStack:
+        """
+        The in-memory `RegionStack` of the session. It is emptied on exit.
+        """
+        if not self._is_active:
+            raise ValueError(f"The session is not active: {self}")
+        if self._regions is None:
+            self._regions = RegionStack()
+        return self._regions
+
+    @property
+    def metadata(self) -> MetadataCache:
+        """
+        The cache of `raster_info()`, `region()` and `list()`. Unlike `regions`, it is
+        kept between enters, since its entries are validated on every lookup.
+        """
+        return self._metadata
+
+    def raster_info(self, name: str) -> Dict[str, Any]:
+        """
+        Return the metadata of the raster map `name`, as returned by
+        `grass.script.raster_info()` (i.e. `r.info -gre`).
+
+        The metadata are cached until the `cellhd`, `cats`, `hist` or range files of the
+        map change, so repeated calls don't run `r.info`.
+        """
+        if not self._is_active:
+            raise ValueError(f"The session is not active: {self}")
+        cellhd = find_map(name)
+        mapset = cellhd.parent.parent
+        key = ("raster_info", mapset.name, cellhd.as_posix())
+        info = self._metadata.get(
+            key,
+            _fingerprint(mapset.as_posix(), cellhd.name),
+            lambda: self._import("grass.script").raster_info(
+                f"{cellhd.name}@{mapset.name}"
+            ),
+        )
+        return dict(info)
+
+    def region(self) -> Region:
+        """
+        Return the computational region (see `gst.current_region()`). It is cached until
+        the file it is read from changes.
+        """
+        if not self._is_active:
+            raise ValueError(f"The session is not active: {self}")
+        if os.environ.get("GRASS_REGION"):
+            key = ("region", "", os.environ["GRASS_REGION"])
+            return self._metadata.get(key, None, current_region)
+        if os.environ.get("WIND_OVERRIDE"):
+            path = find_map(os.environ["WIND_OVERRIDE"], element="windows")
+            mapset = path.parent.parent.name
+        else:
+            path = _mapset_path(_gisenv(os.environ)) / "WIND"
+            mapset = path.parent.name
+        key = ("region", mapset, path.as_posix())
+        return self._metadata.get(key, mtimes(path.as_posix()), current_region)
+
+    def list(
+        self,
+        type: str = "raster",
+        pattern: Optional[str] = None,
+        mapset: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Return the fully qualified names of the maps of `type`, as returned by
+        `grass.script.list_strings()` (i.e. `g.list`).
+
+        The names are cached until maps get added to or removed from the searched
+        mapsets.
+
+        Parameters
+        ----------
+
+        type:
+            One of `"raster"`, `"raster_3d"`, `"vector"`, `"region"` and `"group"`.
+        pattern:
+            A glob pattern. Defaults to all the maps.
+        mapset:
+            A comma separated list of mapsets, or `"*"` for all of them. Defaults to the
+            search path of the current mapset.
+
+        """
+        if not self._is_active:
+            raise ValueError(f"The session is not active: {self}")
+        if type not in _LIST_ELEMENTS:
+            raise ValueError(
+                f"type must be one of {tuple(_LIST_ELEMENTS)}, not: {type}"
+            )
+        gisenv = _gisenv(os.environ)
+        if mapset == "*":
+            mapsets = sorted(os.listdir(self.location))
+            paths = [self.location.as_posix()]
+        else:
+            mapsets = mapset.split(",") if mapset else _search_path(gisenv)
+            paths = [(_mapset_path(gisenv) / "SEARCH_PATH").as_posix()]
+        paths += [
+            (self.location / name / _LIST_ELEMENTS[type]).as_posix() for name in mapsets
+        ]
+        key = ("list", gisenv["MAPSET"], type, pattern, mapset)
+        names = self._metadata.get(
+            key,
+            (mapsets, mtimes(*paths)),
+            lambda: self._import("grass.script").list_strings(
+                type, pattern=pattern, mapset=mapset
+            ),
+        )
+        return list(names)
+
+    def _import(self, name: str) -> ModuleType:
+        try:
+            return self._imported[name]
+        except KeyError:
+            pass
+        if not self._is_active:
+            raise ValueError(f"{name} can only be imported inside an active session")
+        module = self._imported[name] = importlib.import_module(name)
+        return module
+
+    def pygrass(self, name: str = "gis") -> ModuleType:
+        """
+        Return the `grass.pygrass.<name>` module, e.g. `session.pygrass("raster")`.
+
+        The module is imported the first time it is requested, and then it is cached
+        by the session, so repeated calls are just a dictionary lookup.
+        """
+        return self._import(f"grass.pygrass.{name}")
+
+    def lib(self, name: str = "gis") -> ModuleType:
+        """
+        Return the `grass.lib.<name>` ctypes bindings, e.g. `session.lib("raster")`.
+
+        Just like `pygrass()`, the bindings are loaded lazily and cached by the session.
+        """
+        return self._import(f"grass.lib.{name}")
+
+    def switch_mapset(self, mapset: str) -> str:
+        """
+        Make `mapset` the current mapset of the active session and return the name of
+        the previous one.
+
+        Only the `MAPSET` entry of `$GISRC` gets rewritten, so this is much cheaper
+        than finishing the session and starting a new one. The mapset must belong to
+        the session's Location and it must already exist.
+
+        The switch sticks: if the session is exited and re-entered, the new mapset is
+        used.
+        """
+        # Only the name gets written to $GISRC, so make sure that the mapset that
+        # gets checked is the one that we switch to.
+        if mapset in ("", ".", "..") or pathlib.PurePath(mapset).name != mapset:
+            raise ValueError(f"Not a valid mapset name: {mapset!r}")
+        if not self._is_active:
+            raise ValueError(f"Can't switch the mapset of an inactive session: {self}")
+        target = self.location / mapset
+        _mapset_sanity_check(target)
+        previous = self.mapset.name
+        update_gisrc(os.environ["GISRC"], MAPSET=target.name)
+        # If the GRASS C library has already been loaded in this process (e.g. by
+        # pygrass), then it has cached the old value, so we need to update it too.
+        libgis = self._imported.get("grass.lib.gis") or sys.modules.get("grass.lib.gis")
+        if libgis is not None:
+            libgis.G_setenv_nogisrc(b"MAPSET", target.name.encode())
+        self.mapset = target
+        logger.debug(f"Switched mapset: {previous} -> {target.name}")
+        return previous
+
+    @decorator.contextmanager
+    def in_mapset(self, mapset: str):
+        """
+        Context manager that switches to `mapset` and switches back to the previous
+        mapset on exit.
+        """
+        previous = self.switch_mapset(mapset)
+        try:
+            yield self
+        finally:
+            self.switch_mapset(previous)
+
+    def batch(self, check: bool = True, timeout: Optional[float] = None) -> Batch:
+        """
+        Return a `gst.Batch` that runs GRASS modules in this session through a single
+        shell. The session must be active.
+
+        The batch follows the environment of the process, so the region overrides
+        (e.g. `override_region()`) that are active when a command is submitted apply to
+        it. See `gst.Batch` for `check` and `timeout`.
+        """
+        from .batch import Batch
+
+        if not self._is_active:
+            raise ValueError(f"The session is not active: {self}")
+        return Batch(env=os.environ, check=check, follow=True, timeout=timeout)
+
+    def close(self) -> None:
+        """
+        Finish the GRASS session of a persistent `Session`.
+
+        The session must not be active. Calling `close()` on a non-persistent session,
+        or more than once, is a no-op. A closed session can be entered again, in which
+        case GRASS gets initialized from scratch.
+        """
+        if self._is_active:
+            raise ValueError(f"Can't close an active session: {self}")
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = None
+        self._warm = None
+
+
+def _grass_changes(original_state: SystemState) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Return the environment variables and the `sys.path` entries that have been added
+    or modified since `original_state` was saved.
+    """
+    environ, _ = diff_environ(original_state.environ, os.environ)
+    path = [entry for entry in sys.path if entry not in original_state.path]
+    return environ, path
+
+
+def _close_warm(environ: Dict[str, str], path: List[str]) -> None:
+    finish_grass_session(resume_grass_session(environ, path))
+
 
 def _mapset_sanity_check(mapset: pathlib.Path) -> None:
     if not mapset.exists():
@@ -122,9 +493,17 @@ def start_grass_session(
 ) -> SystemState:
     """ Start a grass session """
 
+    with timed("session.start", location=location, mapset=mapset.name):
+        return _start_grass_session(grass_bin, location, mapset)
+
+
+def _start_grass_session(
+    grass_bin: Grass, location: pathlib.Path, mapset: pathlib.Path
+) -> SystemState:
     _mapset_sanity_check(location / mapset)
     # store original environment in order to restore it when we finish the session
-    original_state: SystemState = save_system_state()
+    with timed("session.snapshot"):
+        original_state: SystemState = save_system_state()
 
     # Setup GRASS environment
     # The bulk of the work, will be done by `grass.script.setup.init()`
@@ -140,12 +519,13 @@ def start_grass_session(
     # OK the imports do work, so we are ready to initialize the GRASS session
     from grass.script.setup import init  # type: ignore
 
-    init(
-        gisbase=grass_bin.gisbase.as_posix(),
-        dbase=location.parent.as_posix(),
-        location=location.name,
-        mapset=mapset.name,
-    )
+    with timed("session.init"):
+        init(
+            gisbase=grass_bin.gisbase.as_posix(),
+            dbase=location.parent.as_posix(),
+            location=location.name,
+            mapset=mapset.name,
+        )
 
     # Not sure why, but the directories of the GRASS addons are not being added to
     # $PATH by `gsetup()`, so let's make sure they are added.
@@ -158,9 +538,34 @@ def start_grass_session(
     return original_state
 
 
+def resume_grass_session(environ: Dict[str, str], path: List[str]) -> SystemState:
+    """
+    Re-activate an already initialized GRASS session.
+
+    Instead of running `grass.script.setup.init()` again, this just applies the
+    environment variables and the `sys.path` entries that the initialization created.
+
+    Parameters
+    ----------
+
+    environ:
+        The environment variables that need to be set.
+    path:
+        The entries that need to be appended to `sys.path`.
+
+    """
+    with timed("session.resume"):
+        original_state: SystemState = save_system_state()
+        os.environ.update(environ)
+        sys.path.extend(path)
+    return original_state
+
+
 def finish_grass_session(original_state: SystemState) -> None:
     """ Finish a GRASS session """
     from grass.script.setup import finish  # type: ignore
 
-    finish()
-    restore_system_state(original_state)
+    with timed("session.finish"):
+        finish()
+    with timed("session.restore"):
+        restore_system_state(original_state)
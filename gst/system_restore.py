@@ -1,7 +1,10 @@
 import os
 import sys
+from types import ModuleType
 from typing import Dict
 from typing import List
+from typing import Mapping
+from typing import Tuple
 
 import dataclasses
 import decorator  # type: ignore
@@ -28,17 +31,73 @@ def save_system_state() -> SystemState:
     return state
 
 
-def restore_system_state(state: SystemState) -> None:
-    """Restore the system to the given `state`"""
-    os.environ.clear()
-    os.environ.update(state.environ)
-    sys.meta_path = state.meta_path
-    sys.path = state.path
-    sys.path_hooks = state.path_hooks
+def diff_environ(
+    old: Mapping[str, str], new: Mapping[str, str]
+) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Return the changes that turn the `old` environment into the `new` one.
+
+    The result is a tuple: a dictionary with the variables that have been added or
+    modified and a list with the names of the variables that have been removed.
+    """
+    changed = {key: value for key, value in new.items() if old.get(key) != value}
+    removed = [key for key in old if key not in new]
+    return changed, removed
+
+
+def restore_system_state(state: SystemState, incremental: bool = True) -> None:
+    """
+    Restore the system to the given `state`
+
+    By default, the restoration is incremental: only the environment variables that
+    have been added, modified or removed since `state` was saved are touched, which
+    means that we only pay for a `putenv()`/`unsetenv()` call per change and other
+    threads don't see the rest of the environment disappear. If `incremental` is
+    `False`, then the environment is cleared and rebuilt from scratch.
+    """
+    if incremental:
+        changed, removed = diff_environ(os.environ, state.environ)
+        for key in removed:
+            del os.environ[key]
+        os.environ.update(changed)
+        # Modify the lists in place, in case somebody holds a reference to them
+        sys.meta_path[:] = state.meta_path
+        sys.path[:] = state.path
+        sys.path_hooks[:] = state.path_hooks
+    else:
+        os.environ.clear()
+        os.environ.update(state.environ)
+        sys.meta_path = state.meta_path
+        sys.path = state.path
+        sys.path_hooks = state.path_hooks
+
+
+def grass_modules() -> Dict[str, ModuleType]:
+    """Return the `grass` package and its submodules that are in `sys.modules`"""
+    return {
+        name: module
+        for name, module in sys.modules.items()
+        if name == "grass" or name.startswith("grass.")
+    }
+
+
+def replace_grass_modules(modules: Dict[str, ModuleType]) -> Dict[str, ModuleType]:
+    """
+    Replace the `grass` modules of `sys.modules` with `modules`.
+
+    The modules that were removed from `sys.modules` are returned, so that they can be
+    re-installed later. Passing an empty dictionary purges the `grass` modules, i.e.
+    the next `import grass` will import them from scratch.
+    """
+    removed = grass_modules()
+    for name in removed:
+        del sys.modules[name]
+    sys.modules.update(modules)
+    return removed
 
 
 @decorator.contextmanager
-def system_restore():
+def system_restore(incremental: bool = True):
     state: SystemState = save_system_state()
     yield
-    restore_system_state(state)
+    restore_system_state(state, incremental=incremental)
@@ -0,0 +1,296 @@
+"""
+Split the computational region into tiles and process them in parallel.
+"""
+from __future__ import annotations
+
+import concurrent.futures
+import dataclasses
+import logging
+import math
+import os
+import uuid
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+
+from .pool import SessionPool
+from .pool import worker_mapset
+from .region import current_region
+from .region import override_region
+from .region import Region
+from .session import current_session
+from .utils import require_grass
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["Tile", "split_region", "process_tiles"]
+
+BACKENDS = ("serial", "thread", "process")
+
+
+@dataclasses.dataclass(frozen=True)
+class Tile:
+    """
+    A part of the computational region.
+
+    Attributes
+    ----------
+    index:
+        The position of the tile in the list returned by `split_region()`.
+    row, col:
+        The position of the tile in the grid of tiles.
+    region:
+        The region of the tile, including the overlap.
+    core:
+        The region of the tile, excluding the overlap. The cores of the tiles don't
+        overlap and together they cover the whole region.
+    env:
+        The environment that GRASS modules must be run with in order to use the
+        tile's region (e.g. `gscript.run_command(..., env=tile.env)`). It is `None`,
+        i.e. `os.environ`, unless the `"thread"` backend is used.
+    """
+
+    index: int
+    row: int
+    col: int
+    region: Region
+    core: Region
+    env: Optional[Dict[str, str]] = dataclasses.field(
+        default=None, compare=False, repr=False
+    )
+
+
+def _subregion(region: Region, row0: int, row1: int, col0: int, col1: int) -> Region:
+    return dataclasses.replace(
+        region,
+        north=region.north - row0 * region.nsres,
+        south=region.north - row1 * region.nsres,
+        west=region.west + col0 * region.ewres,
+        east=region.west + col1 * region.ewres,
+        rows=row1 - row0,
+        cols=col1 - col0,
+    )
+
+
+def split_region(
+    region: Optional[Region] = None,
+    *,
+    rows: Optional[int] = None,
+    cols: Optional[int] = None,
+    cells: Optional[int] = None,
+    overlap: int = 0,
+) -> List[Tile]:
+    """
+    Split `region` into tiles and return them, row by row.
+
+    The tile size can be specified either as `rows` and/or `cols` (in cells), or as a
+    maximum number of `cells` per tile, in which case the tiles are roughly square. The
+    tiles at the right and bottom edges may be smaller. The tiles are aligned to the
+    cells of `region`.
+
+    Parameters
+    ----------
+
+    region:
+        The region to split. Defaults to the current region.
+    rows:
+        The number of rows of each tile.
+    cols:
+        The number of columns of each tile.
+    cells:
+        The maximum number of cells of each tile.
+    overlap:
+        The number of cells by which each tile is extended on every side (clipped to
+        `region`). Useful for neighborhood operations.
+
+    """
+    if region is None:
+        region = current_region()
+    if cells is not None:
+        if rows is not None or cols is not None:
+            raise ValueError("Please specify either `cells` or `rows`/`cols`")
+        side = max(1, int(math.sqrt(cells)))
+        rows = cols = side
+    rows = min(rows or region.rows, region.rows)
+    cols = min(cols or region.cols, region.cols)
+    if rows < 1 or cols < 1 or overlap < 0:
+        raise ValueError(f"Invalid tile size: rows={rows}, cols={cols}")
+    tiles: List[Tile] = []
+    for tile_row, row0 in enumerate(range(0, region.rows, rows)):
+        row1 = min(row0 + rows, region.rows)
+        for tile_col, col0 in enumerate(range(0, region.cols, cols)):
+            col1 = min(col0 + cols, region.cols)
+            tiles.append(
+                Tile(
+                    index=len(tiles),
+                    row=tile_row,
+                    col=tile_col,
+                    region=_subregion(
+                        region,
+                        max(0, row0 - overlap),
+                        min(region.rows, row1 + overlap),
+                        max(0, col0 - overlap),
+                        min(region.cols, col1 + overlap),
+                    ),
+                    core=_subregion(region, row0, row1, col0, col1),
+                )
+            )
+    return tiles
+
+
+def _crop(name: str, tile: Tile, env: Optional[Dict[str, str]] = None) -> str:
+    """ Copy the core of the tile's output to a new map and return its name """
+    import grass.script as gscript  # type: ignore
+
+    env = dict(os.environ if env is None else env)
+    env["GRASS_REGION"] = tile.core.to_grass_region()
+    # The new map is created in the current mapset, so drop any `@mapset` suffix.
+    # The random suffix makes sure that we never replace an existing map
+    cropped = f"{name.partition('@')[0]}_core_{uuid.uuid4().hex[:8]}"
+    gscript.run_command(
+        "r.mapcalc", expression=f"{cropped} = {name}", quiet=True, env=env,
+    )
+    return cropped
+
+
+def _run_tile(func: Callable[[Tile], Any], tile: Tile, crop: bool) -> Any:
+    """ Run `func` on a tile, in the current process """
+    with override_region(tile.region):
+        result = func(tile)
+    if crop and result is not None:
+        result = _crop(result, tile)
+    return result
+
+
+def _run_tile_in_worker(
+    func: Callable[[Tile], Any], tile: Tile, crop: bool, qualify: bool
+) -> Any:
+    """ Run `func` on a tile, in a `SessionPool` worker """
+    result = _run_tile(func, tile, crop)
+    if qualify and result is not None:
+        # The maps live in the temporary mapset of the worker
+        result = f"{result}@{worker_mapset()}"
+    return result
+
+
+def _run_tile_in_thread(
+    func: Callable[[Tile], Any], tile: Tile, crop: bool, base_env: Dict[str, str],
+) -> Any:
+    """ Run `func` on a tile, in a thread; the region is set via `tile.env` """
+    env = dict(base_env, GRASS_REGION=tile.region.to_grass_region())
+    env.pop("WIND_OVERRIDE", None)
+    result = func(dataclasses.replace(tile, env=env))
+    if crop and result is not None:
+        result = _crop(result, tile, env=base_env)
+    return result
+
+
+@require_grass
+def process_tiles(
+    func: Callable[[Tile], Any],
+    tiles: Optional[Iterable[Tile]] = None,
+    *,
+    backend: str = "serial",
+    max_workers: Optional[int] = None,
+    patch: Optional[str] = None,
+    overwrite: bool = False,
+    **split_kwargs: Any,
+) -> List[Any]:
+    """
+    Call `func(tile)` for each tile, with the computational region set to the tile's
+    region, and return the results in the order of the tiles.
+
+    If `patch` is specified, then `func` must return the name of the raster map it
+    created and the maps of all the tiles are patched together into `patch`, in the
+    current mapset, using the core region of each tile (i.e. the overlap is cropped).
+
+    Parameters
+    ----------
+
+    func:
+        The function that processes a tile.
+    tiles:
+        The tiles. If they are not specified, they are created by calling
+        `split_region(**split_kwargs)`.
+    backend:
+        `"serial"` processes the tiles one after the other, in the current session.
+        `"thread"` uses a `ThreadPoolExecutor`; since all the threads share
+        `os.environ`, the region is only set in `tile.env`, which `func` must pass to
+        the GRASS modules it runs. The threads write to the current mapset, so `func`
+        must use unique map names (e.g. based on `tile.index`). `"process"` uses a
+        `SessionPool`, i.e. each worker process has its own session and temporary
+        mapset and the region is set in its environment, just like with `"serial"`.
+        With `"process"`, `func` must be picklable.
+    max_workers:
+        The number of threads/processes.
+    patch:
+        The name of the output map.
+    overwrite:
+        Whether `patch` may be overwritten.
+
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, not: {backend}")
+    region = split_kwargs.pop("region", None) or current_region()
+    if tiles is None:
+        tiles = split_region(region, **split_kwargs)
+    tiles = list(tiles)
+    overlap = any(tile.region != tile.core for tile in tiles)
+    crop = bool(patch) and overlap
+    logger.debug(f"Processing {len(tiles)} tiles with the {backend} backend")
+    if backend == "serial":
+        results = [_run_tile(func, tile, crop) for tile in tiles]
+        if patch:
+            _patch(results, patch, region, overwrite, remove=crop)
+    elif backend == "thread":
+        base_env = os.environ.copy()
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(_run_tile_in_thread, func, tile, crop, base_env)
+                for tile in tiles
+            ]
+            results = [future.result() for future in futures]
+        if patch:
+            _patch(results, patch, region, overwrite, remove=crop)
+    else:
+        session = current_session()
+        if session is None:
+            raise ValueError("The process backend requires an active gst.Session")
+        with SessionPool(
+            session.location, session.mapset.name, session.grass, max_workers
+        ) as pool:
+            futures = [
+                pool.submit(_run_tile_in_worker, func, tile, crop, bool(patch))
+                for tile in tiles
+            ]
+            results = [future.result() for future in futures]
+            # The worker mapsets are removed when the pool shuts down, so let's patch
+            # before that happens (which also removes the cropped maps).
+            if patch:
+                _patch(results, patch, region, overwrite, remove=False)
+    return results
+
+
+def _patch(
+    names: List[str], output: str, region: Region, overwrite: bool, remove: bool
+) -> None:
+    """ Patch `names` into `output` and, if `remove` is `True`, remove them """
+    import grass.script as gscript  # type: ignore
+
+    try:
+        with override_region(region):
+            gscript.run_command(
+                "r.patch",
+                input=",".join(names),
+                output=output,
+                overwrite=overwrite,
+                quiet=True,
+            )
+    finally:
+        if remove:
+            gscript.run_command(
+                "g.remove", type="raster", name=",".join(names), flags="f", quiet=True
+            )
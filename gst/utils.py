@@ -9,14 +9,21 @@ import pathlib
 import shutil
 import typing
 import uuid
+from types import ModuleType
+from typing import Iterator
 from typing import Optional
 from typing import Union
 
 import decorator  # type: ignore
 
+from .cleanup import defer_delete
+from .instrument import timed
+
 if typing.TYPE_CHECKING:
     import grass.pygrass.gis as ggis  # type: ignore
 
+    from .region import Region
+
 
 logger = logging.getLogger(__name__)
 
@@ -101,9 +108,36 @@ def require_grass(func, *args, **kwargs):
 __all__ = ["resolve_grass_executable", "require_grass"]
 
 
+def _pygrass_gis() -> ModuleType:
+    """
+    Return `grass.pygrass.gis`, preferably from the cache of the current `Session`.
+    """
+    from .session import current_session
+
+    session = current_session()
+    if session is not None:
+        return session.pygrass("gis")
+    import grass.pygrass.gis as ggis
+
+    return ggis
+
+
+def _invalidate_metadata(
+    kind: Optional[str] = None, mapset: Optional[str] = None
+) -> None:
+    """ Invalidate the metadata cached by the current `Session`, if there is one """
+    from .session import current_session
+
+    session = current_session()
+    if session is not None:
+        session.metadata.invalidate(kind, mapset)
+
+
 @require_grass
 @decorator.contextmanager
-def temp_region(*, raster: Optional[str] = None) -> "ggis.Region":
+def temp_region(
+    *, raster: Optional[str] = None, stack: bool = False
+) -> Iterator[Union["ggis.Region", Region]]:
     """
     Context manager that restores current region on exit.
 
@@ -115,25 +149,54 @@ def temp_region(*, raster: Optional[str] = None) -> "ggis.Region":
         context, while it will be restored to the original one on exit.  If `raster` is
         not specified, then the region will not be changed upon entering the context,
         nevertheless it will be restored on exit, so you can freely change it.
+    stack:
+        If `True`, then instead of rewriting the `WIND` file with pygrass, the region is
+        pushed on the region stack of the current session (see `gst.RegionStack`) and
+        the yielded value is an immutable `gst.Region`. Only GRASS modules that start
+        inside the context see it: `g.region` changes are overridden by it and
+        in-process pygrass code doesn't see it. `WIND` is restored on exit anyway.
 
     """
-    import grass.pygrass.gis as ggis
-
-    original = ggis.Region()
-    current = ggis.Region()
-    if raster:
-        current.from_rast(raster)
-        current.write()
+    if stack:
+        from .region import _gisenv
+        from .region import _mapset_path
+        from .region import _region_stack
+
+        regions = _region_stack()
+        wind = _mapset_path(_gisenv(os.environ)) / "WIND"
+        with timed("temp_region.enter", raster=raster, stack=True):
+            original_wind = wind.read_bytes()
+            pushed = regions.push(raster=raster)
+        try:
+            yield pushed
+        finally:
+            with timed("temp_region.restore", stack=True):
+                regions.pop()
+                # e.g. `g.region` has been called inside the context
+                if wind.read_bytes() != original_wind:
+                    wind.write_bytes(original_wind)
+                    _invalidate_metadata("region")
+        return
+    with timed("temp_region.enter", raster=raster):
+        ggis = _pygrass_gis()
+        original = ggis.Region()
+        current = ggis.Region()
+        if raster:
+            current.from_rast(raster)
+            current.write()
+            _invalidate_metadata("region")
     try:
         yield current
     finally:
-        original.write()
+        with timed("temp_region.restore"):
+            original.write()
+            _invalidate_metadata("region")
 
 
 @require_grass
 @decorator.contextmanager
 def temp_mapset(
-    *, mapset_name: Optional[str] = None, cleanup: bool = True
+    *, mapset_name: Optional[str] = None, cleanup: bool = True, deferred: bool = False
 ) -> "ggis.Mapset":
     """
     Context manager that creates a temporary mapset which gets removed on exit.
@@ -149,47 +212,64 @@ def temp_mapset(
         If `cleanup` is `False` then the mapset will not be removed when the wrapped
         function returns (useful for e.g. tests).
 
-    """
-    import grass.pygrass.gis as ggis
+    deferred:
+        If `True`, then instead of being removed synchronously, the mapset is renamed
+        to a tombstone and removed in the background (see `gst.cleanup`).
 
+    """
+    ggis = _pygrass_gis()
     if mapset_name is None:
         mapset_name = uuid.uuid4().hex
-    ggis.make_mapset(mapset_name)
-    ggis.set_current_mapset(mapset_name)
-    temp_mapset = ggis.Mapset(mapset_name)
+    with timed("temp_mapset.create", mapset=mapset_name):
+        ggis.make_mapset(mapset_name)
+        ggis.set_current_mapset(mapset_name)
+        temp_mapset = ggis.Mapset(mapset_name)
+        # The search path has changed
+        _invalidate_metadata("list")
     try:
         yield temp_mapset
     finally:
-        ggis.set_current_mapset("PERMANENT")
-        if cleanup:
-            # remove the test mapset
-            temp_mapset.delete()
+        with timed("temp_mapset.cleanup", mapset=mapset_name, deferred=deferred):
+            ggis.set_current_mapset("PERMANENT")
+            if cleanup and deferred:
+                defer_delete(temp_mapset.path())
+            elif cleanup:
+                # remove the test mapset
+                temp_mapset.delete()
+            _invalidate_metadata("list")
+            _invalidate_metadata(mapset=mapset_name)
 
 
 @decorator.decorator
-def with_temp_region(func, raster: Optional[str] = None, *args, **kwargs):
+def with_temp_region(
+    func, raster: Optional[str] = None, stack: bool = False, *args, **kwargs
+):
     """
-    Decorator that creates a temporary Mapset before executing the wrapped function.
+    Decorator that executes the wrapped function inside a `temp_region()`.
 
     Parameters
     ----------
 
-    mapset_name:
-        The name of the temporary mapset. If it is not provided, then the temporary
-        mapset will use the `__qualname__` of the wrapped function.
+    raster:
+        If specified, then the region is set to match the provided map.
 
-    cleanup:
-        If `cleanup` is `False` then the mapset will not be removed when the wrapped
-        function returns (useful for e.g. tests).
+    stack:
+        If `True`, then the region is set via the region stack of the current session
+        (see `temp_region`).
 
     """
-    with temp_region(raster=raster):
+    with temp_region(raster=raster, stack=stack):
         return func(*args, **kwargs)
 
 
 @decorator.decorator
 def with_temp_mapset(
-    func, mapset_name: Optional[str] = None, cleanup: bool = True, *args, **kwargs
+    func,
+    mapset_name: Optional[str] = None,
+    cleanup: bool = True,
+    deferred: bool = False,
+    *args,
+    **kwargs,
 ):
     """
     Decorator that creates a temporary Mapset before executing the wrapped function.
@@ -205,11 +285,14 @@ def with_temp_mapset(
         If `cleanup` is `False` then the mapset will not be removed when the wrapped
         function returns (useful for e.g. tests).
 
+    deferred:
+        If `True`, then the mapset is removed in the background (see `temp_mapset`).
+
     """
     if not mapset_name:
         mapset_name = f"{func.__module__}_{func.__qualname__}"
         mapset_name = mapset_name.replace(".", "_")
-    with temp_mapset(mapset_name=mapset_name, cleanup=cleanup):
+    with temp_mapset(mapset_name=mapset_name, cleanup=cleanup, deferred=deferred):
         return func(*args, **kwargs)
 
 
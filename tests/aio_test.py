@@ -0,0 +1,46 @@
+import asyncio
+import os
+import subprocess
+
+import pytest  # type: ignore
+
+import gst
+
+
+def test_async_session_run(epsg4326):
+    async def main():
+        async with gst.AsyncSession(epsg4326.location, grass=epsg4326.grass) as session:
+            assert "GISRC" not in os.environ
+            result = await session.run("g.gisenv", flags="n")
+            assert "MAPSET=PERMANENT" in result.stdout.splitlines()
+            rasters = await session.read("g.list", type="raster")
+            assert "sq2_000" in rasters.split()
+            with pytest.raises(subprocess.CalledProcessError):
+                await session.run("r.info", map="missing")
+            result = await session.run("r.info", map="missing", check=False)
+            assert result.returncode != 0
+        assert not session.is_active
+
+    asyncio.run(main())
+
+
+def test_async_session_concurrency(epsg4326):
+    async def main():
+        async with gst.AsyncSession(
+            epsg4326.location, grass=epsg4326.grass, max_concurrency=2
+        ) as session:
+            results = await asyncio.gather(
+                *[session.read("r.info", flags="g", map="sq2_000") for _ in range(6)]
+            )
+        assert len(set(results)) == 1
+
+    asyncio.run(main())
+
+
+def test_async_session_stream(epsg4326):
+    async def main():
+        async with gst.AsyncSession(epsg4326.location, grass=epsg4326.grass) as session:
+            lines = [item async for item in session.stream("g.gisenv", flags="n")]
+        assert ("stdout", "MAPSET=PERMANENT") in lines
+
+    asyncio.run(main())
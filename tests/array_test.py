@@ -0,0 +1,71 @@
+import pytest  # type: ignore
+
+import gst
+from gst.array import _mtype
+
+numpy = pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize(
+    "dtype,mtype",
+    [("bool", "CELL"), ("int32", "CELL"), ("float32", "FCELL"), ("float64", "DCELL")],
+)
+def test_mtype(dtype, mtype):
+    assert _mtype(dtype) == mtype
+
+
+def test_mtype_invalid():
+    with pytest.raises(ValueError):
+        _mtype("complex128")
+
+
+def test_read_array_can_only_be_used_inside_a_grass_session():
+    with pytest.raises(ValueError) as exc:
+        gst.read_array("sq5_127")
+    assert "inside a GRASS session" in str(exc)
+
+
+def test_read_array_respects_temp_region(epsg4326):
+    with epsg4326:
+        assert gst.read_array("sq5_127").shape == (1, 1)
+        with gst.temp_region(raster="sq5_127"):
+            array = gst.read_array("sq5_127")
+    assert array.shape == (5, 5)
+    assert array.dtype == numpy.int32
+    assert (array == 127).all()
+
+
+def test_iter_rows(epsg4326):
+    with epsg4326:
+        with gst.temp_region(raster="sq5_127"):
+            blocks = list(gst.iter_rows("sq5_127", chunk=2))
+    assert [row for row, _ in blocks] == [0, 2, 4]
+    assert [block.shape for _, block in blocks] == [(2, 5), (2, 5), (1, 5)]
+
+
+def test_write_array(epsg4326):
+    with epsg4326:
+        with gst.temp_region(raster="sq5_127"):
+            array = numpy.arange(25, dtype="float64").reshape(5, 5)
+            gst.write_array("arange", array, null=0)
+            result = gst.read_array("arange")
+            assert numpy.isnan(result[0, 0])
+            assert (result.flat[1:] == array.flat[1:]).all()
+            blocks = (block * 2 for _, block in gst.iter_rows("sq5_127", chunk=2))
+            gst.write_array("doubled", blocks)
+            assert (gst.read_array("doubled") == 254).all()
+
+
+def test_read_array_restores_the_window(epsg4326):
+    with epsg4326:
+        region = gst.Region.from_file(gst.find_map("sq5_127"))
+        assert gst.read_array("sq5_127", region=region).shape == (5, 5)
+        assert epsg4326.lib("raster").Rast_window_rows() == 1
+        assert gst.read_array("sq5_127").shape == (1, 1)
+
+
+def test_write_array_overwrite(epsg4326):
+    with epsg4326:
+        with pytest.raises(ValueError):
+            gst.write_array("sq5_127", numpy.zeros((1, 1)))
+        gst.write_array("sq5_127", numpy.zeros((1, 1)), overwrite=True)
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import time
+
+import pytest  # type: ignore
+
+import gst
+
+
+def test_batch_run_command():
+    with gst.Batch() as batch:
+        result = batch.run_command("printf hi; echo there >&2")
+        assert result.returncode == 0
+        assert result.stdout == "hi"
+        assert result.stderr == "there\n"
+        assert batch.read_command(["echo", "a b"]) == "a b\n"
+
+
+def test_batch_make_command():
+    with gst.Batch() as batch:
+        result = batch.run_command(["echo", "r.info"], flags="g", map_=["a", "b"])
+        assert result.stdout == "-g map=a,b r.info\n"
+
+
+def test_batch_flush():
+    with gst.Batch() as batch:
+        for i in range(200):
+            batch.submit(f"echo {i}")
+        batch.submit("export GST_BATCH_VARIABLE=value")
+        batch.submit("echo $GST_BATCH_VARIABLE")
+        results = batch.flush()
+    assert [result.stdout for result in results[:200]] == [f"{i}\n" for i in range(200)]
+    assert results[-1].stdout == "value\n"
+
+
+def test_batch_flushes_on_exit(tmp_path):
+    with gst.Batch() as batch:
+        batch.submit(["touch", (tmp_path / "flushed").as_posix()])
+        assert not (tmp_path / "flushed").exists()
+    assert (tmp_path / "flushed").exists()
+
+
+def test_batch_check():
+    with gst.Batch() as batch:
+        batch.submit("false")
+        batch.submit("echo skipped")
+        with pytest.raises(subprocess.CalledProcessError) as exc:
+            batch.flush()
+        assert exc.value.returncode == 1
+        assert batch.read_command("echo ok") == "ok\n"
+
+
+def test_batch_without_check():
+    with gst.Batch(check=False) as batch:
+        batch.submit("exit_with_syntax_error() {")
+        batch.submit("echo ran")
+        results = batch.flush()
+    assert results[0].returncode != 0
+    assert results[1].stdout == "ran\n"
+
+
+def test_batch_shell_exits():
+    batch = gst.Batch()
+    with pytest.raises(RuntimeError):
+        batch.run_command("exit 3")
+
+
+def test_batch_follows_the_environment():
+    env = {"PATH": os.environ["PATH"], "GST_A": "1", "GST_B": "b"}
+    with gst.Batch(env=env, follow=True) as batch:
+        batch.submit("echo $GST_A-$GST_B")
+        env["GST_A"] = "2"
+        del env["GST_B"]
+        batch.submit("echo $GST_A-$GST_B")
+        env["GST_A"] = "it's 3"
+        results = batch.flush()
+        assert [result.stdout for result in results] == ["1-b\n", "2-\n"]
+        assert batch.read_command("echo $GST_A") == "it's 3\n"
+    with gst.Batch(env=env) as batch:
+        env["GST_A"] = "4"
+        assert batch.read_command("echo $GST_A") == "it's 3\n"
+
+
+def test_batch_timeout():
+    with gst.Batch(timeout=0.5) as batch:
+        batch.submit("sleep 0.3")
+        batch.submit("sleep 0.3")
+        batch.flush()
+        batch.submit("echo before")
+        batch.submit("sleep 30")
+        started = time.monotonic()
+        with pytest.raises(subprocess.TimeoutExpired) as exc:
+            batch.flush()
+        assert exc.value.cmd == "sleep 30"
+        assert time.monotonic() - started < 5
+        # A new shell is started
+        assert batch.read_command("echo after") == "after\n"
+
+
+def test_session_batch(epsg4326):
+    with epsg4326:
+        with epsg4326.batch() as batch:
+            assert "LOCATION_NAME=epsg4326" in batch.read_command("g.gisenv")
+
+
+def test_session_batch_follows_region_overrides(epsg4326):
+    with epsg4326:
+        with epsg4326.batch() as batch:
+            with gst.override_region(raster="sq5_000"):
+                batch.submit("g.region", flags="g")
+            batch.submit("g.region", flags="g")
+            inside, outside = batch.flush()
+    assert "rows=5" in inside.stdout
+    assert "rows=1" in outside.stdout
@@ -0,0 +1,215 @@
+import bz2
+import zlib
+
+import pytest  # type: ignore
+
+import gst
+from gst.cellfile import _rle_expand
+from . import EPSG4326
+
+numpy = pytest.importorskip("numpy")
+
+
+def _write_map(location, name, rows, compressed=0, fmt=None, range_="", **files):
+    """ Write the elements of a map with 5 rows, like `sq5_127` """
+    mapset = location / "PERMANENT"
+    header = (EPSG4326 / "PERMANENT/cellhd/sq5_127").read_text()
+    header = header.replace("compressed: 5", f"compressed: {compressed}")
+    if "cols" in files:
+        cols = files.pop("cols")
+        header = header.replace("east:       5E", f"east:       {cols}E")
+        header = header.replace("cols:       5", f"cols:       {cols}")
+    if fmt is not None:
+        header = header.replace("format:     0", f"format:     {fmt}")
+    (mapset / "cellhd" / name).write_text(header)
+    misc = mapset / "cell_misc" / name
+    misc.mkdir(parents=True)
+    if "fcell" in files:
+        (mapset / "fcell").mkdir(exist_ok=True)
+        (mapset / "fcell" / name).write_bytes(_data(rows, compressed))
+        (misc / "f_format").write_text(f"type: {files['fcell']}\nbyte_order: xdr\n")
+        (mapset / "cell" / name).write_bytes(b"")
+    else:
+        (mapset / "cell" / name).write_bytes(_data(rows, compressed))
+        (misc / "range").write_text(range_)
+    if "null" in files:
+        (misc / "null").write_bytes(files["null"])
+
+
+def _data(rows, compressed):
+    if not compressed:
+        return b"".join(rows)
+    offsets = [1 + 8 * (len(rows) + 1)]
+    for row in rows:
+        offsets.append(offsets[-1] + len(row))
+    pointers = b"".join(offset.to_bytes(8, "big") for offset in offsets)
+    return b"\x08" + pointers + b"".join(rows)
+
+
+def test_open_cells_compressed_test_map(location):
+    cells = gst.CellFile(location, "sq5_127")
+    assert cells.type == "CELL"
+    assert cells.shape == (5, 5)
+    assert not cells.can_memmap
+    array = gst.open_cells(location, "sq5_127@PERMANENT")
+    assert array.dtype == numpy.int32
+    assert (array == 127).all()
+    assert not cells.null_mask().any()
+
+
+def test_open_cells_unknown_map(location):
+    with pytest.raises(KeyError):
+        gst.CellFile(location, "asdf")
+
+
+def test_memmap_uncompressed_cell(location):
+    rows = [bytes(range(i * 5, i * 5 + 5)) for i in range(5)]
+    _write_map(location, "bytes", rows, range_="0 24\n")
+    cells = gst.CellFile(location, "bytes")
+    assert cells.can_memmap
+    array = cells.memmap()
+    assert isinstance(array, numpy.memmap)
+    expected = numpy.arange(25).reshape(5, 5)
+    numpy.testing.assert_array_equal(array, expected)
+    numpy.testing.assert_array_equal(cells.read(1, 3), expected[1:3])
+    assert cells.read(1, 3).dtype == numpy.int32
+
+
+def test_cell_sign_and_magnitude(location):
+    values = numpy.arange(-12, 13).reshape(5, 5)
+    rows = [
+        b"".join(
+            (abs(int(v)) | (0x80000000 if v < 0 else 0)).to_bytes(4, "big") for v in row
+        )
+        for row in values
+    ]
+    _write_map(location, "signed", rows, fmt=3, range_="-12 12\n")
+    cells = gst.CellFile(location, "signed")
+    assert cells.nbytes == 4
+    # Negative values can't be mapped
+    assert not cells.can_memmap
+    with pytest.raises(ValueError):
+        cells.memmap()
+    numpy.testing.assert_array_equal(gst.open_cells(location, "signed"), values)
+
+
+@pytest.mark.parametrize("nbytes", [1, 2])
+def test_cell_sign_and_magnitude_of_narrow_cells(location, nbytes):
+    values = numpy.arange(-3, 22).reshape(5, 5)
+    rows = [
+        b"".join(
+            (abs(int(v)) | (0x80 << 8 * (nbytes - 1) if v < 0 else 0)).to_bytes(
+                nbytes, "big"
+            )
+            for v in row
+        )
+        for row in values
+    ]
+    _write_map(location, "signed", rows, fmt=nbytes - 1, range_="-3 21\n")
+    cells = gst.CellFile(location, "signed")
+    assert cells.nbytes == nbytes
+    assert not cells.can_memmap
+    numpy.testing.assert_array_equal(gst.open_cells(location, "signed"), values)
+
+
+@pytest.mark.parametrize("type_, dtype", [("float", ">f4"), ("double", ">f8")])
+def test_memmap_uncompressed_fp(location, type_, dtype):
+    values = numpy.linspace(0, 1, 25).reshape(5, 5).astype(dtype)
+    _write_map(location, "fp", [row.tobytes() for row in values], fcell=type_)
+    cells = gst.CellFile(location, "fp")
+    assert cells.type == ("FCELL" if type_ == "float" else "DCELL")
+    array = cells.array()
+    assert isinstance(array, numpy.memmap)
+    numpy.testing.assert_array_equal(array, values)
+    numpy.testing.assert_array_equal(cells.read(), values)
+
+
+def _lz4(data):
+    # An LZ4 block of a repeated 2 byte value: 2 literals and a match of the rest
+    return bytes([0x2F]) + data[:2] + b"\x02\x00" + bytes([255, len(data) - 276])
+
+
+@pytest.mark.parametrize(
+    "compressed, compress", [(2, zlib.compress), (3, _lz4), (4, bz2.compress)]
+)
+def test_read_compressed_cell(location, compressed, compress):
+    # Compression has to make the rows smaller, otherwise they are stored as they are
+    values = numpy.full((5, 200), 300)
+    rows = [b"\x02" + compress(row.astype(">u2").tobytes()) for row in values]
+    _write_map(location, "compressed", rows, compressed=compressed, fmt=1, cols=200)
+    numpy.testing.assert_array_equal(gst.open_cells(location, "compressed"), values)
+
+
+def test_read_rle_cell(location):
+    # (count, value) pairs
+    rows = [b"\x01" + bytes([3, i, 2, 9]) for i in range(5)]
+    _write_map(location, "rle", rows, compressed=1)
+    expected = [[i, i, i, 9, 9] for i in range(5)]
+    numpy.testing.assert_array_equal(gst.open_cells(location, "rle"), expected)
+
+
+def test_read_compressed_fp(location):
+    values = numpy.arange(25, dtype=">f8").reshape(5, 5)
+    rows = [b"1" + zlib.compress(row.tobytes()) for row in values[:3]]
+    rows += [b"0" + row.tobytes() for row in values[3:]]
+    _write_map(location, "fp", rows, compressed=2, fcell="double")
+    cells = gst.CellFile(location, "fp")
+    assert not cells.can_memmap
+    numpy.testing.assert_array_equal(cells.array(), values)
+    numpy.testing.assert_array_equal(cells.read(2, 4), values[2:4])
+
+
+def test_read_legacy_compressed_fp(location):
+    # `compressed: 1` means zlib for floating point maps
+    values = numpy.linspace(0, 1, 25, dtype=">f4").reshape(5, 5)
+    rows = [b"1" + zlib.compress(row.tobytes()) for row in values]
+    _write_map(location, "fp", rows, compressed=1, fcell="float")
+    numpy.testing.assert_array_equal(gst.open_cells(location, "fp"), values)
+
+
+@pytest.mark.parametrize("max_workers", [1, 3, None])
+def test_iter_blocks_compressed(location, max_workers):
+    values = numpy.arange(5 * 200, dtype=">f4").reshape(5, 200)
+    rows = [b"1" + zlib.compress(row.tobytes()) for row in values]
+    _write_map(location, "fp", rows, compressed=2, fcell="float", cols=200)
+    cells = gst.CellFile(location, "fp")
+    blocks = list(cells.iter_blocks(2, max_workers=max_workers))
+    assert [first for first, _ in blocks] == [0, 2, 4]
+    assert [len(block) for _, block in blocks] == [2, 2, 1]
+    numpy.testing.assert_array_equal(numpy.concatenate([b for _, b in blocks]), values)
+    blocks = list(cells.iter_blocks(2, start=1, stop=4, max_workers=max_workers))
+    assert [first for first, _ in blocks] == [1, 3]
+    numpy.testing.assert_array_equal(
+        cells.read(1, 4, max_workers=max_workers), values[1:4]
+    )
+
+
+def test_iter_blocks_uncompressed(location):
+    rows = [bytes(range(i * 5, i * 5 + 5)) for i in range(5)]
+    _write_map(location, "bytes", rows, range_="0 24\n")
+    blocks = list(gst.CellFile(location, "bytes").iter_blocks(3))
+    assert [first for first, _ in blocks] == [0, 3]
+    assert blocks[1][1].dtype == numpy.int32
+    numpy.testing.assert_array_equal(
+        blocks[1][1], [[15, 16, 17, 18, 19], [20, 21, 22, 23, 24]]
+    )
+    with pytest.raises(ValueError):
+        next(gst.CellFile(location, "bytes").iter_blocks(0))
+
+
+def test_rle_expand():
+    # G_rle_compress(): a run is stored as the byte twice followed by its length
+    assert _rle_expand(b"ab\x00\x00\x05c", 8) == b"ab\x00\x00\x00\x00\x00c"
+
+
+def test_null_mask(location):
+    rows = [bytes(5) for _ in range(5)]
+    # 1 byte per row, most significant bit first
+    null = bytes([0b10000000, 0, 0b00001000, 0, 0b11111000])
+    _write_map(location, "nulls", rows, range_="0 0\n", null=null)
+    mask = gst.CellFile(location, "nulls").null_mask()
+    assert mask.shape == (5, 5)
+    assert mask.sum() == 7
+    assert mask[0, 0] and mask[2, 4] and mask[4].all()
+    array = gst.open_cells(location, "nulls", masked=True)
+    assert array.count() == 18
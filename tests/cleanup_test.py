@@ -0,0 +1,42 @@
+import pytest  # type: ignore
+
+import gst
+from gst.cleanup import TOMBSTONE_PREFIX
+
+
+def _make_tree(path):
+    (path / "cell").mkdir(parents=True)
+    (path / "cell" / "map").write_bytes(b"0" * 1024)
+    (path / "WIND").write_text("proj: 3")
+
+
+def test_defer_delete(tmp_path):
+    mapset = tmp_path / "mapset"
+    _make_tree(mapset)
+    tombstone = gst.defer_delete(mapset)
+    assert not mapset.exists()
+    assert tombstone.parent == tmp_path
+    assert tombstone.name.startswith(TOMBSTONE_PREFIX + "mapset_")
+    gst.wait_for_deletions()
+    assert not tombstone.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("wait", [True, False])
+def test_sweep_tombstones(tmp_path, wait):
+    leftover = tmp_path / f"{TOMBSTONE_PREFIX}mapset_asdf"
+    _make_tree(leftover)
+    _make_tree(tmp_path / "PERMANENT")
+    assert gst.sweep_tombstones(tmp_path, wait=wait) == [leftover]
+    gst.wait_for_deletions()
+    assert [path.name for path in tmp_path.iterdir()] == ["PERMANENT"]
+
+
+def test_temp_mapset_deferred_cleanup(epsg4326):
+    with epsg4326:
+        with gst.temp_mapset(deferred=True) as inner:
+            name = inner.name
+            assert (epsg4326.location / name).exists()
+        assert not (epsg4326.location / name).exists()
+        gst.wait_for_deletions()
+        assert [path.name for path in epsg4326.location.iterdir()] == ["PERMANENT"]
@@ -0,0 +1,66 @@
+import os
+
+import pytest  # type: ignore
+
+import gst
+from . import EPSG4326
+
+
+def _files(location):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), location)
+        for root, dirs, files in os.walk(location, followlinks=True)
+        for name in files
+    )
+
+
+@pytest.mark.parametrize("mode", ["auto", "reflink", "hardlink", "copy"])
+def test_clone_location(tmp_path, mode):
+    try:
+        clone = gst.clone_location(EPSG4326, tmp_path / "clone", mode=mode)
+    except OSError:
+        if mode == "reflink":
+            pytest.skip("The filesystem does not support reflinks")
+        raise
+    assert _files(clone) == _files(EPSG4326)
+    for name in _files(clone):
+        assert (clone / name).read_bytes() == (EPSG4326 / name).read_bytes()
+
+
+def test_clone_location_hardlinks_only_raster_data(tmp_path):
+    clone = gst.clone_location(EPSG4326, tmp_path / "clone", mode="hardlink")
+    cell = clone / "PERMANENT" / "cell" / "sq2_127"
+    assert os.path.samefile(cell, EPSG4326 / "PERMANENT" / "cell" / "sq2_127")
+    cellhd = clone / "PERMANENT" / "cellhd" / "sq2_127"
+    assert not os.path.samefile(cellhd, EPSG4326 / "PERMANENT" / "cellhd" / "sq2_127")
+
+
+def test_clone_location_mapsets(tmp_path):
+    clone = gst.clone_location(EPSG4326, tmp_path / "clone", mapsets=[], overlay="new")
+    assert sorted(path.name for path in clone.iterdir()) == ["PERMANENT", "new"]
+    default_wind = (clone / "PERMANENT" / "DEFAULT_WIND").read_text()
+    assert (clone / "new" / "WIND").read_text() == default_wind
+
+
+def test_clone_location_symlink(tmp_path):
+    clone = gst.clone_location(EPSG4326, tmp_path / "clone", mode="symlink")
+    assert (clone / "PERMANENT").is_symlink()
+    overlays = [path for path in clone.iterdir() if not path.is_symlink()]
+    assert len(overlays) == 1
+    assert (overlays[0] / "WIND").exists()
+
+
+def test_clone_location_invalid_mode(tmp_path):
+    with pytest.raises(ValueError) as exc:
+        gst.clone_location(EPSG4326, tmp_path / "clone", mode="asdf")
+    assert "mode must be one of" in str(exc)
+
+
+def test_clone_session(tmp_path):
+    session = gst.clone_session(EPSG4326, gisdbase=tmp_path, mode="symlink")
+    assert session.location == (tmp_path / "epsg4326").resolve()
+    assert not (session.location / session.mapset.name).is_symlink()
+    with session:
+        import grass.script as gscript  # type: ignore
+
+        assert gscript.gisenv()["MAPSET"] == session.mapset.name
@@ -1,10 +1,8 @@
-import pathlib
-import shutil
-
 import pytest  # type: ignore
 
-import gst.session
+import gst
 from . import _normalize_mapsets
+from . import EPSG4326
 from . import TESTS_GISDBASE
 
 
@@ -22,10 +20,11 @@ def gsession(tmpdir, grass_bin):
     """
 
     def inner(location, mapsets="PERMANENT"):
-        test_location = tmpdir / "gisdbase" / location
-        for mapset in _normalize_mapsets(mapsets):
-            test_mapset = test_location / mapset
-            shutil.copytree(TESTS_GISDBASE / location / mapset, test_mapset)
+        test_location = gst.clone_location(
+            TESTS_GISDBASE / location,
+            tmpdir / "gisdbase" / location,
+            mapsets=_normalize_mapsets(mapsets),
+        )
         session = grass_bin.session(test_location)
         return session
 
@@ -37,3 +36,9 @@ def epsg4326(gsession):
     """ Return a GRASS session using EPSG4326 Location """
     session = gsession("epsg4326", "PERMANENT")
     return session
+
+
+@pytest.fixture
+def location(tmp_path):
+    """ Return a copy of the epsg4326 Location, for tests that don't need GRASS """
+    return gst.clone_location(EPSG4326, tmp_path / "epsg4326", mode="copy")
@@ -0,0 +1,73 @@
+import concurrent.futures
+import os
+import shutil
+import subprocess
+
+import pytest  # type: ignore
+
+import gst
+from . import GRASS_ENV_VARIABLES
+
+
+def test_make_command():
+    args = gst.make_command(
+        "r.slope.aspect",
+        flags="ae",
+        overwrite=True,
+        quiet=True,
+        elevation="elev",
+        lambda_=1,
+        input=["a", "b"],
+        missing=None,
+    )
+    assert args == [
+        "r.slope.aspect",
+        "--o",
+        "--q",
+        "-ae",
+        "elevation=elev",
+        "lambda=1",
+        "input=a,b",
+    ]
+
+
+def test_env_session_does_not_modify_os_environ(epsg4326):
+    orig_env = os.environ.copy()
+    with gst.EnvSession(epsg4326.location, grass=epsg4326.grass) as session:
+        assert os.environ.copy() == orig_env
+        for env in GRASS_ENV_VARIABLES:
+            assert env in session.env
+        assert os.path.exists(session.env["GISRC"])
+        gisrc = session.env["GISRC"]
+    assert not os.path.exists(gisrc)
+    assert not session.is_active
+
+
+def test_env_session_commands(epsg4326):
+    with gst.EnvSession(epsg4326.location, grass=epsg4326.grass) as session:
+        gisenv = session.parse_command("g.gisenv", flags="n")
+        assert gisenv["MAPSET"] == "PERMANENT"
+        assert "sq2_000" in session.read_command("g.list", type="raster").split()
+        session.run_command("r.mapcalc", expression="ten = 10", quiet=True)
+        with pytest.raises(subprocess.CalledProcessError):
+            session.run_command("r.info", map="missing", quiet=True)
+
+
+def test_env_sessions_can_run_concurrently_on_different_mapsets(epsg4326):
+    names = ["first", "second", "third"]
+    for name in names:
+        (epsg4326.location / name).mkdir()
+        shutil.copy(
+            epsg4326.location / "PERMANENT" / "DEFAULT_WIND",
+            epsg4326.location / name / "WIND",
+        )
+    sessions = [
+        gst.EnvSession(epsg4326.location, name, grass=epsg4326.grass) for name in names
+    ]
+
+    def current_mapset(session):
+        with session:
+            return session.parse_command("g.gisenv", flags="n")["MAPSET"]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        assert list(executor.map(current_mapset, sessions)) == names
@@ -0,0 +1,28 @@
+from gst.gisrc import read_gisrc
+from gst.gisrc import update_gisrc
+from gst.gisrc import write_gisrc
+
+
+GISRC = {
+    "GISDBASE": "/tmp/gisdbase",
+    "LOCATION_NAME": "epsg4326",
+    "MAPSET": "PERMANENT",
+    "GUI": "text",
+}
+
+
+def test_gisrc_roundtrip(tmp_path):
+    path = tmp_path / "gisrc"
+    write_gisrc(path, GISRC)
+    assert path.read_text().splitlines()[0] == "GISDBASE: /tmp/gisdbase"
+    assert read_gisrc(path) == GISRC
+
+
+def test_update_gisrc(tmp_path):
+    path = tmp_path / "gisrc"
+    write_gisrc(path, GISRC)
+    updated = update_gisrc(path, MAPSET="asdf")
+    assert updated == dict(GISRC, MAPSET="asdf")
+    assert read_gisrc(path) == updated
+    # No temporary files are left behind
+    assert [p.name for p in tmp_path.iterdir()] == ["gisrc"]
@@ -35,3 +35,111 @@ def test_grass_session_decorator(grass_bin, loc):
         assert_location_is_current(loc)
 
     inside_grass_session()
+
+
+@pytest.fixture
+def fake_grass(tmp_path, monkeypatch):
+    """
+    Return the path to a fake GRASS executable which records each time it gets
+    called in `calls.log`.
+    """
+    monkeypatch.setenv("GST_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("GST_NO_CACHE", raising=False)
+    executable = tmp_path / "grass"
+    executable.write_text(
+        "#!/bin/sh\n"
+        f"echo $2 >> {tmp_path / 'calls.log'}\n"
+        f"if [ $2 = path ]; then echo {tmp_path}; else echo 7.8.0; fi\n"
+    )
+    executable.chmod(0o755)
+    return executable
+
+
+def _number_of_calls(fake_grass):
+    log = fake_grass.parent / "calls.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def test_config_is_cached_on_disk(fake_grass):
+    first = gst.Grass(fake_grass)
+    second = gst.Grass(fake_grass)
+    assert first.gisbase == second.gisbase == fake_grass.parent.resolve()
+    assert _number_of_calls(fake_grass) == 1
+
+
+def test_config_cache_is_invalidated_when_the_executable_changes(fake_grass):
+    gst.Grass(fake_grass)
+    fake_grass.write_text(fake_grass.read_text() + "\n")
+    gst.Grass(fake_grass)
+    assert _number_of_calls(fake_grass) == 2
+
+
+def test_config_cache_opt_out(fake_grass, monkeypatch):
+    gst.Grass(fake_grass, use_cache=False)
+    gst.Grass(fake_grass, use_cache=False)
+    assert _number_of_calls(fake_grass) == 2
+    monkeypatch.setenv("GST_NO_CACHE", "1")
+    gst.Grass(fake_grass)
+    assert _number_of_calls(fake_grass) == 3
+
+
+def test_failed_config_is_not_cached(fake_grass):
+    # Fail after recording the call
+    fake_grass.write_text(fake_grass.read_text().replace("if [", "exit 1\nif ["))
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            gst.Grass(fake_grass)
+    assert _number_of_calls(fake_grass) == 2
+
+
+def test_clear_cache(fake_grass):
+    grass = gst.Grass(fake_grass)
+    assert grass.config("version") == "7.8.0"
+    assert grass.config("version") == "7.8.0"
+    assert _number_of_calls(fake_grass) == 2
+    gst.clear_cache()
+    assert not (gst.cache_dir() / "config").exists()
+    gst.Grass(fake_grass)
+    assert _number_of_calls(fake_grass) == 3
+
+
+def test_clear_cache_keeps_unrelated_files(fake_grass):
+    gst.Grass(fake_grass)
+    unrelated = gst.cache_dir() / "unrelated"
+    unrelated.write_text("")
+    gst.clear_cache()
+    assert unrelated.exists()
+    assert not list(gst.cache_dir().glob("config*"))
+
+
+@pytest.fixture
+def clean_registry():
+    gst.Grass.clear_registry()
+    yield
+    gst.Grass.clear_registry()
+
+
+def test_grass_get_returns_a_shared_instance(fake_grass, clean_registry):
+    first = gst.Grass.get(fake_grass)
+    assert gst.Grass.get(fake_grass) is first
+    assert gst.Grass.get(str(fake_grass)) is first
+    assert _number_of_calls(fake_grass) == 1
+
+
+def test_grass_get_uses_gst_grass_executable(fake_grass, clean_registry, monkeypatch):
+    monkeypatch.setenv("GST_GRASS_EXECUTABLE", str(fake_grass))
+    assert gst.Grass.get() is gst.Grass.get(fake_grass)
+
+
+def test_grass_is_immutable(fake_grass):
+    grass = gst.Grass(fake_grass)
+    with pytest.raises(AttributeError):
+        grass.gisbase = pathlib.Path("/tmp")
+    with pytest.raises(AttributeError):
+        del grass.executable
+
+
+def test_session_uses_the_shared_instance(grass_bin, clean_registry):
+    executable = grass_bin.executable
+    session = gst.Session(location=TESTS_GISDBASE / "epsg4326", grass=executable)
+    assert session.grass is gst.Grass.get(executable)
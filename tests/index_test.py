@@ -0,0 +1,87 @@
+import os
+import struct
+
+import gst
+from . import EPSG4326
+
+
+def _touch(path):
+    # Make sure that the mtime changes even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_raster_index(location):
+    index = gst.RasterIndex(location)
+    names = [info.name for info in index]
+    assert names == ["sq2_000", "sq2_127", "sq2_255", "sq5_000", "sq5_127", "sq5_255"]
+    info = index["sq5_127"]
+    assert info.qualified_name == "sq5_127@PERMANENT"
+    assert info.type == "CELL"
+    assert info.compressed == 5
+    assert info.range == (127, 127)
+    assert info.region.cells == 25
+    assert info.title == ""
+    assert info.categories == 0
+    assert info.creator == "feanor"
+    assert "sq5_127" in index
+    assert "sq5_127@PERMANENT" in index
+    assert "sq5_127@asdf" not in index
+    assert "asdf" not in index
+
+
+def test_raster_index_pattern(location):
+    index = gst.RasterIndex(location)
+    names = [info.name for info in index.rasters("sq2_*")]
+    assert names == ["sq2_000", "sq2_127", "sq2_255"]
+    assert index.rasters(mapset="asdf") == []
+
+
+def test_raster_index_is_invalidated_by_mtime(location):
+    index = gst.RasterIndex(location)
+    assert index["sq2_127"].range == (127, 127)
+    cached = index["sq2_000"]
+    range_path = location / "PERMANENT" / "cell_misc" / "sq2_127" / "range"
+    range_path.write_text("1 200\n")
+    _touch(range_path)
+    assert index["sq2_127"].range == (1, 200)
+    assert index["sq2_000"] is cached
+
+
+def test_raster_index_detects_new_and_removed_maps(location):
+    index = gst.RasterIndex(location)
+    assert len(index) == 6
+    permanent = location / "PERMANENT"
+    (permanent / "cellhd" / "sq2_000").rename(permanent / "cellhd" / "copy")
+    _touch(permanent / "cellhd")
+    assert "sq2_000" not in index
+    assert "copy" in index
+    assert index["copy"].range is None
+
+
+def test_raster_index_floating_point(location):
+    permanent = location / "PERMANENT"
+    misc = permanent / "cell_misc" / "sq2_127"
+    (misc / "f_format").write_text("type: double\nbyte_order: xdr\n")
+    (misc / "f_range").write_bytes(struct.pack(">dd", -1.5, 2.5))
+    info = gst.RasterIndex(location)["sq2_127"]
+    assert info.type == "DCELL"
+    assert info.range == (-1.5, 2.5)
+
+
+def test_raster_index_new_mapset(location):
+    index = gst.RasterIndex(location)
+    assert len(index) == 6
+    gst.create_mapset(location, "user")
+    (location / "user" / "cellhd").mkdir()
+    (location / "user" / "cellhd" / "sq2_000").write_bytes(
+        (location / "PERMANENT" / "cellhd" / "sq2_000").read_bytes()
+    )
+    assert len(index) == 7
+    # PERMANENT is searched last
+    assert index["sq2_000"].mapset == "user"
+
+
+def test_raster_index_get():
+    assert gst.RasterIndex.get(EPSG4326) is gst.RasterIndex.get(str(EPSG4326))
+    gst.RasterIndex.clear_registry()
@@ -0,0 +1,83 @@
+import logging
+
+import pytest  # type: ignore
+
+import gst
+from gst.instrument import timed
+
+
+def test_timed_is_a_noop_without_hooks():
+    with timed("asdf") as first, timed("qwer") as second:
+        pass
+    assert first is second
+
+
+def test_collect_timings():
+    with gst.collect_timings() as timings:
+        with timed("outer", key="value"):
+            with timed("inner"):
+                pass
+    with timed("ignored"):
+        pass
+    assert [timing.phase for timing in timings] == ["inner", "outer"]
+    assert timings[1].attributes == {"key": "value"}
+    assert timings[1].duration >= timings[0].duration >= 0
+
+
+def test_timed_records_failures():
+    with gst.collect_timings() as timings:
+        with pytest.raises(ZeroDivisionError):
+            with timed("division"):
+                1 / 0
+    assert timings[0].failed
+
+
+def test_failing_hooks_are_ignored():
+    def hook(timing):
+        raise RuntimeError("boom")
+
+    gst.add_timing_hook(hook)
+    try:
+        with timed("phase"):
+            pass
+    finally:
+        gst.remove_timing_hook(hook)
+
+
+def test_log_timings(caplog):
+    gst.log_timings(level=logging.INFO)
+    try:
+        with caplog.at_level(logging.INFO, logger="gst.instrument"):
+            with timed("phase", key="value"):
+                pass
+    finally:
+        gst.log_timings(False)
+    (record,) = caplog.records
+    assert record.gst_phase == "phase"
+    assert record.gst_duration >= 0
+    assert record.gst_attributes == {"key": "value"}
+
+
+def test_grass_is_instrumented(tmp_path):
+    executable = tmp_path / "grass"
+    executable.write_text(f"#!/bin/sh\necho {tmp_path}\n")
+    executable.chmod(0o755)
+    with gst.collect_timings() as timings:
+        gst.Grass(executable, use_cache=False)
+    assert [timing.phase for timing in timings] == ["grass.resolve", "grass.config"]
+    assert timings[1].attributes == {"key": "path"}
+
+
+def test_session_is_instrumented(epsg4326):
+    with gst.collect_timings() as timings:
+        with epsg4326:
+            pass
+    phases = [timing.phase for timing in timings]
+    assert phases == [
+        "session.snapshot",
+        "session.init",
+        "session.start",
+        "session.body",
+        "session.finish",
+        "session.restore",
+    ]
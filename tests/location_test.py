@@ -0,0 +1,63 @@
+import pytest  # type: ignore
+
+import gst
+from . import EPSG4326
+
+
+def test_create_location_epsg4326(tmp_path):
+    location = gst.create_location(tmp_path / "loc", epsg=4326)
+    for name in ("PROJ_INFO", "PROJ_UNITS", "PROJ_EPSG", "MYNAME", "VAR"):
+        expected = (EPSG4326 / "PERMANENT" / name).read_text()
+        assert (location / "PERMANENT" / name).read_text() == expected, name
+    for name in ("DEFAULT_WIND", "WIND"):
+        expected = gst.read_header(EPSG4326 / "PERMANENT" / name)
+        region = gst.Region.from_file(location / "PERMANENT" / name)
+        assert region == gst.Region.from_header(expected)
+        assert region.extra == gst.Region.from_header(expected).extra
+
+
+def test_create_location_xy(tmp_path):
+    region = gst.Region(north=10, south=0, east=20, west=0, rows=10, cols=20)
+    location = gst.create_location(tmp_path / "loc", region=region)
+    assert not (location / "PERMANENT" / "PROJ_INFO").exists()
+    assert gst.Region.from_file(location / "PERMANENT" / "WIND") == region
+
+
+def test_create_location_with_pyproj(tmp_path):
+    pytest.importorskip("pyproj")
+    location = gst.create_location(tmp_path / "loc", epsg=32634)
+    proj_info = gst.read_header(location / "PERMANENT" / "PROJ_INFO")
+    assert proj_info["proj"] == "utm"
+    assert proj_info["zone"] == "34"
+    assert gst.read_header(location / "PERMANENT" / "PROJ_UNITS")["unit"] == "meter"
+    region = gst.Region.from_file(location / "PERMANENT" / "DEFAULT_WIND")
+    assert (region.proj, region.zone) == (1, 34)
+
+
+def test_create_location_epsg_and_wkt(tmp_path):
+    with pytest.raises(ValueError) as exc:
+        gst.create_location(tmp_path / "loc", epsg=4326, wkt="GEOGCS[...]")
+    assert "either `epsg` or `wkt`" in str(exc)
+
+
+def test_create_location_existing_path(tmp_path):
+    gst.create_location(tmp_path / "loc", epsg=4326)
+    with pytest.raises(FileExistsError):
+        gst.create_location(tmp_path / "loc", epsg=4326)
+
+
+def test_create_mapset(tmp_path):
+    location = gst.create_location(tmp_path / "loc", epsg=4326)
+    mapset = gst.create_mapset(location, "user")
+    assert (mapset / "WIND").read_text() == (
+        location / "PERMANENT" / "DEFAULT_WIND"
+    ).read_text()
+
+
+def test_session_in_created_location(tmp_path, grass_bin):
+    location = gst.create_location(tmp_path / "loc", epsg=4326)
+    gst.create_mapset(location, "user")
+    with grass_bin.session(location, "user"):
+        import grass.script as gscript  # type: ignore
+
+        assert gscript.gisenv()["MAPSET"] == "user"
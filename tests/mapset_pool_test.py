@@ -0,0 +1,59 @@
+import pytest  # type: ignore
+
+import gst
+
+
+def test_temp_mapset_pool_requires_a_session():
+    with pytest.raises(ValueError) as exc:
+        gst.TempMapsetPool()
+    assert "inside a GRASS session" in str(exc)
+
+
+def test_temp_mapset_pool_lease(epsg4326):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        with gst.TempMapsetPool(size=2) as pool:
+            for name in pool.names:
+                assert (epsg4326.location / name / "WIND").exists()
+            with pool.lease() as name:
+                assert gscript.gisenv()["MAPSET"] == name
+                assert name in pool.names
+            assert gscript.gisenv()["MAPSET"] == "PERMANENT"
+        for name in pool.names:
+            assert not (epsg4326.location / name).exists()
+
+
+def test_temp_mapset_pool_resets_the_mapsets(epsg4326):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        with gst.TempMapsetPool(size=1) as pool:
+            with pool.lease() as name:
+                wind = (epsg4326.location / name / "WIND").read_text()
+                gscript.run_command("g.region", rows=10, cols=10)
+                gscript.run_command("r.mapcalc", expression="ten = 10", quiet=True)
+                assert (epsg4326.location / name / "cellhd" / "ten").exists()
+            assert not (epsg4326.location / name / "cellhd").exists()
+            assert (epsg4326.location / name / "WIND").read_text() == wind
+            with pool.lease() as same_name:
+                assert same_name == name
+                assert not gscript.list_strings("raster", mapset=name)
+
+
+def test_temp_mapset_pool_removes_the_mapsets_on_failure(epsg4326, monkeypatch):
+    baseline = gst.mapset_pool._Baseline
+    calls = []
+
+    def fail_on_the_second_call(path):
+        calls.append(path)
+        if len(calls) == 2:
+            raise OSError("failed")
+        return baseline(path)
+
+    monkeypatch.setattr(gst.mapset_pool, "_Baseline", fail_on_the_second_call)
+    with epsg4326:
+        with pytest.raises(OSError):
+            gst.TempMapsetPool(size=3, prefix="failing")
+    assert [path.name for path in calls] == ["failing_0", "failing_1"]
+    assert not list(epsg4326.location.glob("failing_*"))
@@ -0,0 +1,131 @@
+import json
+
+import pytest  # type: ignore
+
+import gst
+from gst.gisrc import write_gisrc
+from gst.memoize import _copy_map
+
+
+@pytest.fixture(autouse=True)
+def gisenv(location, tmp_path, monkeypatch):
+    """ A fake session environment, pointing at the copy of the epsg4326 Location """
+    gisrc = tmp_path / "gisrc"
+    write_gisrc(
+        gisrc,
+        {
+            "GISDBASE": tmp_path.as_posix(),
+            "LOCATION_NAME": "epsg4326",
+            "MAPSET": "PERMANENT",
+        },
+    )
+    monkeypatch.setenv("GISRC", gisrc.as_posix())
+    monkeypatch.setenv("GIS_LOCK", "1")
+    monkeypatch.delenv("GRASS_REGION", raising=False)
+    monkeypatch.delenv("WIND_OVERRIDE", raising=False)
+
+
+def _make_copier(location, calls, **memoize_kwargs):
+    permanent = location / "PERMANENT"
+
+    # Stands in for a GRASS module that creates `output` from `source`
+    @gst.memoize_maps(inputs=["source"], outputs=["output"], **memoize_kwargs)
+    def copy(source, output, factor=1):
+        calls.append((source, output, factor))
+        _copy_map(permanent, source, permanent, output)
+        return factor
+
+    return copy
+
+
+def test_memoize_maps_requires_a_session(location, monkeypatch):
+    monkeypatch.delenv("GIS_LOCK")
+    with pytest.raises(ValueError):
+        _make_copier(location, [])("sq5_127", "out")
+
+
+def test_memoize_maps_restores_outputs(location):
+    calls = []
+    copy = _make_copier(location, calls)
+    assert copy("sq5_127", "out") == 1
+    assert len(calls) == 1
+    cache = location / gst.memoize.CACHE_MAPSET
+    assert len(list((cache / "cellhd").iterdir())) == 1
+    # The output names are not part of the fingerprint
+    assert copy("sq5_127", "other") == 1
+    assert len(calls) == 1
+    cellhd = location / "PERMANENT/cellhd"
+    assert (cellhd / "other").read_text() == (cellhd / "sq5_127").read_text()
+    # Other arguments are
+    assert copy("sq5_127", "other", factor=2) == 2
+    assert len(calls) == 2
+
+
+def test_memoize_maps_detects_changed_inputs(location):
+    calls = []
+    copy = _make_copier(location, calls)
+    copy("sq5_127", "out")
+    copy("sq5_255", "out")
+    assert len(calls) == 2
+    cell = location / "PERMANENT/cell/sq5_127"
+    cell.write_bytes(cell.read_bytes() + b"\x00")
+    copy("sq5_127", "out")
+    assert len(calls) == 3
+
+
+def test_memoize_maps_fingerprints_the_region(location, monkeypatch):
+    calls = []
+    copy = _make_copier(location, calls)
+    copy("sq5_127", "out")
+    region = gst.current_region().replace(rows=2, cols=2)
+    monkeypatch.setenv("GRASS_REGION", region.to_grass_region())
+    copy("sq5_127", "out")
+    assert len(calls) == 2
+
+
+def test_memoize_maps_fingerprints_the_mask(location):
+    calls = []
+    copy = _make_copier(location, calls)
+    copy("sq5_127", "out")
+    permanent = location / "PERMANENT"
+    _copy_map(permanent, "sq5_000", permanent, "MASK")
+    copy("sq5_127", "out")
+    assert len(calls) == 2
+    copy("sq5_127", "out")
+    assert len(calls) == 2
+    _copy_map(permanent, "sq5_255", permanent, "MASK")
+    copy("sq5_127", "out")
+    assert len(calls) == 3
+
+
+def test_memoize_maps_evicts_least_recently_used(location):
+    calls = []
+    # Room for a single entry
+    copy = _make_copier(location, calls, max_size=500)
+    copy("sq5_127", "out")
+    copy("sq5_255", "out")
+    cache = location / gst.memoize.CACHE_MAPSET
+    index = json.loads((cache / "gst_memoize.json").read_text())
+    assert len(index) == 1
+    assert len(list((cache / "cellhd").iterdir())) == 1
+    copy("sq5_127", "out")
+    assert len(calls) == 3
+
+
+def test_memoize_maps_missing_output(location):
+    @gst.memoize_maps(outputs=["output"])
+    def noop(output):
+        pass
+
+    with pytest.raises(ValueError):
+        noop("asdf")
+
+
+def test_clear_memoized_maps(location):
+    calls = []
+    copy = _make_copier(location, calls)
+    copy("sq5_127", "out")
+    gst.clear_memoized_maps()
+    assert not (location / gst.memoize.CACHE_MAPSET).exists()
+    copy("sq5_127", "out")
+    assert len(calls) == 2
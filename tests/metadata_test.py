@@ -0,0 +1,108 @@
+import os
+
+import pytest  # type: ignore
+
+import gst
+from gst.metadata import mtimes
+
+
+def _touch(path):
+    # Make sure that the mtime changes even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_metadata_cache_validates_fingerprint():
+    cache = gst.MetadataCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get(("kind", "mapset", "a"), 1, compute) == 1
+    assert cache.get(("kind", "mapset", "a"), 1, compute) == 1
+    assert cache.get(("kind", "mapset", "a"), 2, compute) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 1
+
+
+def test_metadata_cache_evicts_least_recently_used():
+    cache = gst.MetadataCache(maxsize=2)
+    cache.get(("kind", "", "a"), None, lambda: "a")
+    cache.get(("kind", "", "b"), None, lambda: "b")
+    # "a" becomes the most recently used, so "b" is evicted
+    cache.get(("kind", "", "a"), None, lambda: "x")
+    cache.get(("kind", "", "c"), None, lambda: "c")
+    assert cache.get(("kind", "", "a"), None, lambda: "x") == "a"
+    assert cache.get(("kind", "", "b"), None, lambda: "x") == "x"
+    with pytest.raises(ValueError):
+        gst.MetadataCache(maxsize=0)
+
+
+def test_metadata_cache_invalidate():
+    cache = gst.MetadataCache()
+    cache.get(("region", "PERMANENT", "WIND"), None, lambda: 1)
+    cache.get(("list", "PERMANENT", "raster"), None, lambda: 2)
+    cache.get(("list", "other", "raster"), None, lambda: 3)
+    cache.invalidate(mapset="other")
+    assert len(cache) == 2
+    cache.invalidate("list")
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+def test_mtimes(tmp_path):
+    path = tmp_path / "file"
+    path.write_text("")
+    assert mtimes(path.as_posix(), (tmp_path / "missing").as_posix()) == (
+        path.stat().st_mtime_ns,
+        0,
+    )
+
+
+def test_session_metadata_requires_an_active_session(gsession):
+    session = gsession("epsg4326")
+    with pytest.raises(ValueError):
+        session.region()
+    with pytest.raises(ValueError):
+        session.list()
+
+
+def test_session_raster_info_is_cached(gsession):
+    with gsession("epsg4326") as session:
+        info = session.raster_info("sq5_127")
+        assert info["rows"] == 5
+        assert info["max"] == 127
+        misses = session.metadata.misses
+        assert session.raster_info("sq5_127@PERMANENT") == info
+        assert session.raster_info("sq5_127") == info
+        assert session.metadata.misses == misses
+        _touch(session.location / "PERMANENT/cellhd/sq5_127")
+        session.raster_info("sq5_127")
+        assert session.metadata.misses == misses + 1
+
+
+def test_session_list_is_cached(gsession):
+    with gsession("epsg4326") as session:
+        names = session.list("raster", pattern="sq5_*")
+        assert names == ["sq5_000@PERMANENT", "sq5_127@PERMANENT", "sq5_255@PERMANENT"]
+        misses = session.metadata.misses
+        assert session.list("raster", pattern="sq5_*") == names
+        assert session.metadata.misses == misses
+        cellhd = session.location / "PERMANENT/cellhd"
+        (cellhd / "sq5_new").write_text((cellhd / "sq5_127").read_text())
+        _touch(cellhd)
+        assert "sq5_new@PERMANENT" in session.list("raster", pattern="sq5_*")
+        with pytest.raises(ValueError):
+            session.list("asdf")
+
+
+def test_session_region_is_invalidated_by_temp_region(gsession):
+    with gsession("epsg4326") as session:
+        assert session.region().cells == 1
+        assert session.region() is session.region()
+        with gst.temp_region(raster="sq5_127"):
+            assert session.region().cells == 25
+        assert session.region().cells == 1
@@ -0,0 +1,48 @@
+import pytest  # type: ignore
+
+import gst
+
+
+def _current_mapset(_):
+    import grass.script as gscript  # type: ignore
+
+    mapset = gscript.gisenv()["MAPSET"]
+    assert mapset == gst.pool.worker_mapset()
+    return mapset
+
+
+def _make_raster(index):
+    import grass.script as gscript  # type: ignore
+
+    gscript.run_command("r.mapcalc", expression=f"tile_{index} = {index}", quiet=True)
+    return index
+
+
+def test_worker_mapset_raises_outside_of_a_worker():
+    with pytest.raises(ValueError) as exc:
+        gst.pool.worker_mapset()
+    assert "SessionPool worker" in str(exc)
+
+
+def test_workers_use_their_own_temp_mapset(epsg4326):
+    with gst.SessionPool(
+        epsg4326.location, grass=epsg4326.grass, max_workers=2
+    ) as pool:
+        mapsets = set(pool.map(_current_mapset, range(10)))
+        assert mapsets <= set(pool.worker_mapsets())
+        assert all(mapset.startswith(pool.prefix) for mapset in mapsets)
+    assert pool.worker_mapsets() == []
+
+
+def test_collect(epsg4326):
+    with gst.SessionPool(
+        epsg4326.location, grass=epsg4326.grass, max_workers=2
+    ) as pool:
+        assert list(pool.map(_make_raster, range(4))) == [0, 1, 2, 3]
+        copied = pool.collect("PERMANENT", pattern="tile_*")
+    assert sorted(copied) == ["tile_0", "tile_1", "tile_2", "tile_3"]
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        rasters = gscript.list_strings("raster", pattern="tile_*", mapset="PERMANENT")
+        assert len(rasters) == 4
@@ -0,0 +1,110 @@
+import os
+import shutil
+
+import pytest  # type: ignore
+
+import gst
+from gst.gisrc import write_gisrc
+from gst.region import Region
+from gst.region import RegionStack
+from . import EPSG4326
+
+
+@pytest.fixture
+def env(tmp_path):
+    """ A fake session environment, pointing at a copy of the epsg4326 Location """
+    shutil.copytree(EPSG4326, tmp_path / "epsg4326")
+    gisrc = tmp_path / "gisrc"
+    write_gisrc(
+        gisrc,
+        {
+            "GISDBASE": tmp_path.as_posix(),
+            "LOCATION_NAME": "epsg4326",
+            "MAPSET": "PERMANENT",
+        },
+    )
+    return {"GISRC": gisrc.as_posix()}
+
+
+def test_region_from_cellhd():
+    region = Region.from_file(EPSG4326 / "PERMANENT" / "cellhd" / "sq5_000")
+    assert (region.north, region.south, region.east, region.west) == (5, 0, 5, 0)
+    assert (region.rows, region.cols, region.nsres, region.ewres) == (5, 5, 1, 1)
+    assert region.proj == 3
+    assert "compressed" not in region.extra
+
+
+def test_region_grass_region_roundtrip():
+    region = Region.from_file(EPSG4326 / "PERMANENT" / "WIND")
+    value = region.to_grass_region()
+    assert value.startswith("proj:3;zone:0;north:1;south:0;")
+    assert Region.from_grass_region(value) == region
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [("1N", 1), ("12.5S", -12.5), ("45:30W", -45.5), ("0:00:36", 0.01)],
+)
+def test_region_coordinates_are_parsed(value, expected):
+    assert gst.region._parse_coordinate(value) == pytest.approx(expected)
+
+
+def test_region_replace():
+    region = Region(north=10, south=0, east=10, west=0, rows=10, cols=10)
+    assert region.replace(north=20).rows == 20
+    assert region.replace(res=2).cols == 5
+    assert region.replace(rows=4).nsres == 2.5
+    with pytest.raises(ValueError):
+        region.replace(north=-1)
+    with pytest.raises(ValueError):
+        region.replace(asdf=1)
+
+
+def test_region_stack_push_and_pop(env, tmp_path):
+    stack = RegionStack(env)
+    wind = tmp_path / "epsg4326" / "PERMANENT" / "WIND"
+    original = wind.read_text()
+    initial = stack.current
+    pushed = stack.push(raster="sq5_000")
+    assert pushed.rows == 5
+    assert gst.current_region(env) == pushed
+    with stack.override(res=0.5) as inner:
+        assert inner.rows == 10
+        assert Region.from_grass_region(env["GRASS_REGION"]) == inner
+    assert stack.current == pushed
+    assert stack.pop() == pushed
+    assert "GRASS_REGION" not in env
+    assert stack.current == initial
+    assert len(stack) == 0
+    with pytest.raises(ValueError):
+        stack.pop()
+    assert wind.read_text() == original
+
+
+def test_region_stack_persist(env):
+    stack = RegionStack(env)
+    stack.push(raster="sq2_000")
+    stack.persist()
+    stack.pop()
+    assert "GRASS_REGION" not in env
+    assert gst.current_region(env).rows == 2
+
+
+def test_find_map(env):
+    assert gst.find_map("sq2_000", env=env).name == "sq2_000"
+    assert gst.find_map("sq2_000@PERMANENT", env=env).parent.name == "cellhd"
+    with pytest.raises(ValueError):
+        gst.find_map("missing", env=env)
+
+
+def test_override_region(epsg4326):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        wind = (epsg4326.mapset / "WIND").read_text()
+        with gst.override_region(raster="sq5_000") as region:
+            assert region.rows == 5
+            assert gscript.region()["rows"] == 5
+        assert "GRASS_REGION" not in os.environ
+        assert gscript.region()["rows"] == 1
+        assert (epsg4326.mapset / "WIND").read_text() == wind
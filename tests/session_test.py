@@ -67,3 +67,155 @@ def test_decorator(epsg4326, env):
     inside_grass_session()
     assert env not in os.environ
     assert not shutil.which("r.report")
+
+
+def test_persistent_session_is_only_initialized_once(epsg4326):
+    session = gst.session.Session(
+        grass=epsg4326.grass, location=epsg4326.location, persistent=True
+    )
+    orig_env = os.environ.copy()
+    with session:
+        gisrc = os.environ["GISRC"]
+    assert orig_env == os.environ.copy()
+    assert os.path.exists(gisrc)
+    with session:
+        assert os.environ["GISRC"] == gisrc
+        assert shutil.which("r.report")
+    assert orig_env == os.environ.copy()
+    session.close()
+    assert not os.path.exists(gisrc)
+    assert orig_env == os.environ.copy()
+
+
+def test_persistent_session_cannot_be_closed_while_active(epsg4326):
+    session = gst.session.Session(
+        grass=epsg4326.grass, location=epsg4326.location, persistent=True
+    )
+    with session:
+        with pytest.raises(ValueError) as exc:
+            session.close()
+    assert "active session" in str(exc)
+    session.close()
+
+
+def _add_mapset(session, name):
+    mapset = session.location / name
+    mapset.mkdir()
+    shutil.copy(session.location / "PERMANENT" / "DEFAULT_WIND", mapset / "WIND")
+
+
+def test_switch_mapset(epsg4326):
+    _add_mapset(epsg4326, "other")
+    with epsg4326:
+        import grass.script as gscript
+
+        assert epsg4326.switch_mapset("other") == "PERMANENT"
+        assert gscript.gisenv()["MAPSET"] == "other"
+        assert epsg4326.mapset.name == "other"
+        assert epsg4326.switch_mapset("PERMANENT") == "other"
+        assert gscript.gisenv()["MAPSET"] == "PERMANENT"
+
+
+def test_switch_mapset_requires_an_existing_mapset(epsg4326):
+    with epsg4326:
+        with pytest.raises(ValueError) as exc:
+            epsg4326.switch_mapset("missing")
+    assert "does not exist" in str(exc)
+
+
+def test_switch_mapset_requires_an_active_session(epsg4326):
+    with pytest.raises(ValueError) as exc:
+        epsg4326.switch_mapset("PERMANENT")
+    assert "inactive session" in str(exc)
+
+
+@pytest.mark.parametrize("mapset", ["", "..", "PERMANENT/", "../other", "a/b", "/tmp"])
+def test_switch_mapset_requires_a_mapset_name(epsg4326, mapset):
+    with pytest.raises(ValueError) as exc:
+        epsg4326.switch_mapset(mapset)
+    assert "Not a valid mapset name" in str(exc)
+
+
+def test_in_mapset(epsg4326):
+    _add_mapset(epsg4326, "other")
+    with epsg4326:
+        import grass.script as gscript
+
+        with epsg4326.in_mapset("other"):
+            assert gscript.gisenv()["MAPSET"] == "other"
+        assert gscript.gisenv()["MAPSET"] == "PERMANENT"
+
+
+def test_invalid_modules_policy_raises(grass_bin, epsg4326):
+    with pytest.raises(ValueError) as exc:
+        gst.session.Session(grass=grass_bin, location=epsg4326.location, modules="asdf")
+    assert "modules must be one of" in str(exc)
+
+
+@pytest.mark.parametrize("modules", ["strict", "cached"])
+def test_grass_modules_are_removed_on_exit(epsg4326, modules):
+    session = gst.session.Session(
+        grass=epsg4326.grass, location=epsg4326.location, modules=modules
+    )
+    sys.modules.pop("grass.script", None)
+    with session:
+        import grass.script  # type: ignore
+
+        first = grass.script
+    assert "grass.script" not in sys.modules
+    with session:
+        import grass.script  # type: ignore
+
+        assert (grass.script is first) == (modules == "cached")
+    gst.session.clear_module_cache()
+
+
+def test_grass_modules_are_restored_when_the_session_fails_to_start(
+    epsg4326, monkeypatch
+):
+    def fail(*args):
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(gst.session, "start_grass_session", fail)
+    session = gst.session.Session(
+        grass=epsg4326.grass, location=epsg4326.location, modules="strict"
+    )
+    monkeypatch.setitem(sys.modules, "grass.outer", sys)
+    with pytest.raises(RuntimeError):
+        session.__enter__()
+    assert sys.modules["grass.outer"] is sys
+    assert not session.is_active
+
+
+def test_cached_grass_modules_survive_a_failed_start(epsg4326, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(gst.session, "start_grass_session", fail)
+    session = gst.session.Session(
+        grass=epsg4326.grass, location=epsg4326.location, modules="cached"
+    )
+    gisbase = epsg4326.grass.gisbase.as_posix()
+    monkeypatch.setitem(gst.session._module_cache, gisbase, {"grass.cached": sys})
+    with pytest.raises(RuntimeError):
+        session.__enter__()
+    assert gst.session._module_cache[gisbase] == {"grass.cached": sys}
+    assert "grass.cached" not in sys.modules
+
+
+def test_current_session(epsg4326):
+    assert gst.session.current_session() is None
+    with epsg4326:
+        assert gst.session.current_session() is epsg4326
+    assert gst.session.current_session() is None
+
+
+def test_pygrass_is_imported_lazily_and_cached(epsg4326):
+    with pytest.raises(ValueError) as exc:
+        epsg4326.pygrass("gis")
+    assert "inside an active session" in str(exc)
+    with epsg4326:
+        ggis = epsg4326.pygrass("gis")
+        assert ggis is sys.modules["grass.pygrass.gis"]
+        assert epsg4326.pygrass("gis") is ggis
+        assert epsg4326.lib("gis") is sys.modules["grass.lib.gis"]
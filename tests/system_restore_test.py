@@ -1,8 +1,12 @@
 import os
 import sys
+import types
 
 import pytest  # type: ignore
 
+from gst.system_restore import diff_environ
+from gst.system_restore import grass_modules
+from gst.system_restore import replace_grass_modules
 from gst.system_restore import system_restore
 
 
@@ -39,3 +43,41 @@ def test_os_environ_is_restored():
         os.environ[GIBBERISH] = GIBBERISH
     assert GIBBERISH not in os.environ
     assert os.environ == original
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_os_environ_changes_are_undone(incremental):
+    os.environ["GST_TO_MODIFY"] = "original"
+    os.environ["GST_TO_REMOVE"] = "original"
+    original = os.environ.copy()
+    with system_restore(incremental=incremental):
+        os.environ[GIBBERISH] = GIBBERISH
+        os.environ["GST_TO_MODIFY"] = "modified"
+        del os.environ["GST_TO_REMOVE"]
+    assert os.environ == original
+    del os.environ["GST_TO_MODIFY"]
+    del os.environ["GST_TO_REMOVE"]
+
+
+def test_incremental_restore_keeps_the_sys_path_object():
+    path = sys.path
+    with system_restore():
+        sys.path.append("/tmp")
+    assert sys.path is path
+    assert "/tmp" not in sys.path
+
+
+def test_diff_environ():
+    old = {"A": "1", "B": "2", "C": "3"}
+    new = {"A": "1", "B": "changed", "D": "4"}
+    changed, removed = diff_environ(old, new)
+    assert changed == {"B": "changed", "D": "4"}
+    assert removed == ["C"]
+
+
+def test_replace_grass_modules():
+    fake = types.ModuleType("grass")
+    original = replace_grass_modules({"grass": fake})
+    assert grass_modules() == {"grass": fake}
+    assert replace_grass_modules(original) == {"grass": fake}
+    assert grass_modules() == original
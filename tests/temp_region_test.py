@@ -1,3 +1,5 @@
+import os
+
 import pytest  # type: ignore
 
 import gst.session
@@ -70,3 +72,18 @@ def test_with_temp_region(epsg4326):
     decorated()
     with epsg4326:
         assert ggis.Region().rows == 1
+
+
+@pytest.mark.parametrize("raster, size", [(None, 1), ("sq5_000", 5)])
+def test_temp_region_stack(epsg4326, raster, size):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        wind = (epsg4326.mapset / "WIND").read_text()
+        with gst.utils.temp_region(raster=raster, stack=True) as inner:
+            assert inner == gst.current_region()
+            assert (inner.rows, inner.cols) == (size, size)
+            assert gscript.region()["rows"] == size
+            gscript.run_command("g.region", rows=10, cols=10)
+        assert "GRASS_REGION" not in os.environ
+        assert (epsg4326.mapset / "WIND").read_text() == wind
@@ -0,0 +1,108 @@
+import pytest  # type: ignore
+
+import gst
+from gst.region import Region
+
+
+REGION = Region(north=10, south=0, east=7, west=0, rows=10, cols=7)
+
+
+def test_split_region_covers_the_region():
+    tiles = gst.split_region(REGION, rows=4, cols=3)
+    assert len(tiles) == 9
+    assert [tile.index for tile in tiles] == list(range(9))
+    assert sum(tile.core.cells for tile in tiles) == REGION.cells
+    assert all(tile.region == tile.core for tile in tiles)
+    assert (tiles[0].row, tiles[0].col) == (0, 0)
+    assert (tiles[-1].row, tiles[-1].col) == (2, 2)
+    assert tiles[-1].core.rows == 2
+    assert tiles[-1].core.cols == 1
+
+
+def test_split_region_with_overlap():
+    tiles = gst.split_region(REGION, rows=4, cols=3, overlap=1)
+    first, middle = tiles[0], tiles[4]
+    assert (first.region.north, first.region.west) == (10, 0)
+    assert (first.region.rows, first.region.cols) == (5, 4)
+    assert (middle.region.rows, middle.region.cols) == (6, 5)
+    assert middle.region.nsres == middle.core.nsres == 1
+
+
+def test_split_region_by_cells():
+    tiles = gst.split_region(REGION, cells=16)
+    assert all(tile.core.cells <= 16 for tile in tiles)
+    with pytest.raises(ValueError):
+        gst.split_region(REGION, cells=16, rows=2)
+
+
+def _count_cells(tile):
+    import grass.script as gscript  # type: ignore
+
+    gscript.run_command("r.univar", map="sq5_000", quiet=True, env=tile.env)
+    return tile.region.cells
+
+
+def _make_tile_map(tile):
+    import grass.script as gscript  # type: ignore
+
+    name = f"tile_{tile.index}"
+    gscript.run_command(
+        "r.mapcalc",
+        expression=f"{name} = {tile.index}",
+        quiet=True,
+        overwrite=True,
+        env=tile.env,
+    )
+    return name
+
+
+@pytest.mark.parametrize("backend", ["serial", "thread", "process"])
+def test_process_tiles(epsg4326, backend):
+    with epsg4326:
+        with gst.override_region(raster="sq5_000"):
+            results = gst.process_tiles(_count_cells, rows=2, cols=2, backend=backend)
+    assert sum(results) == 25
+
+
+@pytest.mark.parametrize("backend", ["serial", "thread", "process"])
+def test_process_tiles_patch(epsg4326, backend):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        with gst.override_region(raster="sq5_000"):
+            gst.process_tiles(
+                _make_tile_map,
+                rows=2,
+                cols=2,
+                overlap=1,
+                backend=backend,
+                patch="patched",
+            )
+            info = gscript.raster_info("patched")
+            leftovers = gscript.list_strings("raster", pattern="*_core_*", mapset=".")
+        assert (info["rows"], info["cols"]) == (5, 5)
+        assert (info["min"], info["max"]) == (0, 8)
+        assert leftovers == []
+
+
+def _make_qualified_tile_map(tile):
+    return f"{_make_tile_map(tile)}@PERMANENT"
+
+
+def test_process_tiles_patch_qualified_names(epsg4326):
+    with epsg4326:
+        import grass.script as gscript  # type: ignore
+
+        with gst.override_region(raster="sq5_000"):
+            gst.process_tiles(
+                _make_qualified_tile_map, rows=2, cols=2, overlap=1, patch="patched"
+            )
+            info = gscript.raster_info("patched")
+        assert (info["min"], info["max"]) == (0, 8)
+
+
+def test_process_tiles_invalid_backend(epsg4326):
+    with epsg4326:
+        with pytest.raises(ValueError) as exc:
+            gst.process_tiles(_count_cells, backend="asdf")
+    assert "backend must be one of" in str(exc)